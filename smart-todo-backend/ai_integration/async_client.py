@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import weakref
+
+from django.conf import settings
+
+from smart_todo.performance import timed
+
+from .chunking import estimate_tokens
+from .telemetry import track_call
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent'
+
+# One pooled client per event loop (uvicorn runs one loop per worker process)
+_clients = weakref.WeakKeyDictionary()
+
+
+class GeminiError(Exception):
+    """Error returned by the Gemini REST API"""
+
+
+def get_client():
+    """Shared keep-alive HTTP client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Imported here so processes that never call Gemini don't pay for httpx
+        import httpx
+
+        client = httpx.AsyncClient(
+            timeout=settings.AI_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.AI_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_ASYNC_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def agenerate_content(prompt, model=None, max_output_tokens=None, call_site='unknown'):
+    """Non-blocking Gemini generateContent call - returns the response text"""
+    model = model or settings.AI_MODEL
+    with timed('ai'), track_call(call_site, model, prompt) as call:
+        text, usage = await _generate(prompt, model, max_output_tokens)
+        call['prompt_tokens'] = usage.get('promptTokenCount', call['prompt_tokens'])
+        call['response_tokens'] = usage.get('candidatesTokenCount', estimate_tokens(text))
+    return text
+
+
+async def _generate(prompt, model, max_output_tokens):
+    """(text, usageMetadata) for one generateContent request"""
+    payload = {'contents': [{'parts': [{'text': prompt}]}]}
+    if max_output_tokens:
+        payload['generationConfig'] = {'maxOutputTokens': max_output_tokens}
+
+    response = await get_client().post(
+        GEMINI_API_URL.format(model=model),
+        params={'key': settings.GEMINI_API_KEY},
+        json=payload,
+    )
+
+    if response.status_code >= 400:
+        # Proxies and gateways answer 502/503/504 with HTML, not Gemini's JSON error
+        try:
+            error = response.json().get('error', {})
+        except (ValueError, AttributeError):
+            error = {'message': response.text[:200]}
+        # Keep status names (API_KEY_INVALID, RESOURCE_EXHAUSTED...) so callers can classify errors
+        details = ' '.join(detail.get('reason', '') for detail in error.get('details', []))
+        raise GeminiError(f"{response.status_code} {error.get('status', '')} {details} {error.get('message', '')}".strip())
+
+    data = response.json()
+    candidates = data.get('candidates') or []
+    if not candidates:
+        reason = data.get('promptFeedback', {}).get('blockReason', 'no candidates returned')
+        raise GeminiError(f"Prompt BLOCKED: {reason}")
+
+    parts = candidates[0].get('content', {}).get('parts', [])
+    return ''.join(part.get('text', '') for part in parts), data.get('usageMetadata', {})
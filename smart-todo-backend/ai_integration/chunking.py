@@ -0,0 +1,86 @@
+import re
+
+# Rough heuristic used by Gemini docs: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Lines that start a new message in WhatsApp exports and email threads
+MESSAGE_BOUNDARY = re.compile(
+    r'^(?:'
+    r'\[?\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4},?\s+\d{1,2}:\d{2}'   # WhatsApp: "12/08/2025, 10:15 - Name:"
+    r'|From:\s'                                               # Email headers
+    r'|On .{5,200} wrote:\s*$'                                # Quoted reply marker
+    r'|-{2,}\s*(?:Original|Forwarded) Message\s*-{2,}'        # Outlook / Gmail separators
+    r')',
+    re.IGNORECASE
+)
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """Cheap token estimate - good enough for budgeting prompts"""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_messages(content):
+    """Split content on message boundaries, falling back to paragraphs"""
+    lines = content.splitlines()
+    starts = [i for i, line in enumerate(lines) if MESSAGE_BOUNDARY.match(line.strip())]
+
+    if len(starts) > 1:
+        if starts[0] != 0:
+            starts.insert(0, 0)
+        starts.append(len(lines))
+        units = ['\n'.join(lines[start:end]).strip() for start, end in zip(starts, starts[1:])]
+    else:
+        units = [part.strip() for part in PARAGRAPH_BREAK.split(content)]
+
+    return [unit for unit in units if unit]
+
+
+def _split_oversized(unit, max_tokens):
+    """Break a single unit that is larger than the budget into sentences, then words"""
+    pieces = []
+    for sentence in SENTENCE_BREAK.split(unit):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+
+        # Hard wrap very long sentences (logs, pasted tables, etc.)
+        words, current = sentence.split(), []
+        for word in words:
+            if current and estimate_tokens(' '.join(current + [word])) > max_tokens:
+                pieces.append(' '.join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(' '.join(current))
+    return pieces
+
+
+def chunk_content(content, max_tokens):
+    """Pack content into chunks of at most ``max_tokens`` on natural boundaries"""
+    if estimate_tokens(content) <= max_tokens:
+        return [content]
+
+    units = []
+    for unit in split_messages(content):
+        if estimate_tokens(unit) > max_tokens:
+            units.extend(_split_oversized(unit, max_tokens))
+        else:
+            units.append(unit)
+
+    chunks, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+
+    return chunks
@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KNOWN_CATEGORIES = ['Work', 'Personal', 'Health', 'Learning', 'Family', 'Finance', 'Travel', 'Shopping']
+KNOWN_PRIORITIES = ['urgent', 'high', 'medium', 'low']
+
+# numpy is imported only where a model is trained or loaded, so classify_locally
+# costs nothing in processes that never had a classifier trained
+N_FEATURES = 2 ** 16
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+LATEST_POINTER = 'LATEST'
+
+
+def hashed_features(text, n_features=N_FEATURES):
+    """Unigram + bigram counts hashed into a fixed feature space"""
+    tokens = TOKEN_RE.findall((text or '').lower())
+    grams = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    features = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode('utf-8')) % n_features
+        features[index] = features.get(index, 0) + 1
+    return features
+
+
+class NaiveBayesHead:
+    """Multinomial naive Bayes over hashed n-gram counts"""
+
+    def __init__(self, classes=None, class_log_prior=None, feature_log_prob=None):
+        self.classes = list(classes) if classes is not None else []
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob
+
+    def fit(self, samples, labels, alpha=1.0, n_features=N_FEATURES):
+        import numpy as np
+
+        self.classes = sorted(set(labels))
+        class_index = {label: i for i, label in enumerate(self.classes)}
+        counts = np.zeros((len(self.classes), n_features), dtype=np.float64)
+        class_totals = np.zeros(len(self.classes), dtype=np.float64)
+
+        for features, label in zip(samples, labels):
+            row = class_index[label]
+            class_totals[row] += 1
+            if features:
+                counts[row, list(features.keys())] += list(features.values())
+
+        smoothed = counts + alpha
+        self.feature_log_prob = (np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))).astype(np.float32)
+        self.class_log_prior = np.log(class_totals / class_totals.sum()).astype(np.float32)
+        return self
+
+    def predict(self, features):
+        """Return (label, confidence) for one sample"""
+        import numpy as np
+
+        if not features:
+            return None, 0.0
+        indices = np.fromiter(features.keys(), dtype=np.int64)
+        values = np.fromiter(features.values(), dtype=np.float32)
+        joint = self.class_log_prior + self.feature_log_prob[:, indices] @ values
+        joint = joint - joint.max()
+        probabilities = np.exp(joint)
+        probabilities /= probabilities.sum()
+        best = int(probabilities.argmax())
+        return self.classes[best], float(probabilities[best])
+
+
+class LocalClassifier:
+    """Category + priority classifier trained on stored Gemini outputs"""
+
+    HEADS = ('category', 'priority')
+
+    def __init__(self, heads=None, version=0, metadata=None):
+        self.heads = heads or {}
+        self.version = version
+        self.metadata = metadata or {}
+
+    def fit(self, texts, labels_by_head):
+        samples = [hashed_features(text) for text in texts]
+        for head in self.HEADS:
+            rows = [(features, label) for features, label in zip(samples, labels_by_head[head]) if label]
+            if len({label for _, label in rows}) > 1:
+                self.heads[head] = NaiveBayesHead().fit(*zip(*rows))
+        return self
+
+    def predict(self, text):
+        """Return {head: (label, confidence)} for every trained head"""
+        features = hashed_features(text)
+        return {name: head.predict(features) for name, head in self.heads.items()}
+
+    def save(self, directory):
+        import numpy as np
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        filename = f'classifier-v{self.version:04d}.npz'
+
+        arrays = {}
+        for name, head in self.heads.items():
+            arrays[f'{name}__classes'] = np.array(head.classes)
+            arrays[f'{name}__prior'] = head.class_log_prior
+            arrays[f'{name}__feature_log_prob'] = head.feature_log_prob
+        arrays['metadata'] = np.array(json.dumps({**self.metadata, 'version': self.version}))
+        np.savez_compressed(directory / filename, **arrays)
+
+        # Swap the pointer atomically so running workers never see a half-written model
+        pointer_tmp = directory / f'{LATEST_POINTER}.tmp'
+        pointer_tmp.write_text(filename)
+        os.replace(pointer_tmp, directory / LATEST_POINTER)
+        return directory / filename
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            heads = {}
+            for name in cls.HEADS:
+                if f'{name}__classes' in data:
+                    heads[name] = NaiveBayesHead(
+                        classes=[str(label) for label in data[f'{name}__classes']],
+                        class_log_prior=data[f'{name}__prior'],
+                        feature_log_prob=data[f'{name}__feature_log_prob'],
+                    )
+        return cls(heads=heads, version=metadata.get('version', 0), metadata=metadata)
+
+
+def next_version(directory):
+    """Next free model version number in the model directory"""
+    versions = [
+        int(match.group(1))
+        for match in (re.match(r'classifier-v(\d+)\.npz$', path.name) for path in Path(directory).glob('classifier-v*.npz'))
+        if match
+    ]
+    return max(versions, default=0) + 1
+
+
+_cache_lock = threading.Lock()
+_cached = {'mtime': None, 'classifier': None}
+
+
+def get_classifier():
+    """Latest trained classifier, reloaded when the LATEST pointer changes"""
+    pointer = Path(settings.AI_CLASSIFIER_DIR) / LATEST_POINTER
+    try:
+        mtime = pointer.stat().st_mtime
+    except OSError:
+        return None
+
+    if _cached['mtime'] == mtime:
+        return _cached['classifier']
+
+    with _cache_lock:
+        if _cached['mtime'] != mtime:
+            try:
+                _cached['classifier'] = LocalClassifier.load(pointer.parent / pointer.read_text().strip())
+                logger.info(f"Loaded local classifier v{_cached['classifier'].version}")
+            except Exception as e:
+                logger.error(f"Failed to load local classifier: {str(e)}")
+                _cached['classifier'] = None
+            _cached['mtime'] = mtime
+    return _cached['classifier']
+
+
+def classify_locally(text):
+    """Return a confident local prediction or None so the caller escalates to Gemini"""
+    if not settings.LOCAL_CLASSIFIER_ENABLED:
+        return None
+
+    classifier = get_classifier()
+    if classifier is None or set(classifier.heads) != set(LocalClassifier.HEADS):
+        return None
+
+    prediction = classifier.predict(text)
+    threshold = settings.CATEGORY_CONFIDENCE_THRESHOLD
+    if any(confidence < threshold for _, confidence in prediction.values()):
+        return None
+
+    return {
+        'category': prediction['category'][0],
+        'category_confidence': prediction['category'][1],
+        'priority': prediction['priority'][0],
+        'priority_confidence': prediction['priority'][1],
+        'version': classifier.version,
+    }
+
+
+def first_match(text, vocabulary):
+    """First vocabulary word mentioned in ``text`` (case-insensitive)"""
+    lowered = (text or '').lower()
+    positions = [(lowered.find(word.lower()), word) for word in vocabulary]
+    positions = [(pos, word) for pos, word in positions if pos >= 0]
+    return min(positions)[1] if positions else None
+
+
+def collect_training_data():
+    """
+    Build (texts, labels) from Gemini-processed context entries and tasks.
+
+    Rows the local classifier or the fallback analysis labelled are left out,
+    so the model never learns from its own (or canned) predictions.
+    """
+    from context.models import ContextEntry, insight_label
+    from tasks.models import Task
+
+    texts, categories, priorities = [], [], []
+
+    entries = ContextEntry.objects.filter(processing_status='processed', ai_engine='gemini').values_list('content', 'processed_insights')
+    for content, insights in entries.iterator(chunk_size=500):
+        category = priority = None
+        for line in insights or []:
+            label = insight_label(line)
+            if label == 'category' and category is None:
+                category = first_match(line.partition(':')[2], KNOWN_CATEGORIES)
+            elif label == 'priority' and priority is None:
+                priority = first_match(line.partition(':')[2], KNOWN_PRIORITIES)
+        if category or priority:
+            texts.append(content[:4000])
+            categories.append(category)
+            priorities.append(priority)
+
+    tasks = Task.objects.filter(ai_enhanced=True, ai_engine='gemini').values_list('title', 'description', 'ai_suggestions')
+    for title, description, suggestions in tasks.iterator(chunk_size=500):
+        category = priority = None
+        for line in suggestions or []:
+            if 'Category Optimization:' in line and category is None:
+                category = first_match(line.partition(':')[2], KNOWN_CATEGORIES)
+            elif 'Priority Analysis:' in line and priority is None:
+                priority = first_match(line.partition(':')[2], KNOWN_PRIORITIES)
+        if category or priority:
+            texts.append(f"{title} {description or ''}")
+            categories.append(category)
+            priorities.append(priority)
+
+    return texts, {'category': categories, 'priority': priorities}
+
+
+def train_and_save(directory=None, data=None, holdout=0.2, seed=42):
+    """Train a new classifier version from the database and persist it"""
+    import numpy as np
+
+    directory = Path(directory or settings.AI_CLASSIFIER_DIR)
+    texts, labels = data or collect_training_data()
+
+    # Shuffled holdout split for a quick accuracy estimate
+    order = np.random.default_rng(seed).permutation(len(texts))
+    split = int(len(texts) * (1 - holdout)) if len(texts) >= 20 else len(texts)
+    train_idx, test_idx = order[:split], order[split:]
+
+    def pick(values, idx):
+        return [values[i] for i in idx]
+
+    evaluation = LocalClassifier().fit(
+        pick(texts, train_idx),
+        {head: pick(values, train_idx) for head, values in labels.items()}
+    )
+
+    accuracy = {}
+    for head, model in evaluation.heads.items():
+        rows = [(texts[i], labels[head][i]) for i in test_idx if labels[head][i]]
+        if rows:
+            correct = sum(model.predict(hashed_features(text))[0] == label for text, label in rows)
+            accuracy[head] = round(correct / len(rows), 3)
+
+    # The shipped model is trained on everything
+    classifier = LocalClassifier().fit(texts, labels)
+    classifier.version = next_version(directory)
+    classifier.metadata = {
+        'trained_at': timezone.now().isoformat(),
+        'samples': len(texts),
+        'holdout_accuracy': accuracy,
+    }
+    path = classifier.save(directory)
+    return classifier, path
@@ -0,0 +1,21 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import owner_group
+
+
+class AIEventsConsumer(AsyncJsonWebsocketConsumer):
+    """Streams task.enhanced / task.reminder / context.processed / context.failed events to the frontend"""
+
+    async def connect(self):
+        # Only the events of the session user's partition (anonymous clients share one, like the REST API)
+        user = self.scope.get('user')
+        self.group = owner_group(user if user is not None and user.is_authenticated else None)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def ai_event(self, message):
+        await self.send_json({'event': message['event'], 'data': message['data']})
@@ -0,0 +1,39 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from smart_todo.ownership import owner_key
+
+logger = logging.getLogger(__name__)
+
+
+def owner_group(owner):
+    """Channel group of one owner's sockets - events carry task and entry content, so never broadcast"""
+    return f'ai-events.{owner_key(owner)}'
+
+
+def _message(event, data):
+    return {'type': 'ai.event', 'event': event, 'data': data}
+
+
+def publish(event, data, owner):
+    """Push an AI completion event to ``owner``'s WebSocket clients - never fails the caller"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(owner_group(owner), _message(event, data))
+    except Exception as e:
+        logger.warning(f"Could not publish {event} event: {str(e)}")
+
+
+async def apublish(event, data, owner):
+    """Async publish for code already running on the event loop"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        await layer.group_send(owner_group(owner), _message(event, data))
+    except Exception as e:
+        logger.warning(f"Could not publish {event} event: {str(e)}")
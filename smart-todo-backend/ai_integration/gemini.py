@@ -0,0 +1,49 @@
+import contextlib
+import threading
+
+from django.conf import settings
+
+from smart_todo.performance import timed
+
+from .chunking import estimate_tokens
+from .telemetry import track_call
+
+# The SDK drags in grpc/protobuf (~0.7s), so it is only imported on first use
+_models = {}
+_lock = threading.Lock()
+
+
+def get_model(name=None):
+    """Configured Gemini GenerativeModel, loading the SDK on first call"""
+    name = name or settings.AI_MODEL
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                model = _models[name] = genai.GenerativeModel(name)
+    return model
+
+
+def generate_content(prompt, model=None, call_site='unknown', **kwargs):
+    """Blocking Gemini call, timed for the current request and recorded in the call ledger"""
+    model = model or settings.AI_MODEL
+    with timed('ai'), track_call(call_site, model, prompt) as call:
+        response = get_model(model).generate_content(prompt, **kwargs)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            call['prompt_tokens'] = usage.prompt_token_count
+            call['response_tokens'] = usage.candidates_token_count
+        else:
+            with contextlib.suppress(ValueError):
+                call['response_tokens'] = estimate_tokens(response.text)
+    return response
+
+
+def sdk_loaded():
+    """Whether the Gemini SDK has been imported in this process"""
+    import sys
+    return 'google.generativeai' in sys.modules
@@ -0,0 +1,67 @@
+import importlib.util
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Libraries the AI integration needs, checked without importing them
+REQUIRED_LIBRARIES = {
+    'google.generativeai': 'google-generativeai',
+    'rest_framework': 'djangorestframework',
+    'corsheaders': 'django-cors-headers',
+    'httpx': 'httpx',
+    'channels': 'channels',
+}
+
+
+def _enabled(flag):
+    return ' ENABLED' if flag else ' DISABLED'
+
+
+class Command(BaseCommand):
+    help = 'Print the AI integration configuration and check required libraries'
+
+    def handle(self, *args, **options):
+        write = self.stdout.write
+        database = settings.DATABASES['default']
+
+        write("=" * 70)
+        write(" SMART TODO - AI INTEGRATION STATUS")
+        write("=" * 70)
+        write(f" GEMINI_API_KEY: {' Loaded' if settings.GEMINI_API_KEY else ' Missing'}")
+        if settings.GEMINI_API_KEY:
+            write(f" Key Preview: {settings.GEMINI_API_KEY[:15]}...{settings.GEMINI_API_KEY[-8:]}")
+        write(f" AI Provider: {settings.AI_PROVIDER}")
+        write(f" AI Model: {settings.AI_MODEL}")
+        write(f"  AI Temperature: {settings.AI_TEMPERATURE}")
+        write(f" Max Tokens: {settings.AI_MAX_TOKENS}")
+        write(f" Timeout: {settings.AI_TIMEOUT}s")
+        write("")
+        write("  AI FEATURES STATUS:")
+        for feature, enabled in settings.AI_FEATURES.items():
+            write(f"   - {feature.replace('_', ' ').title()}: {_enabled(enabled)}")
+        write("")
+        write(" ASSIGNMENT REQUIREMENTS:")
+        for requirement, status in settings.ASSIGNMENT_REQUIREMENTS.items():
+            write(f"   {requirement.replace('_', ' ').title()}: {status}")
+        write("")
+        write(f" Context Analysis: {_enabled(settings.CONTEXT_ANALYSIS_ENABLED)}")
+        write(f" Priority Scoring: {_enabled(settings.PRIORITY_SCORING_ENABLED)}")
+        write(f" Deadline Suggestions: {_enabled(settings.DEADLINE_SUGGESTION_ENABLED)}")
+        write(f"  Auto Categorization: {_enabled(settings.AUTO_CATEGORIZATION)}")
+        write(f" AI Cache: {_enabled(settings.AI_CACHE_ENABLED)}")
+        write("")
+        write(f" Database: {database['NAME']} @ {database.get('HOST', '')}")
+        write(f" Environment: DEBUG={settings.DEBUG}")
+        write("")
+
+        missing = 0
+        for module, package in REQUIRED_LIBRARIES.items():
+            if importlib.util.find_spec(module) is None:
+                missing += 1
+                write(self.style.ERROR(f" {package} not found. Install with: pip install {package}"))
+            else:
+                write(f" {package} available")
+        write("=" * 70)
+
+        if missing:
+            self.stderr.write(self.style.WARNING(f"{missing} required librar{'y' if missing == 1 else 'ies'} missing"))
@@ -0,0 +1,71 @@
+import json
+import os
+import statistics
+import subprocess
+import time
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Each scenario runs in a fresh interpreter and prints which heavy SDKs it loaded
+SCENARIOS = {
+    'check': [sys.executable, 'manage.py', 'check'],
+    'worker boot (ASGI)': [sys.executable, '-c', (
+        "from smart_todo.asgi import application; "
+        "from ai_integration.gemini import sdk_loaded; print('SDK', sdk_loaded())"
+    )],
+    'worker boot (WSGI)': [sys.executable, '-c', (
+        "from smart_todo.wsgi import application; "
+        "from ai_integration.gemini import sdk_loaded; print('SDK', sdk_loaded())"
+    )],
+    'test suite startup': [sys.executable, '-c', (
+        "import django; django.setup(); "
+        "from django.test.runner import DiscoverRunner; "
+        "DiscoverRunner(verbosity=0).build_suite(['tasks', 'context', 'ai_integration']); "
+        "from ai_integration.gemini import sdk_loaded; print('SDK', sdk_loaded())"
+    )],
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time of manage.py check, worker boot and test-suite startup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per scenario')
+        parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'smart_todo.settings')}
+        results = {}
+        for name, command in SCENARIOS.items():
+            timings, sdk_loaded = [], False
+            for _ in range(options['repeat']):
+                timing, output = self.run_scenario(command, env)
+                timings.append(timing)
+                sdk_loaded = sdk_loaded or 'SDK True' in output
+            results[name] = {
+                'min_ms': round(min(timings) * 1000, 1),
+                'median_ms': round(statistics.median(timings) * 1000, 1),
+                'gemini_sdk_loaded': sdk_loaded,
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for name, result in results.items():
+            sdk = ' (Gemini SDK imported!)' if result['gemini_sdk_loaded'] else ''
+            self.stdout.write(f"{name:<22} min {result['min_ms']:>8.1f} ms   median {result['median_ms']:>8.1f} ms{sdk}")
+
+    def run_scenario(self, command, env):
+        """Wall-clock seconds for one fresh-interpreter run"""
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise CommandError(f"{' '.join(command[:3])} failed:\n{completed.stderr[-2000:]}")
+        return elapsed, completed.stdout
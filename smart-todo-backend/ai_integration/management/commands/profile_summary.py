@@ -0,0 +1,82 @@
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def load_stacks(paths, focus=None):
+    """Merge collapsed-stack files, keeping only stacks through ``focus`` (trimmed to start there)"""
+    stacks = Counter()
+    for path in paths:
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(' ')
+            if not stack:
+                continue
+            if focus:
+                frames = stack.split(';')
+                start = next((i for i, frame in enumerate(frames) if focus in frame), None)
+                if start is None:
+                    continue
+                stack = ';'.join(frames[start:])
+            stacks[stack] += int(count)
+    return stacks
+
+
+def top_functions(stacks, limit):
+    """(self samples, total samples) per function, busiest first"""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    return [(name, own[name], total[name]) for name, _ in own.most_common(limit)], total.most_common(limit)
+
+
+class Command(BaseCommand):
+    help = 'Merge stored request profiles per endpoint and print the hottest functions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', help='Only these view labels (repeatable)')
+        parser.add_argument('--focus', help='Only stacks through a matching frame, e.g. generate_fallback_insights')
+        parser.add_argument('--hours', type=float, help='Only profiles stored in the last N hours')
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--output', help='Write the merged collapsed stacks here (flamegraph.pl / speedscope input)')
+
+    def handle(self, *args, **options):
+        root = Path(settings.PROFILE_DIR)
+        if not root.is_dir():
+            raise CommandError(f'No profiles stored in {root}')
+
+        since = time.time() - options['hours'] * 3600 if options['hours'] else 0
+        endpoints = sorted(
+            path for path in root.iterdir()
+            if path.is_dir() and (not options['endpoint'] or path.name in options['endpoint'])
+        )
+        merged = Counter()
+        for directory in endpoints:
+            files = [path for path in directory.glob('*.folded') if path.stat().st_mtime >= since]
+            stacks = load_stacks(files, options['focus'])
+            samples = sum(stacks.values())
+            if not samples:
+                continue
+            merged.update({f'{directory.name};{stack}': count for stack, count in stacks.items()})
+
+            self.stdout.write(f'\n{directory.name}: {len(files)} profiles, {samples} samples')
+            by_self, by_total = top_functions(stacks, options['top'])
+            self.stdout.write('  self%   total%  function')
+            for name, own, total in by_self:
+                self.stdout.write(f'  {own * 100 / samples:5.1f}  {total * 100 / samples:6.1f}  {name}')
+            self.stdout.write('  hottest inclusive:')
+            for name, total in by_total[:5]:
+                self.stdout.write(f'         {total * 100 / samples:6.1f}  {name}')
+
+        if not merged:
+            raise CommandError('No matching samples')
+        if options['output']:
+            Path(options['output']).write_text(
+                '\n'.join(f'{stack} {count}' for stack, count in merged.most_common()) + '\n'
+            )
+            self.stdout.write(f"\nMerged stacks written to {options['output']}")
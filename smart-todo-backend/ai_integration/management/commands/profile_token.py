@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from smart_todo.profiling import PROFILE_HEADER, make_profile_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed X-Profile-Token header that turns on the sampling profiler for one endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'endpoint', nargs='?', default='*',
+            help="View label such as ContextEntryViewSet.stats or TaskViewSet.contextual_analysis (default: any)"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{PROFILE_HEADER}: {make_profile_token(options['endpoint'])}")
+        self.stderr.write(f"Valid for {settings.PROFILE_TOKEN_MAX_AGE}s; profiles land in {settings.PROFILE_DIR}")
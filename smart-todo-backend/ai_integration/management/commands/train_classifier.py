@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_integration.classifier import collect_training_data, train_and_save
+
+
+class Command(BaseCommand):
+    help = 'Train the local category/priority classifier from stored Gemini outputs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-samples', type=int, default=settings.LOCAL_CLASSIFIER_MIN_SAMPLES,
+            help='Refuse to train with fewer labeled examples than this'
+        )
+        parser.add_argument(
+            '--output-dir', default=None,
+            help='Model directory (defaults to AI_CLASSIFIER_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        data = collect_training_data()
+        texts = data[0]
+        if len(texts) < options['min_samples']:
+            raise CommandError(
+                f"Only {len(texts)} labeled examples found - need at least {options['min_samples']}"
+            )
+
+        classifier, path = train_and_save(directory=options['output_dir'], data=data)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained classifier v{classifier.version} on {classifier.metadata['samples']} examples -> {path}"
+        ))
+        for head, accuracy in classifier.metadata['holdout_accuracy'].items():
+            self.stdout.write(f"   - {head} holdout accuracy: {accuracy:.1%}")
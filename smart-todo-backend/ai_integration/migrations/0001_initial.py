@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-18 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICallRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('call_site', models.CharField(max_length=40)),
+                ('model', models.CharField(max_length=40)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('response_tokens', models.PositiveIntegerField(default=0)),
+                ('latency_ms', models.FloatField()),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('error_class', models.CharField(blank=True, max_length=60)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['call_site', 'created_at'], name='ai_integrat_call_si_a5e75f_idx')],
+            },
+        ),
+    ]
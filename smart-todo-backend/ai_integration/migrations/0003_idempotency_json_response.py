@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-19 06:20
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def drop_claims(apps, schema_editor):
+    # Pickled records can't be read back as JSON; retries within the TTL simply run again
+    apps.get_model('ai_integration', 'IdempotencyKey').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_integration', '0002_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_claims, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='idempotencykey',
+            name='response',
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='response',
+            field=models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+    ]
@@ -1,3 +1,34 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
- 
\ No newline at end of file
+
+class AICallRecord(models.Model):
+    """One Gemini call - append-only ledger written in batches by ai_integration.telemetry"""
+    created_at = models.DateTimeField(db_index=True)
+    call_site = models.CharField(max_length=40)  # 'task.enhance', 'context.analyze_chunk'...
+    model = models.CharField(max_length=40)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    response_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.FloatField()
+    cache_hit = models.BooleanField(default=False)
+    retries = models.PositiveSmallIntegerField(default=0)
+    error_class = models.CharField(max_length=60, blank=True)  # empty on success
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['call_site', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.call_site} {self.model} {self.latency_ms:.0f}ms {self.error_class or 'ok'}"
+
+
+class IdempotencyKey(models.Model):
+    """Claim and stored response of one Idempotency-Key (smart_todo.idempotency) - the primary key makes claiming atomic"""
+    key = models.CharField(max_length=64, primary_key=True)  # hash of owner, endpoint and header value
+    fingerprint = models.CharField(max_length=64)  # hash of the request body
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)  # response record, NULL while the first request runs
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.key[:12]} {'done' if self.response is not None else 'pending'}"
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import AIEventsConsumer
+
+websocket_urlpatterns = [
+    path('ws/ai-events/', AIEventsConsumer.as_asgi()),
+]
@@ -0,0 +1,128 @@
+import atexit
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Aggregate, FloatField
+from django.utils import timezone
+
+from .chunking import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class CallLedger:
+    """
+    Buffers AI call records in memory and bulk-inserts them from a daemon thread.
+
+    Requests only append to a deque; the flusher wakes every
+    AI_TELEMETRY_FLUSH_INTERVAL seconds (or once AI_TELEMETRY_BATCH_SIZE records
+    are waiting). When the database is unreachable the oldest records beyond
+    AI_TELEMETRY_MAX_BUFFER are dropped rather than growing without bound.
+    """
+
+    def __init__(self):
+        self._buffer = deque(maxlen=settings.AI_TELEMETRY_MAX_BUFFER)
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def record(self, **fields):
+        if not settings.AI_TELEMETRY_ENABLED:
+            return
+        fields.setdefault('created_at', timezone.now())
+        self._buffer.append(fields)
+        self._ensure_thread()
+        if len(self._buffer) >= settings.AI_TELEMETRY_BATCH_SIZE:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ai-telemetry-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.AI_TELEMETRY_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            close_old_connections()
+
+    def flush(self):
+        """Write everything buffered so far - returns the number of records written"""
+        from .models import AICallRecord
+
+        batch = []
+        while self._buffer and len(batch) < 5000:
+            batch.append(self._buffer.popleft())
+        if not batch:
+            return 0
+        try:
+            AICallRecord.objects.bulk_create([AICallRecord(**fields) for fields in batch], batch_size=500)
+        except Exception as e:
+            logger.warning(f"Dropped {len(batch)} AI telemetry records: {str(e)}")
+            return 0
+        return len(batch)
+
+
+ledger = CallLedger()
+atexit.register(ledger.flush)
+
+
+@contextlib.contextmanager
+def track_call(call_site, model, prompt, cache_hit=False, retries=0):
+    """
+    Record one AI call in the ledger. The yielded dict can be updated with
+    exact token counts; otherwise they are estimated from the prompt.
+    """
+    call = {
+        'call_site': call_site,
+        'model': model,
+        'prompt_tokens': estimate_tokens(prompt),
+        'response_tokens': 0,
+        'cache_hit': cache_hit,
+        'retries': retries,
+        'error_class': '',
+    }
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call['error_class'] = type(e).__name__
+        raise
+    finally:
+        call['latency_ms'] = (time.perf_counter() - start) * 1000
+        ledger.record(**call)
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL percentile_cont(p) WITHIN GROUP (ORDER BY expression)"""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list (matches percentile_cont)"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def estimated_cost(model, prompt_tokens, response_tokens):
+    """USD estimate from AI_TOKEN_PRICES (per million tokens)"""
+    prompt_price, response_price = settings.AI_TOKEN_PRICES.get(model, (0, 0))
+    return ((prompt_tokens or 0) * prompt_price + (response_tokens or 0) * response_price) / 1_000_000
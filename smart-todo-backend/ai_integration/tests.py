@@ -1,3 +1,224 @@
-from django.test import TestCase
+import asyncio
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+from unittest import mock
 
- 
\ No newline at end of file
+import httpx
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from context.models import ContextEntry
+from smart_todo.testing import LOCAL_CACHES
+from tasks.models import Task
+from .async_client import GeminiError, agenerate_content
+from .chunking import chunk_content, estimate_tokens
+from .classifier import collect_training_data
+from .consumers import AIEventsConsumer
+from .events import apublish
+from .gemini import generate_content
+from .models import AICallRecord
+from .telemetry import CallLedger, percentile, track_call
+
+
+class ChunkContentTests(SimpleTestCase):
+    thread = '\n'.join(
+        f'12/08/2025, 10:{minute:02d} - Sam: Message {minute} about the venue booking and the catering order.'
+        for minute in range(30)
+    )
+
+    def test_short_content_is_returned_unchanged(self):
+        content = 'Call the bank.\n\nThen book the venue.'
+        self.assertEqual(chunk_content(content, 100), [content])
+
+    def test_threads_split_between_messages_within_the_budget(self):
+        chunks = chunk_content(self.thread, 100)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 100)
+            self.assertTrue(chunk.startswith('12/08/2025'))
+            self.assertTrue(chunk.endswith('catering order.'))
+
+    def test_chunks_cover_every_message_exactly_once(self):
+        chunks = chunk_content(self.thread, 100)
+        self.assertEqual('\n'.join('\n\n'.join(chunks).split('\n\n')), self.thread)  # no overlap, nothing dropped
+
+    def test_paragraphs_and_oversized_sentences_are_split_on_smaller_boundaries(self):
+        paragraphs = ['First paragraph. ' * 10, 'Second paragraph. ' * 10]
+        self.assertEqual(chunk_content('\n\n'.join(paragraphs), 60), [part.strip() for part in paragraphs])
+
+        chunks = chunk_content('word ' * 200, 50)
+        self.assertEqual(' '.join(chunks).split(), ['word'] * 200)
+        self.assertTrue(all(estimate_tokens(chunk) <= 50 for chunk in chunks))
+
+
+@override_settings(CACHES=LOCAL_CACHES, AI_TOKEN_PRICES={'gemini-test': (1.0, 2.0)})
+class CallLedgerTests(TestCase):
+    def setUp(self):
+        self.ledger = CallLedger()
+        for target in ('ai_integration.telemetry.ledger', 'ai_integration.telemetry.CallLedger._ensure_thread'):
+            patcher = mock.patch(target, self.ledger if target.endswith('ledger') else mock.DEFAULT)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def call(self, call_site='task.enhance', error=None, **usage):
+        with track_call(call_site, 'gemini-test', 'x' * 400) as call:
+            call.update(usage)
+            if error:
+                raise error
+
+    def test_calls_are_buffered_until_flushed(self):
+        self.call(prompt_tokens=120, response_tokens=30)
+        with self.assertRaises(TimeoutError):
+            self.call(error=TimeoutError())
+        self.assertFalse(AICallRecord.objects.exists())
+
+        self.assertEqual(self.ledger.flush(), 2)
+        rows = list(AICallRecord.objects.order_by('id').values_list('prompt_tokens', 'response_tokens', 'error_class'))
+        self.assertEqual(rows, [(120, 30, ''), (101, 0, 'TimeoutError')])  # prompt tokens estimated when not reported
+        self.assertEqual(self.ledger.flush(), 0)
+
+    @override_settings(AI_TELEMETRY_MAX_BUFFER=3)
+    def test_the_oldest_records_are_dropped_beyond_the_buffer_limit(self):
+        ledger = CallLedger()
+        with mock.patch('ai_integration.telemetry.ledger', ledger):
+            for call_site in ('a', 'b', 'c', 'd'):
+                self.call(call_site)
+        ledger.flush()
+        self.assertEqual(sorted(AICallRecord.objects.values_list('call_site', flat=True)), ['b', 'c', 'd'])
+
+    def test_gemini_usage_metadata_is_recorded(self):
+        response = SimpleNamespace(text='ok', usage_metadata=SimpleNamespace(prompt_token_count=7, candidates_token_count=3))
+        with mock.patch('ai_integration.gemini.get_model') as get_model:
+            get_model.return_value.generate_content.return_value = response
+            generate_content('Hello', 'gemini-test', call_site='context.analyze')
+        self.ledger.flush()
+        record = AICallRecord.objects.get()
+        self.assertEqual((record.call_site, record.model, record.prompt_tokens, record.response_tokens), ('context.analyze', 'gemini-test', 7, 3))
+
+    def test_telemetry_aggregates_latency_errors_and_cost(self):
+        for _ in range(3):
+            self.call(prompt_tokens=1000, response_tokens=500)
+        with self.assertRaises(RuntimeError):
+            self.call(error=RuntimeError('quota'))
+        self.ledger.flush()
+        AICallRecord.objects.filter(error_class='').update(latency_ms=100)
+        AICallRecord.objects.filter(error_class='RuntimeError').update(latency_ms=500)
+
+        data = self.client.get('/api/ai/telemetry/', {'days': 1}).json()
+        [site] = data['call_sites']
+        self.assertEqual((site['call_site'], site['calls'], site['errors'], site['error_rate']), ('task.enhance', 4, 1, 0.25))
+        self.assertEqual((site['p50_latency_ms'], site['p99_latency_ms']), (100.0, 488.0))
+        [day] = data['tokens_per_day']
+        self.assertEqual((day['calls'], day['prompt_tokens'], day['response_tokens']), (4, 3101, 1500))
+        self.assertEqual(day['estimated_cost_usd'], round((3101 * 1.0 + 1500 * 2.0) / 1_000_000, 6))
+        self.assertEqual(self.client.get('/api/ai/telemetry/', {'days': 'week'}).status_code, 400)
+
+    def test_percentile_interpolates_like_percentile_cont(self):
+        self.assertEqual(percentile([10, 20, 30, 40], 0.5), 25)
+        self.assertIsNone(percentile([], 0.5))
+
+
+class AsyncClientTests(SimpleTestCase):
+    def generate(self, status, **body):
+        transport = httpx.MockTransport(lambda request: httpx.Response(status, **body))
+        with mock.patch('ai_integration.async_client.get_client', return_value=httpx.AsyncClient(transport=transport)), \
+                mock.patch('ai_integration.telemetry.ledger'):
+            return async_to_sync(agenerate_content)('Hello', 'gemini-test')
+
+    def test_the_reply_text_is_returned(self):
+        reply = {'candidates': [{'content': {'parts': [{'text': 'Hi'}, {'text': ' there'}]}}]}
+        self.assertEqual(self.generate(200, json=reply), 'Hi there')
+
+    def test_errors_are_raised_before_the_body_is_parsed(self):
+        with self.assertRaisesMessage(GeminiError, '429 RESOURCE_EXHAUSTED'):
+            self.generate(429, json={'error': {'status': 'RESOURCE_EXHAUSTED', 'message': 'Quota exceeded'}})
+        with self.assertRaisesRegex(GeminiError, r'^502 .*<html>Bad Gateway</html>'):
+            self.generate(502, text='<html>Bad Gateway</html>')
+
+
+class AIEventsConsumerTests(SimpleTestCase):
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(AIEventsConsumer.as_asgi(), '/ws/ai-events/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_events_only_reach_their_owner(self):
+        user = SimpleNamespace(pk=7, is_authenticated=True)
+        anonymous = await self.connect(AnonymousUser())
+        owner = await self.connect(user)
+        try:
+            await apublish('task.enhanced', {'id': 1}, user.pk)
+            self.assertEqual(await owner.receive_json_from(timeout=1), {'event': 'task.enhanced', 'data': {'id': 1}})
+            self.assertTrue(await anonymous.receive_nothing(timeout=0.2))
+
+            await apublish('task.enhanced', {'id': 2}, None)
+            self.assertEqual((await anonymous.receive_json_from(timeout=1))['data'], {'id': 2})
+            self.assertTrue(await owner.receive_nothing(timeout=0.2))
+        finally:
+            await anonymous.disconnect()
+            await owner.disconnect()
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TrainingDataTests(TestCase):
+    def test_only_gemini_labelled_rows_are_collected(self):
+        insights = [' Priority: High - due today', ' Category: Work - client meeting']
+        for engine in ('gemini', 'local', 'fallback', ''):
+            ContextEntry.objects.create(
+                content=f'{engine} entry', processing_status='processed', processed_insights=insights, ai_engine=engine
+            )
+        suggestions = [' Priority Analysis: Urgent priority fits', ' Category Optimization: Health is the best fit']
+        Task.objects.bulk_create([
+            Task(title=f'{engine} task', ai_enhanced=True, ai_suggestions=suggestions, ai_engine=engine)
+            for engine in ('gemini', 'local')
+        ])
+
+        texts, labels = collect_training_data()
+        self.assertEqual(texts, ['gemini entry', 'gemini task '])
+        self.assertEqual(labels, {'category': ['Work', 'Health'], 'priority': ['high', 'urgent']})
+
+
+class LazyNumpyTests(SimpleTestCase):
+    def test_loading_the_project_does_not_import_numpy(self):
+        script = "import sys, django; django.setup(); import smart_todo.urls; print('numpy' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'smart_todo.settings'},
+        )
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class LocalClassificationOffLoopTests(TestCase):
+    def setUp(self):
+        self.on_loop = []
+        patcher = mock.patch('ai_integration.classifier.classify_locally', side_effect=self.classify)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def classify(self, text):
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(True)
+        except RuntimeError:
+            self.on_loop.append(False)
+        return None
+
+    async def test_async_enhancement_classifies_in_a_worker_thread(self):
+        task = await Task.objects.acreate(title='Write report', ai_enhanced=True)
+        with mock.patch('tasks.models.agenerate_content', mock.AsyncMock(return_value='')):
+            await task.aenhance_with_ai()
+        self.assertEqual(self.on_loop, [False])
+
+    async def test_async_processing_classifies_in_a_worker_thread(self):
+        entry = await ContextEntry.objects.acreate(content='Standup notes', source_type='notes')
+        with mock.patch.object(ContextEntry, 'aanalyze_content', mock.AsyncMock(return_value=[' Priority: High'])):
+            await entry.aprocess_with_ai()
+        self.assertEqual((self.on_loop, entry.ai_engine), ([False], 'gemini'))
@@ -1,3 +1,89 @@
-from django.shortcuts import render
+from collections import defaultdict
+from datetime import timedelta
 
- 
\ No newline at end of file
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .models import AICallRecord
+from .telemetry import PercentileCont, estimated_cost, ledger, percentile
+
+
+def _latency_percentiles(records):
+    """{call_site: (p50, p99)} - computed in Postgres, in Python elsewhere"""
+    if connection.vendor == 'postgresql':
+        rows = records.values('call_site').annotate(
+            p50=PercentileCont('latency_ms', 0.5),
+            p99=PercentileCont('latency_ms', 0.99),
+        )
+        return {row['call_site']: (row['p50'], row['p99']) for row in rows}
+
+    latencies = defaultdict(list)
+    for call_site, latency in records.order_by('latency_ms').values_list('call_site', 'latency_ms').iterator():
+        latencies[call_site].append(latency)
+    return {
+        call_site: (percentile(values, 0.5), percentile(values, 0.99))
+        for call_site, values in latencies.items()
+    }
+
+
+@api_view(['GET'])
+def telemetry(request):
+    """Per call site latency percentiles, errors and cache hits plus tokens/cost per day"""
+    try:
+        days = min(max(int(request.query_params.get('days', 7)), 1), 90)
+    except ValueError:
+        return Response({'days': ['Must be an integer.']}, status=400)
+
+    # Include what is still buffered in this worker
+    ledger.flush()
+
+    records = AICallRecord.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+    percentiles = _latency_percentiles(records)
+
+    call_sites = []
+    rows = records.values('call_site', 'model').annotate(
+        calls=Count('id'),
+        errors=Count('id', filter=~Q(error_class='')),
+        cache_hits=Count('id', filter=Q(cache_hit=True)),
+        retries=Sum('retries'),
+        avg_latency_ms=Avg('latency_ms'),
+        prompt_tokens=Sum('prompt_tokens'),
+        response_tokens=Sum('response_tokens'),
+    ).order_by('call_site', 'model')
+    for row in rows:
+        p50, p99 = percentiles.get(row['call_site'], (None, None))
+        call_sites.append({
+            **row,
+            'avg_latency_ms': round(row['avg_latency_ms'], 1),
+            'p50_latency_ms': round(p50, 1) if p50 is not None else None,
+            'p99_latency_ms': round(p99, 1) if p99 is not None else None,
+            'error_rate': round(row['errors'] / row['calls'], 4),
+            'cache_hit_rate': round(row['cache_hits'] / row['calls'], 4),
+            'estimated_cost_usd': round(estimated_cost(row['model'], row['prompt_tokens'], row['response_tokens']), 6),
+        })
+
+    per_day = defaultdict(lambda: {'calls': 0, 'prompt_tokens': 0, 'response_tokens': 0, 'estimated_cost_usd': 0.0})
+    rows = records.annotate(day=TruncDate('created_at')).values('day', 'model').annotate(
+        calls=Count('id'),
+        prompt_tokens=Sum('prompt_tokens'),
+        response_tokens=Sum('response_tokens'),
+    )
+    for row in rows:
+        day = per_day[row['day'].isoformat()]
+        day['calls'] += row['calls']
+        day['prompt_tokens'] += row['prompt_tokens']
+        day['response_tokens'] += row['response_tokens']
+        day['estimated_cost_usd'] += estimated_cost(row['model'], row['prompt_tokens'], row['response_tokens'])
+
+    return Response({
+        'days': days,
+        'call_sites': call_sites,
+        'tokens_per_day': [
+            {'day': day, **{**values, 'estimated_cost_usd': round(values['estimated_cost_usd'], 6)}}
+            for day, values in sorted(per_day.items())
+        ],
+    })
@@ -1,17 +1,19 @@
 from django.contrib import admin
-from .models import ContextEntry
+from .jobs import cancel_job, start_reprocess_job
+from .models import ContextEntry, ReprocessJob
 
 @admin.register(ContextEntry)
 class ContextEntryAdmin(admin.ModelAdmin):
-    list_display = ['id', 'content_preview', 'source_type', 'processing_status', 'insights_count', 'created_at']
+    list_display = ['id', 'content_preview', 'owner', 'source_type', 'processing_status', 'insights_count', 'created_at']
     list_filter = ['source_type', 'processing_status', 'created_at']
+    list_select_related = ['owner']
     search_fields = ['content', 'processed_insights']
     readonly_fields = ['processed_at', 'created_at', 'updated_at']
     ordering = ['-created_at']
     
     fieldsets = (
         ('Content', {
-            'fields': ('content', 'source_type', 'metadata')
+            'fields': ('owner', 'content', 'source_type', 'metadata')
         }),
         ('Processing', {
             'fields': ('processing_status', 'processed_insights', 'processed_at')
@@ -33,7 +35,38 @@ class ContextEntryAdmin(admin.ModelAdmin):
     actions = ['reprocess_entries']
     
     def reprocess_entries(self, request, queryset):
-        for entry in queryset:
-            entry.process_with_ai()
-        self.message_user(request, f'Reprocessed {queryset.count()} entries')
+        # One job per owner, so results (and tasks extracted from them) stay in the entries' partition
+        by_owner = {}
+        for pk, owner_id in queryset.order_by('created_at').values_list('pk', 'owner_id'):
+            by_owner.setdefault(owner_id, []).append(pk)
+        jobs = [start_reprocess_job(entry_ids, owner=owner_id) for owner_id, entry_ids in by_owner.items()]
+        self.message_user(
+            request,
+            f"Started reprocess job{'s' if len(jobs) > 1 else ''} {', '.join(f'#{job.id}' for job in jobs)} "
+            f"for {sum(job.total for job in jobs)} entries - see Reprocess Jobs for progress"
+        )
     reprocess_entries.short_description = 'Reprocess selected entries with AI'
+
+
+@admin.register(ReprocessJob)
+class ReprocessJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'total', 'done', 'failed', 'remaining', 'progress', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = [
+        'status', 'total', 'done', 'failed', 'cancel_requested', 'last_error',
+        'created_at', 'updated_at', 'started_at', 'finished_at'
+    ]
+    exclude = ['entry_ids']
+    ordering = ['-created_at']
+    
+    actions = ['cancel_jobs']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def cancel_jobs(self, request, queryset):
+        jobs = [job for job in queryset if not job.is_finished]
+        for job in jobs:
+            cancel_job(job)
+        self.message_user(request, f'Requested cancellation of {len(jobs)} jobs')
+    cancel_jobs.short_description = 'Cancel selected jobs'
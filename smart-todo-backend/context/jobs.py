@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ai_integration.events import publish
+from tasks.extraction import extract_tasks
+from .models import ContextEntry, ReprocessJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide pool shared by every reprocess job - bounds concurrent Gemini work"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CONTEXT_REPROCESS_WORKERS, thread_name_prefix='context-reprocess'
+            )
+        return _executor
+
+
+def start_reprocess_job(entry_ids, owner=None):
+    """Create a job for ``entry_ids`` of ``owner`` (a user, user id or None) and start it once the current transaction commits"""
+    entry_ids = list(entry_ids)
+    job = ReprocessJob.objects.create(owner_id=getattr(owner, 'pk', owner), entry_ids=entry_ids, total=len(entry_ids))
+    transaction.on_commit(lambda: threading.Thread(
+        target=run_job, args=(job.pk,), name=f'reprocess-job-{job.pk}', daemon=True
+    ).start())
+    logger.info(f"Queued reprocess job {job.pk} for {len(entry_ids)} context entries")
+    return job
+
+
+def cancel_job(job):
+    """Ask a job to stop - entries already in flight finish, the rest stay unprocessed"""
+    ReprocessJob.objects.filter(pk=job.pk).update(cancel_requested=True, updated_at=timezone.now())
+    # Nobody picked a queued job up yet, so nothing else will close it
+    ReprocessJob.objects.filter(pk=job.pk, status='queued').update(status='cancelled', finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job_id):
+    """Fan a job's entries out over the shared pool, watching for cancellation"""
+    try:
+        job = ReprocessJob.objects.get(pk=job_id)
+        # A requeued job keeps its first start, so entries it already handled are skipped
+        updated = ReprocessJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', started_at=job.started_at or timezone.now(), updated_at=timezone.now()
+        )
+        if not updated:
+            return
+        handled = job.handled_entries()
+        
+        cancelled = threading.Event()
+        executor = get_executor()
+        pending = {
+            executor.submit(reprocess_entry, job_id, entry_id, cancelled)
+            for entry_id in job.entry_ids if entry_id not in handled
+        }
+        heartbeat = time.monotonic()
+        
+        while pending:
+            _, pending = wait(pending, timeout=settings.CONTEXT_REPROCESS_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            # Cancellation may come from any worker process, so it is read from the job row
+            if not cancelled.is_set() and ReprocessJob.objects.filter(pk=job_id, cancel_requested=True).exists():
+                cancelled.set()
+                for future in pending:
+                    future.cancel()
+            # updated_at doubles as a heartbeat - resume_reprocess_jobs takes over jobs that stop beating
+            if time.monotonic() - heartbeat >= settings.CONTEXT_REPROCESS_STALE_AFTER / 5:
+                ReprocessJob.objects.filter(pk=job_id).update(updated_at=timezone.now())
+                heartbeat = time.monotonic()
+        
+        ReprocessJob.objects.filter(pk=job_id).update(
+            status='cancelled' if cancelled.is_set() else 'completed', finished_at=timezone.now()
+        )
+        job.refresh_from_db()
+        if settings.CONTEXT_EXTRACT_TASKS and job.status == 'completed':
+            extract_tasks(
+                ContextEntry.objects.for_owner(job.owner_id).filter(pk__in=job.entry_ids, processing_status='processed'),
+                job.owner_id,
+            )
+        logger.info(f"Reprocess job {job_id} {job.status}: {job.done} done, {job.failed} failed, {job.remaining} remaining")
+        
+        from .serializers import ReprocessJobSerializer
+        publish('context.reprocess_job', ReprocessJobSerializer(job).data, job.owner_id)
+    except Exception as e:
+        logger.exception(f"Reprocess job {job_id} crashed: {str(e)}")
+        ReprocessJob.objects.filter(pk=job_id).update(
+            status='failed', last_error=f"Job crashed: {str(e)}"[:255], finished_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+
+
+def requeue_stale_jobs(stale_after=None):
+    """
+    Queue again the running jobs whose worker died (no heartbeat for
+    ``stale_after`` seconds, default CONTEXT_REPROCESS_STALE_AFTER) and return
+    their ids plus those of queued jobs no worker ever picked up. The done and
+    failed counts are rebuilt from the entries, so a resumed job only
+    reprocesses what is left.
+    """
+    stale_after = settings.CONTEXT_REPROCESS_STALE_AFTER if stale_after is None else stale_after
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    job_ids = list(ReprocessJob.objects.filter(status='queued', updated_at__lt=cutoff).values_list('pk', flat=True))
+    for job in ReprocessJob.objects.filter(status='running', updated_at__lt=cutoff):
+        # Matching updated_at makes this a compare-and-swap against a job that is still alive
+        stale = ReprocessJob.objects.filter(pk=job.pk, status='running', updated_at=job.updated_at)
+        if job.cancel_requested:
+            stale.update(status='cancelled', finished_at=timezone.now())
+            continue
+        outcomes = list(job.handled_entries().values())
+        if stale.update(
+            status='queued', done=outcomes.count('processed'), failed=outcomes.count('failed'), updated_at=timezone.now()
+        ):
+            logger.warning(f"Reprocess job {job.pk} stopped making progress - requeued")
+            job_ids.append(job.pk)
+    return job_ids
+
+
+def reprocess_entry(job_id, entry_id, cancelled):
+    """Reprocess one entry on a pool thread and count the outcome on the job"""
+    if cancelled.is_set():
+        return
+    close_old_connections()
+    error = ''
+    try:
+        entry = ContextEntry.objects.get(pk=entry_id)
+        entry.process_with_ai()
+        outcome = 'done' if entry.processing_status == 'processed' else 'failed'
+        if outcome == 'failed':
+            error = f"Entry {entry_id}: AI analysis failed, fallback insights stored"
+    except ContextEntry.DoesNotExist:
+        outcome, error = 'failed', f"Entry {entry_id} no longer exists"
+    except Exception as e:
+        logger.exception(f"Reprocessing entry {entry_id} in job {job_id} failed: {str(e)}")
+        outcome, error = 'failed', f"Entry {entry_id}: {str(e)}"
+    
+    changes = {outcome: F(outcome) + 1, 'updated_at': timezone.now()}
+    if error:
+        changes['last_error'] = error[:255]
+    try:
+        ReprocessJob.objects.filter(pk=job_id).update(**changes)
+    finally:
+        close_old_connections()
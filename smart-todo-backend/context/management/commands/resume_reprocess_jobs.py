@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from context.jobs import requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Resume reprocess jobs left running or queued by a worker that stopped (run after a restart or from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after', type=float, default=settings.CONTEXT_REPROCESS_STALE_AFTER,
+            help='Seconds without progress before a running job is taken over'
+        )
+
+    def handle(self, *args, **options):
+        job_ids = requeue_stale_jobs(options['stale_after'])
+        for job_id in job_ids:
+            # Runs in this process - the worker that started the job is gone
+            run_job(job_id)
+            self.stdout.write(f"Resumed reprocess job {job_id}")
+        self.stdout.write(f"{len(job_ids)} stale reprocess jobs resumed")
@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-18 23:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0003_reprocessjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContextEntryTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['updated_at', 'id'], name='contextentry_updated_cursor'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentrytombstone',
+            index=models.Index(fields=['deleted_at'], name='contextentrytombstone_cursor'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1 on 2026-10-18 23:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0004_delta_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contextentry',
+            name='contextentry_updated_cursor',
+        ),
+        migrations.RemoveIndex(
+            model_name='contextentrytombstone',
+            name='contextentrytombstone_cursor',
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='context_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='contextentrytombstone',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='reprocessjob',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reprocess_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['owner', '-created_at'], name='context_owner_created'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['owner', 'processing_status'], name='context_owner_status'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['owner', 'source_type'], name='context_owner_source'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['owner', 'updated_at', 'id'], name='context_owner_updated_cursor'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentrytombstone',
+            index=models.Index(fields=['owner', 'deleted_at'], name='contextentrytombstone_cursor'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+def stamp_engine(apps, schema_editor):
+    # Earlier analyses name their engine in the closing "Powered by ..." insight
+    ContextEntry = apps.get_model('context', 'ContextEntry')
+    markers = {'gemini': 'Powered by Google Gemini', 'local': 'Powered by Local classifier'}
+    for engine, marker in markers.items():
+        ids = [
+            pk for pk, insights in ContextEntry.objects.filter(processing_status='processed').values_list('id', 'processed_insights')
+            if any(marker in line for line in insights or [])
+        ]
+        ContextEntry.objects.filter(pk__in=ids).update(ai_engine=engine)
+    ContextEntry.objects.filter(processing_status='failed').update(ai_engine='fallback')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0005_owner_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contextentry',
+            name='ai_engine',
+            field=models.CharField(blank=True, choices=[('gemini', 'Google Gemini'), ('local', 'Local classifier'), ('fallback', 'Fallback')], max_length=10),
+        ),
+        migrations.RunPython(stamp_engine, migrations.RunPython.noop),
+    ]
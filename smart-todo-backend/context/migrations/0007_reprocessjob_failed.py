@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-19 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0006_ai_engine'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reprocessjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+    ]
@@ -2,13 +2,45 @@ from django.db import models
 from django.utils import timezone
 from django.core.validators import MinLengthValidator
 from django.conf import settings
-import requests
-import json
+from collections import Counter
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 import logging
-import google.generativeai as genai
+import re
+from asgiref.sync import sync_to_async
+from ai_integration.async_client import agenerate_content
+from ai_integration.chunking import chunk_content
+from ai_integration.events import apublish, publish
+from ai_integration.gemini import generate_content
+from smart_todo.ownership import OwnedQuerySet, owner_field
+from smart_todo.sync import Tombstone
 
 logger = logging.getLogger(__name__)
 
+# Labels produced by the analysis prompt, in display order
+INSIGHT_LABELS = [
+    'priority', 'category', 'time estimate', 'main task',
+    'key insight', 'recommendation', 'suggested deadline', 'smart tip'
+]
+PRIORITY_RANK = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+
+def insight_label(line):
+    """Return the label of an insight line ('priority', 'category', ...) or None"""
+    text = re.sub(r'^[^A-Za-z]+', '', line).lower()
+    for label in INSIGHT_LABELS:
+        if text.startswith(f'{label}:'):
+            return label
+    return None
+
+
+def insight_value(line):
+    """First word after the label, e.g. 'high' for 'Priority: High - ...'"""
+    _, _, value = line.partition(':')
+    words = re.findall(r'[A-Za-z]+', value)
+    return words[0].lower() if words else ''
+
 class ContextEntry(models.Model):
     SOURCE_CHOICES = [
         ('whatsapp', 'WhatsApp'),
@@ -23,6 +55,14 @@ class ContextEntry(models.Model):
         ('failed', 'Failed'),
     ]
     
+    # Which analysis produced processed_insights - the local classifier only trains on Gemini's
+    ENGINE_CHOICES = [
+        ('gemini', 'Google Gemini'),
+        ('local', 'Local classifier'),
+        ('fallback', 'Fallback'),
+    ]
+    
+    owner = owner_field('context_entries')
     content = models.TextField(
         validators=[MinLengthValidator(5)],
         help_text="Context content from various sources"
@@ -42,6 +82,7 @@ class ContextEntry(models.Model):
         blank=True,
         help_text="AI-generated insights and task suggestions"
     )
+    ai_engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, blank=True)
     metadata = models.JSONField(
         default=dict,
         blank=True,
@@ -51,10 +92,19 @@ class ContextEntry(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     
+    objects = OwnedQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Context Entry"
         verbose_name_plural = "Context Entries"
+        # Every API query is owner-scoped, so the owner leads each index
+        indexes = [
+            models.Index(fields=['owner', '-created_at'], name='context_owner_created'),
+            models.Index(fields=['owner', 'processing_status'], name='context_owner_status'),
+            models.Index(fields=['owner', 'source_type'], name='context_owner_source'),
+            models.Index(fields=['owner', 'updated_at', 'id'], name='context_owner_updated_cursor'),
+        ]
     
     def __str__(self):
         return f"{self.get_source_type_display()} - {self.content[:50]}..."
@@ -70,14 +120,127 @@ class ContextEntry(models.Model):
         self.save()
         
         try:
-            # Configure Gemini AI
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            # Routine content is answered by the local classifier, the rest escalates to Gemini
+            local = self.classify_locally()
+            
+            if local:
+                self.mark_processed(self.build_local_insights(local), f"Local classifier v{local['version']}", 'local')
+            else:
+                # Long threads are split on message/paragraph boundaries and analyzed in parallel
+                chunks = chunk_content(self.content, settings.AI_CHUNK_TOKEN_BUDGET)
+                
+                if len(chunks) == 1:
+                    insights = self.analyze_content(self.content)
+                else:
+                    insights = self.analyze_chunks(chunks)
+                self.mark_processed(insights, "Google Gemini 1.5 Flash", 'gemini')
+            
+        except Exception as e:
+            self.mark_failed(e)
+        
+        self.save()
+        publish(*self.ai_event(), self.owner_id)
+        return self.processed_insights
+    
+    async def aprocess_with_ai(self):
+        """Non-blocking process_with_ai for async views"""
+        self.processing_status = 'processing'
+        await self.asave()
+        
+        try:
+            # Loading and running the local model reads files and runs numpy - not on the event loop
+            local = await sync_to_async(self.classify_locally)()
             
-            # Enhanced intelligent AI prompt for task analysis
-            system_prompt = f"""You are an expert AI task management assistant analyzing {self.source_type} content.
+            if local:
+                self.mark_processed(self.build_local_insights(local), f"Local classifier v{local['version']}", 'local')
+            else:
+                chunks = chunk_content(self.content, settings.AI_CHUNK_TOKEN_BUDGET)
+                
+                if len(chunks) == 1:
+                    insights = await self.aanalyze_content(self.content)
+                else:
+                    insights = await self.aanalyze_chunks(chunks)
+                self.mark_processed(insights, "Google Gemini 1.5 Flash", 'gemini')
+            
+        except Exception as e:
+            self.mark_failed(e)
+        
+        await self.asave()
+        await apublish(*self.ai_event(), self.owner_id)
+        return self.processed_insights
+    
+    def classify_locally(self):
+        """Confident local classifier prediction for the content, or None to escalate to Gemini"""
+        from ai_integration.classifier import classify_locally
+        return classify_locally(self.content)
+    
+    def ai_event(self):
+        """(event, payload) announcing the outcome of process_with_ai"""
+        from .serializers import ContextEntrySerializer
+        event = 'context.processed' if self.processing_status == 'processed' else 'context.failed'
+        return event, ContextEntrySerializer(self).data
+    
+    def mark_processed(self, insights, powered_by, engine):
+        """Store successful analysis results from ``engine`` (an ENGINE_CHOICES key; caller saves)"""
+        # Add success indicator with model info
+        insights.append(f" AI Analysis complete - Powered by {powered_by}")
+        insights.append(f" Processing time: {timezone.now().strftime('%H:%M:%S')}")
+        
+        self.processed_insights = insights
+        self.processing_status = 'processed'
+        self.ai_engine = engine
+        self.processed_at = timezone.now()
+        
+        logger.info(f"Successfully processed entry {self.id} with {powered_by} - {len(insights)} insights generated")
+    
+    def mark_failed(self, e):
+        """Store error insights plus fallback analysis (caller saves)"""
+        logger.error(f"Gemini AI processing error for entry {self.id}: {str(e)}")
+        
+        # Enhanced error handling with specific error types
+        error_str = str(e).upper()
+        if "API_KEY" in error_str or "INVALID" in error_str:
+            self.processed_insights = [
+                " Gemini API Key Error - Invalid or expired API key",
+                " Please check your Gemini API key configuration",
+                " Verify API key is active in Google AI Studio",
+                " Using fallback analysis..."
+            ]
+        elif "QUOTA" in error_str or "LIMIT" in error_str:
+            self.processed_insights = [
+                " Gemini API Quota Exceeded - Rate limit reached",
+                " Please wait a few minutes before retrying",
+                " Using basic analysis instead..."
+            ]
+        elif "BLOCKED" in error_str or "SAFETY" in error_str:
+            self.processed_insights = [
+                "⚠️ Content blocked by Gemini safety filters",
+                " Try rephrasing your content or use different wording",
+                " Using fallback analysis..."
+            ]
+        else:
+            self.processed_insights = [
+                f" Gemini AI Error: {str(e)[:100]}...",
+                " Check your internet connection and API key",
+                " Try reprocessing in a few moments",
+                " Using fallback analysis..."
+            ]
+        
+        # Add basic fallback analysis
+        self.processed_insights.extend(self.generate_fallback_insights())
+        self.processing_status = 'failed'
+        self.ai_engine = 'fallback'
+    
+    def build_analysis_prompt(self, content, part=None, parts=None):
+        """Build the Gemini analysis prompt for the whole content or one chunk of it"""
+        part_note = ''
+        if part is not None:
+            part_note = f" (this is part {part} of {parts} of a longer {self.get_source_type_display()} thread - analyze only this part)"
+        
+        # Enhanced intelligent AI prompt for task analysis
+        return f"""You are an expert AI task management assistant analyzing {self.source_type} content.
 
-TASK: Analyze the provided content and generate exactly 6-8 actionable insights in the specified format.
+TASK: Analyze the provided content{part_note} and generate exactly 6-8 actionable insights in the specified format.
 
 REQUIRED FORMAT (use these exact emojis and structure):
  Priority: [urgent/high/medium/low] - [specific reason why this priority level]
@@ -91,7 +254,7 @@ REQUIRED FORMAT (use these exact emojis and structure):
 
 CONTENT TO ANALYZE:
 Source Type: {self.get_source_type_display()}
-Content: "{self.content}"
+Content: "{content}"
 
 INSTRUCTIONS:
 - Provide exactly 6-8 insights following the format above
@@ -100,62 +263,124 @@ INSTRUCTIONS:
 - Focus on practical task management advice
 - Each insight should start with the specified emoji
 - Keep insights concise but meaningful (1-2 sentences each)"""
-            
-            # Generate AI response
-            response = model.generate_content(system_prompt)
-            ai_analysis = response.text
-            
-            # Parse AI response into insights
-            insights = self.parse_ai_response(ai_analysis)
-            
-            # Add success indicator with model info
-            insights.append(" AI Analysis complete - Powered by Google Gemini 1.5 Flash")
-            insights.append(f" Processing time: {timezone.now().strftime('%H:%M:%S')}")
-            
-            self.processed_insights = insights
-            self.processing_status = 'processed'
-            self.processed_at = timezone.now()
-            
-            logger.info(f"Successfully processed entry {self.id} with Gemini - {len(insights)} insights generated")
-            
-        except Exception as e:
-            logger.error(f"Gemini AI processing error for entry {self.id}: {str(e)}")
-            
-            # Enhanced error handling with specific error types
-            error_str = str(e).upper()
-            if "API_KEY" in error_str or "INVALID" in error_str:
-                self.processed_insights = [
-                    " Gemini API Key Error - Invalid or expired API key",
-                    " Please check your Gemini API key configuration",
-                    " Verify API key is active in Google AI Studio",
-                    " Using fallback analysis..."
-                ]
-            elif "QUOTA" in error_str or "LIMIT" in error_str:
-                self.processed_insights = [
-                    " Gemini API Quota Exceeded - Rate limit reached",
-                    " Please wait a few minutes before retrying",
-                    " Using basic analysis instead..."
-                ]
-            elif "BLOCKED" in error_str or "SAFETY" in error_str:
-                self.processed_insights = [
-                    "⚠️ Content blocked by Gemini safety filters",
-                    " Try rephrasing your content or use different wording",
-                    " Using fallback analysis..."
-                ]
+    
+    def analyze_content(self, content, part=None, parts=None):
+        """Run one Gemini call and parse the insights"""
+        response = generate_content(
+            self.build_analysis_prompt(content, part, parts),
+            'gemini-1.5-flash',
+            call_site='context.analyze_chunk' if part else 'context.analyze',
+            generation_config={'max_output_tokens': settings.AI_MAX_TOKENS}
+        )
+        return self.parse_ai_response(response.text)
+    
+    async def aanalyze_content(self, content, part=None, parts=None):
+        """Non-blocking analyze_content"""
+        ai_analysis = await agenerate_content(
+            self.build_analysis_prompt(content, part, parts),
+            max_output_tokens=settings.AI_MAX_TOKENS,
+            call_site='context.analyze_chunk' if part else 'context.analyze'
+        )
+        return self.parse_ai_response(ai_analysis)
+    
+    def analyze_chunks(self, chunks):
+        """Map: analyze chunks in parallel. Reduce: merge the partial insights"""
+        results = [None] * len(chunks)
+        workers = min(len(chunks), settings.AI_CHUNK_MAX_WORKERS)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # copy_context() keeps the calls attributed to the current request's timings
+            futures = {
+                executor.submit(copy_context().run, self.analyze_content, chunk, index + 1, len(chunks)): index
+                for index, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    results[futures[future]] = e
+        
+        return self.combine_chunk_results(chunks, results)
+    
+    async def aanalyze_chunks(self, chunks):
+        """Non-blocking analyze_chunks - at most AI_CHUNK_MAX_WORKERS calls in flight"""
+        semaphore = asyncio.Semaphore(settings.AI_CHUNK_MAX_WORKERS)
+        
+        async def analyze(index, chunk):
+            async with semaphore:
+                return await self.aanalyze_content(chunk, index + 1, len(chunks))
+        
+        results = await asyncio.gather(
+            *(analyze(index, chunk) for index, chunk in enumerate(chunks)),
+            return_exceptions=True
+        )
+        return self.combine_chunk_results(chunks, results)
+    
+    def combine_chunk_results(self, chunks, results):
+        """Drop failed and empty chunks and merge the rest - fails only if none is left"""
+        partials, errors = [], []
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.warning(f"Chunk {index + 1}/{len(chunks)} failed for entry {self.id}: {str(result)}")
+                errors.append(result)
+            elif result:
+                partials.append(result)
+        
+        if not partials:
+            # Every chunk came back empty: fail so the entry gets the fallback analysis
+            raise errors[0] if errors else RuntimeError(f"Gemini returned no insights for any of {len(chunks)} chunks")
+        
+        logger.info(f"Entry {self.id} analyzed in {len(chunks)} chunks ({len(partials)} succeeded)")
+        return self.merge_chunk_insights(partials, total_chunks=len(chunks))
+    
+    def merge_chunk_insights(self, partials, total_chunks=None):
+        """Combine per-chunk insights into a single analysis"""
+        by_label = {}
+        for index, insights in enumerate(partials):
+            for line in insights:
+                label = insight_label(line)
+                if label:
+                    by_label.setdefault(label, []).append((index, line))
+        
+        if not by_label:
+            return partials[0]
+        
+        # The most urgent part of the thread drives the headline insights
+        lead_chunk = 0
+        if 'priority' in by_label:
+            lead_chunk = max(
+                by_label['priority'],
+                key=lambda item: (PRIORITY_RANK.get(insight_value(item[1]), 0), -item[0])
+            )[0]
+        
+        # Category is decided by majority vote across parts
+        category_line = None
+        if 'category' in by_label:
+            votes = Counter(insight_value(line) for _, line in by_label['category'])
+            winner = votes.most_common(1)[0][0]
+            category_line = next(line for _, line in by_label['category'] if insight_value(line) == winner)
+        
+        merged = []
+        for label in INSIGHT_LABELS:
+            lines = by_label.get(label)
+            if not lines:
+                continue
+            if label == 'category':
+                merged.append(category_line)
             else:
-                self.processed_insights = [
-                    f" Gemini AI Error: {str(e)[:100]}...",
-                    " Check your internet connection and API key",
-                    " Try reprocessing in a few moments",
-                    " Using fallback analysis..."
-                ]
-            
-            # Add basic fallback analysis
-            self.processed_insights.extend(self.generate_fallback_insights())
-            self.processing_status = 'failed'
+                lead_lines = [line for index, line in lines if index == lead_chunk]
+                merged.append(lead_lines[0] if lead_lines else lines[0][1])
         
-        self.save()
-        return self.processed_insights
+        merged.append(f" Combined analysis of {total_chunks or len(partials)} parts of a long {self.get_source_type_display()} thread")
+        return merged
+    
+    def build_local_insights(self, prediction):
+        """Fallback-style insights with priority and category from the local classifier"""
+        local_lines = {
+            'priority': f" Priority: {prediction['priority'].title()} - Matches similar past entries ({prediction['priority_confidence']:.0%} confidence)",
+            'category': f" Category: {prediction['category']} - Matches similar past entries ({prediction['category_confidence']:.0%} confidence)",
+        }
+        return [local_lines.get(insight_label(line), line) for line in self.generate_fallback_insights()]
     
     def parse_ai_response(self, ai_text):
         """Parse Gemini AI response into structured insights"""
@@ -265,3 +490,62 @@ INSTRUCTIONS:
             insights.append(" Suggested deadline: Within next 3-5 days")
         
         return insights
+
+
+class ContextEntryTombstone(Tombstone):
+    """Deleted context entry ids for ?updated_since= delta sync"""
+
+
+class ReprocessJob(models.Model):
+    """Bulk re-analysis of context entries, run by context.jobs on a bounded worker pool"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+        ('failed', 'Failed'),
+    ]
+    
+    owner = owner_field('reprocess_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    entry_ids = models.JSONField(default=list, help_text="Context entries to reprocess, in order")
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = OwnedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Reprocess Job"
+        verbose_name_plural = "Reprocess Jobs"
+    
+    def __str__(self):
+        return f"Reprocess job #{self.id} ({self.status}, {self.done + self.failed}/{self.total})"
+    
+    @property
+    def remaining(self):
+        return max(self.total - self.done - self.failed, 0)
+    
+    @property
+    def progress(self):
+        """Share of entries handled so far (0-100)"""
+        return round((self.done + self.failed) / self.total * 100, 1) if self.total else 100.0
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'cancelled', 'failed')
+    
+    def handled_entries(self):
+        """{entry id: 'processed' or 'failed'} for the entries this job already reprocessed"""
+        if self.started_at is None:
+            return {}
+        return dict(ContextEntry.objects.filter(
+            pk__in=self.entry_ids, updated_at__gte=self.started_at, processing_status__in=('processed', 'failed')
+        ).values_list('pk', 'processing_status'))
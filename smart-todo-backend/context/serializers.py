@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import ContextEntry
+from smart_todo.serialization import ListProjection, format_datetime, json_array_length
+from tasks.extraction import extract_tasks
+from .models import ContextEntry, ReprocessJob
 
 class ContextEntrySerializer(serializers.ModelSerializer):
     insights_count = serializers.ReadOnlyField()
@@ -12,6 +15,25 @@ class ContextEntrySerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'processed_at'
         ]
 
+# ContextEntrySerializer's fields as (columns, builder) - list endpoint, no model instances
+CONTEXT_ENTRY_LIST_PROJECTION = ListProjection(
+    {
+        'id': (('id',), None),
+        'content': (('content',), None),
+        'source_type': (('source_type',), None),
+        'processing_status': (('processing_status',), None),
+        'processed_insights': (('processed_insights',), None),
+        'metadata': (('metadata',), None),
+        'insights_count': ((json_array_length('processed_insights'),), None),
+        'created_at': (('created_at',), format_datetime),
+        'updated_at': (('updated_at',), format_datetime),
+        'processed_at': (('processed_at',), format_datetime),
+    },
+    views={
+        'card': ('id', 'source_type', 'processing_status', 'insights_count', 'created_at', 'processed_at'),
+    },
+)
+
 class ContextEntryCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContextEntry
@@ -28,4 +50,18 @@ class ContextEntryCreateSerializer(serializers.ModelSerializer):
             logger = logging.getLogger(__name__)
             logger.error(f"AI processing failed for entry {entry.id}: {str(e)}")
         
+        if settings.CONTEXT_EXTRACT_TASKS and entry.processing_status == 'processed':
+            extract_tasks([entry], entry.owner_id)
         return entry
+
+class ReprocessJobSerializer(serializers.ModelSerializer):
+    remaining = serializers.ReadOnlyField()
+    progress = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = ReprocessJob
+        fields = [
+            'id', 'status', 'total', 'done', 'failed', 'remaining', 'progress',
+            'cancel_requested', 'last_error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
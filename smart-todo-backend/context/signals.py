@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from smart_todo.ownership import owned_collection
+from smart_todo.response_cache import bump_collection
+from smart_todo.sync import record_deletion
+from .models import ContextEntry, ContextEntryTombstone
+
+
+@receiver([post_save, post_delete], sender=ContextEntry)
+def context_entry_changed(sender, instance, **kwargs):
+    """Invalidate the owner's cached context lists once the write is committed"""
+    transaction.on_commit(lambda: bump_collection(owned_collection('context_entries', instance.owner_id)))
+
+
+@receiver(post_delete, sender=ContextEntry)
+def context_entry_deleted(sender, instance, **kwargs):
+    """Tombstone for delta sync - written in the deleting transaction"""
+    record_deletion(ContextEntryTombstone, instance.pk, instance.owner_id)
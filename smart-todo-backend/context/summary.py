@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from smart_todo.serialization import json_array_length
+
+
+def context_stats(entries, now=None):
+    """Body of /api/context/entries/stats/ - one conditional aggregate plus the latest week's entries"""
+    now = now or timezone.now()
+
+    # One pass over the owner's rows: counts by source type and processing status, total insights
+    counts = entries.aggregate(
+        total_entries=Count('id'),
+        whatsapp_count=Count('id', filter=Q(source_type='whatsapp')),
+        email_count=Count('id', filter=Q(source_type='email')),
+        notes_count=Count('id', filter=Q(source_type='notes')),
+        processed_count=Count('id', filter=Q(processing_status='processed')),
+        failed_count=Count('id', filter=Q(processing_status='failed')),
+        processing_count=Count('id', filter=Q(processing_status='processing')),
+        total_insights=Sum(json_array_length('processed_insights'), filter=Q(processing_status='processed')),
+    )
+    counts['total_insights'] = counts['total_insights'] or 0
+
+    # Recent activity (last 7 days)
+    recent_entries = entries.filter(created_at__gte=now - timedelta(days=7)).order_by('-created_at')[:5]
+    recent_activity = [{
+        'id': entry.id,
+        'content': entry.content[:50] + '...' if len(entry.content) > 50 else entry.content,
+        'source_type': entry.source_type,
+        'processing_status': entry.processing_status,
+        'created_at': entry.created_at,
+        'insights_count': entry.insights_count,
+    } for entry in recent_entries]
+
+    # AI processing efficiency
+    total_entries = counts['total_entries']
+    ai_success_rate = (counts['processed_count'] / total_entries * 100) if total_entries > 0 else 0
+
+    return {
+        **counts,
+        'ai_success_rate': round(ai_success_rate, 1),
+        'recent_activity': recent_activity,
+    }
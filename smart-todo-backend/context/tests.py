@@ -1,3 +1,170 @@
-from django.test import TestCase
+import json
+from concurrent.futures import Future
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from smart_todo.testing import LOCAL_CACHES
+from .jobs import requeue_stale_jobs, run_job
+from .models import ContextEntry, ReprocessJob
+from .serializers import ContextEntrySerializer
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ContextTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+
+    def entry(self, owner, content='Meeting with the team on Friday', **fields):
+        return ContextEntry.objects.create(owner=owner, content=content, source_type='notes', **fields)
+
+
+class AdminReprocessTests(ContextTestCase):
+    def test_selected_entries_are_reprocessed_by_one_job_per_owner(self):
+        entries = [self.entry(self.alice), self.entry(self.bob), self.entry(self.alice), self.entry(None)]
+        admin = User.objects.create_superuser('admin')
+        request = RequestFactory().post('/admin/context/contextentry/')
+        request.user = admin
+        model_admin = site._registry[ContextEntry]
+
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.reprocess_entries(request, ContextEntry.objects.filter(pk__in=[entry.pk for entry in entries]))
+
+        jobs = {job.owner_id: sorted(job.entry_ids) for job in ReprocessJob.objects.all()}
+        self.assertEqual(jobs, {
+            self.alice.pk: sorted([entries[0].pk, entries[2].pk]),
+            self.bob.pk: [entries[1].pk],
+            None: [entries[3].pk],
+        })
+        self.assertNotIn(admin.pk, jobs)
+
+
+class InlineExecutor:
+    """Runs submitted work immediately, so jobs finish inside the test transaction"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def process_without_ai(entry):
+    entry.processing_status = 'processed'
+    entry.save()
+
+
+@override_settings(CONTEXT_REPROCESS_STALE_AFTER=60)
+class StaleJobTests(ContextTestCase):
+    def setUp(self):
+        super().setUp()
+        for target, replacement in (('context.jobs.get_executor', InlineExecutor), ('context.jobs.close_old_connections', None)):
+            patcher = mock.patch(target, replacement or mock.DEFAULT)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(ContextEntry, 'process_with_ai', autospec=True, side_effect=process_without_ai)
+        self.process_with_ai = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def job(self, entries, status='running', idle=timedelta(minutes=5), **fields):
+        started = timezone.now() - timedelta(hours=1)
+        job = ReprocessJob.objects.create(
+            owner=self.alice, entry_ids=[entry.pk for entry in entries], total=len(entries), status=status, **fields
+        )
+        ReprocessJob.objects.filter(pk=job.pk).update(started_at=started, updated_at=timezone.now() - idle)
+        return job
+
+    def test_a_crash_marks_the_job_failed(self):
+        job = self.job([self.entry(self.alice)], status='queued', idle=timedelta())
+        with mock.patch('context.jobs.ReprocessJob.handled_entries', side_effect=RuntimeError('boom')):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.last_error, 'Job crashed: boom')
+
+    def test_stale_running_jobs_resume_with_the_entries_left(self):
+        finished, interrupted, untouched = (self.entry(self.alice) for _ in range(3))
+        job = self.job([finished, interrupted, untouched], done=0)
+        ContextEntry.objects.filter(pk=finished.pk).update(processing_status='processed', updated_at=timezone.now())
+        ContextEntry.objects.filter(pk=interrupted.pk).update(processing_status='processing')
+        live = self.job([self.entry(self.alice)], idle=timedelta(seconds=5))
+
+        self.assertEqual(requeue_stale_jobs(), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done, job.failed), ('queued', 1, 0))
+        self.assertEqual(ReprocessJob.objects.get(pk=live.pk).status, 'running')
+
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done, job.failed, job.remaining), ('completed', 3, 0, 0))
+        self.assertEqual({call.args[0].pk for call in self.process_with_ai.call_args_list}, {interrupted.pk, untouched.pk})
+
+    def test_resume_command_runs_stale_jobs_in_its_own_process(self):
+        job = self.job([self.entry(self.alice)])
+        output = StringIO()
+        call_command('resume_reprocess_jobs', stdout=output)
+        self.assertEqual(ReprocessJob.objects.get(pk=job.pk).status, 'completed')
+        self.assertIn('1 stale reprocess jobs resumed', output.getvalue())
+
+    def test_stale_jobs_with_a_cancel_request_are_closed(self):
+        job = self.job([self.entry(self.alice)], cancel_requested=True)
+        self.assertEqual(requeue_stale_jobs(), [])
+        self.assertEqual(ReprocessJob.objects.get(pk=job.pk).status, 'cancelled')
+
+
+class AIStatusTests(ContextTestCase):
+    def test_an_empty_reply_is_reported_as_not_connected(self):
+        with mock.patch('context.views.agenerate_content', mock.AsyncMock(return_value='')):
+            response = self.client.get('/api/context/entries/ai_status/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['ai_connected'])
+
+
+class ChunkCombiningTests(ContextTestCase):
+    def test_the_most_urgent_chunk_leads_and_category_is_voted(self):
+        entry = self.entry(self.alice)
+        merged = entry.combine_chunk_results(range(4), [
+            [' Priority: Low - routine', ' Category: Work - team', ' Main task: Read the notes'],
+            [' Priority: Urgent - due today', ' Category: Personal - family', ' Main task: Book the venue'],
+            RuntimeError('timeout'),
+            [' Category: Work - office', ' Main task: File the report'],
+        ])
+        self.assertEqual(merged[:3], [' Priority: Urgent - due today', ' Category: Work - team', ' Main task: Book the venue'])
+        self.assertIn('Combined analysis of 4 parts', merged[-1])
+
+    def test_only_failures_raise_the_first_error(self):
+        entry = self.entry(self.alice)
+        with self.assertRaisesMessage(RuntimeError, 'quota'):
+            entry.combine_chunk_results(range(2), [RuntimeError('quota'), RuntimeError('timeout')])
+
+    def test_all_empty_chunks_fall_back_instead_of_crashing(self):
+        entry = self.entry(self.alice, content='Long thread. ' * 50)
+        with mock.patch('context.models.chunk_content', return_value=['part one', 'part two']), \
+                mock.patch.object(ContextEntry, 'analyze_content', return_value=[]):
+            entry.process_with_ai()
+        entry.refresh_from_db()
+        self.assertEqual((entry.processing_status, entry.ai_engine), ('failed', 'fallback'))
+        self.assertIn('no insights for any of 2 chunks', entry.processed_insights[0])
+
+
+class ListProjectionTests(ContextTestCase):
+    def test_list_rows_match_the_serializer(self):
+        self.entry(None, processed_insights=[' Priority: High'], metadata={'sender': 'Sam'}, processed_at=timezone.now())
+        self.entry(None, processed_insights=[])
+        self.entry(self.alice)  # another owner's entry
+
+        listed = self.client.get('/api/context/entries/').json()
+        expected = [
+            json.loads(JSONRenderer().render(ContextEntrySerializer(entry).data))
+            for entry in ContextEntry.objects.for_owner(None)
+        ]
+        self.assertEqual(listed, expected)
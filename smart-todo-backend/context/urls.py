@@ -1,10 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ContextEntryViewSet
+from . import views
+from .views import ContextEntryViewSet, ReprocessJobViewSet
 
 router = DefaultRouter()
 router.register(r'entries', ContextEntryViewSet, basename='contextentry')
+router.register(r'reprocess-jobs', ReprocessJobViewSet, basename='reprocessjob')
 
 urlpatterns = [
+    # Async AI endpoints (listed before the router so they win over the detail route)
+    path('entries/ai_status/', views.ai_status, name='contextentry-ai-status'),
+    path('entries/<int:pk>/reprocess/', views.reprocess, name='contextentry-reprocess'),
+    path('health/', views.ai_health_check, name='ai-health-check'),
     path('', include(router.urls)),
 ]
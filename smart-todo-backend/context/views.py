@@ -1,20 +1,29 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q
+from rest_framework.reverse import reverse
+from django.db.models import Q
 from django.utils import timezone
+from django.http import JsonResponse
 from datetime import timedelta
-import requests
-import google.generativeai as genai
-from django.conf import settings
-from .models import ContextEntry
+from ai_integration.async_client import agenerate_content
+from smart_todo.async_api import async_api_view, not_found
+from smart_todo.idempotency import idempotent
+from smart_todo.ownership import OwnerScopedMixin, request_owner
+from smart_todo.response_cache import cached_list
+from smart_todo.sync import delta_data, prune_tombstones
+from tasks.extraction import extract_tasks
+from .jobs import cancel_job, start_reprocess_job
+from .models import ContextEntry, ContextEntryTombstone, ReprocessJob
+from .summary import context_stats
 from .serializers import (
     ContextEntrySerializer, 
-    ContextEntryCreateSerializer
+    ContextEntryCreateSerializer,
+    ReprocessJobSerializer,
+    CONTEXT_ENTRY_LIST_PROJECTION,
 )
 
-class ContextEntryViewSet(viewsets.ModelViewSet):
+class ContextEntryViewSet(OwnerScopedMixin, viewsets.ModelViewSet):
     queryset = ContextEntry.objects.all().order_by('-created_at')
     
     def get_serializer_class(self):
@@ -22,8 +31,9 @@ class ContextEntryViewSet(viewsets.ModelViewSet):
             return ContextEntryCreateSerializer
         return ContextEntrySerializer
     
+    @cached_list('context_entries')
     def list(self, request):
-        """List all context entries with AI processing status"""
+        """List all context entries with AI processing status - supports ?fields=, ?exclude=, ?view=card, ?updated_since="""
         queryset = self.get_queryset()
         
         # Filter by source type
@@ -44,186 +54,207 @@ class ContextEntryViewSet(viewsets.ModelViewSet):
                 Q(processed_insights__icontains=search)
             )
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Delta sync: only rows changed since the cursor, plus tombstones (filters apply to changed rows only)
+        cursor = request.query_params.get('updated_since')
+        if cursor is not None:
+            fields = CONTEXT_ENTRY_LIST_PROJECTION.requested_fields(request.query_params)
+            tombstones = ContextEntryTombstone.objects.for_owner(request_owner(request))
+            return Response(delta_data(queryset, tombstones, cursor, CONTEXT_ENTRY_LIST_PROJECTION, fields))
+        
+        return Response(CONTEXT_ENTRY_LIST_PROJECTION.list_data(queryset, request.query_params))
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Create new context entry and process with AI"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        entry = serializer.save()
+        entry = serializer.save(owner=request_owner(request))
         
         # Return the processed entry with insights
         response_serializer = ContextEntrySerializer(entry)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
-    @action(detail=True, methods=['post'])
-    def reprocess(self, request, pk=None):
-        """Reprocess entry with AI"""
-        entry = get_object_or_404(ContextEntry, pk=pk)
-        
-        # Process with AI
-        insights = entry.process_with_ai()
-        
-        serializer = ContextEntrySerializer(entry)
-        return Response({
-            'message': 'Entry reprocessed successfully with Gemini AI',
-            'entry': serializer.data,
-            'new_insights': insights,
-            'processing_status': entry.processing_status
-        })
-    
-    @action(detail=False, methods=['get'])
-    def ai_status(self, request):
-        """Get Gemini AI status"""
-        try:
-            # Configure and test Gemini AI connection
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Simple test query
-            response = model.generate_content("Hello, respond with 'Connected' if you receive this.")
-            
-            if response and response.text:
-                return Response({
-                    'ai_connected': True,
-                    'server': 'Google Gemini',
-                    'model': 'gemini-1.5-flash',
-                    'server_url': 'https://generativelanguage.googleapis.com',
-                    'test_successful': True,
-                    'message': ' Gemini AI is connected and responding'
-                })
-        except Exception as e:
-            error_msg = str(e).upper()
-            if "API_KEY" in error_msg or "INVALID" in error_msg:
-                message = " Invalid Gemini API key"
-                instructions = [
-                    '1. Verify your Gemini API key is correct',
-                    '2. Check Google AI Studio for API key status',
-                    '3. Ensure API key has proper permissions'
-                ]
-            elif "QUOTA" in error_msg or "LIMIT" in error_msg:
-                message = " Gemini API quota exceeded"
-                instructions = [
-                    '1. Check your API usage in Google AI Studio',
-                    '2. Wait for quota reset or upgrade plan',
-                    '3. Monitor your API usage'
-                ]
-            else:
-                message = f" Gemini connection failed: {str(e)[:100]}"
-                instructions = [
-                    '1. Check your internet connection',
-                    '2. Verify API key configuration',
-                    '3. Try again in a few moments'
-                ]
-            
-            return Response({
-                'ai_connected': False,
-                'server': 'Google Gemini',
-                'model': 'gemini-1.5-flash',
-                'message': message,
-                'instructions': instructions
-            })
-    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get enhanced context statistics"""
-        total_entries = ContextEntry.objects.count()
+        return Response(context_stats(self.get_queryset()))
+    
+    def selected_entries(self, request):
+        """Entries picked by ``ids``, a status/source_type filter or ``all`` - (queryset, error response)"""
+        queryset = self.get_queryset().order_by('created_at')
+        ids = request.data.get('ids')
         
-        # Count by source type
-        whatsapp_count = ContextEntry.objects.filter(source_type='whatsapp').count()
-        email_count = ContextEntry.objects.filter(source_type='email').count()
-        notes_count = ContextEntry.objects.filter(source_type='notes').count()
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                return None, Response({'error': 'ids must be a list of entry ids'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(pk__in=ids)
+        elif request.data.get('status') or request.data.get('source_type'):
+            if request.data.get('status'):
+                queryset = queryset.filter(processing_status=request.data['status'])
+            if request.data.get('source_type'):
+                queryset = queryset.filter(source_type=request.data['source_type'])
+        elif request.data.get('all') is not True:
+            return None, Response(
+                {'error': 'Provide ids, a status/source_type filter, or all: true'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return queryset, None
+    
+    @action(detail=False, methods=['post'])
+    def reprocess_bulk(self, request):
+        """Start a background reprocess job for ``ids`` or every entry matching status/source_type (or ``all``)"""
+        queryset, error = self.selected_entries(request)
+        if error:
+            return error
         
-        # Processing stats
-        processed_count = ContextEntry.objects.filter(processing_status='processed').count()
-        failed_count = ContextEntry.objects.filter(processing_status='failed').count()
-        processing_count = ContextEntry.objects.filter(processing_status='processing').count()
+        entry_ids = list(queryset.values_list('pk', flat=True))
+        if not entry_ids:
+            return Response({'error': 'No matching context entries'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Total insights
-        total_insights = sum(
-            len(entry.processed_insights) if entry.processed_insights else 0
-            for entry in ContextEntry.objects.filter(processing_status='processed')
+        job = start_reprocess_job(entry_ids, owner=request_owner(request))
+        return Response(
+            ReprocessJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('reprocessjob-detail', args=[job.pk], request=request)}
         )
+    
+    @action(detail=False, methods=['post'])
+    def extract_tasks(self, request):
+        """Turn processed entries (``ids``, a status/source_type filter or ``all``) into draft tasks in one batch"""
+        queryset, error = self.selected_entries(request)
+        if error:
+            return error
         
-        # Recent activity (last 7 days)
-        week_ago = timezone.now() - timedelta(days=7)
-        recent_entries = ContextEntry.objects.filter(
-            created_at__gte=week_ago
-        ).order_by('-created_at')[:5]
-        
-        recent_activity = []
-        for entry in recent_entries:
-            recent_activity.append({
-                'id': entry.id,
-                'content': entry.content[:50] + '...' if len(entry.content) > 50 else entry.content,
-                'source_type': entry.source_type,
-                'processing_status': entry.processing_status,
-                'created_at': entry.created_at,
-                'insights_count': entry.insights_count
-            })
-        
-        # AI processing efficiency
-        ai_success_rate = (processed_count / total_entries * 100) if total_entries > 0 else 0
-        
-        stats_data = {
-            'total_entries': total_entries,
-            'whatsapp_count': whatsapp_count,
-            'email_count': email_count,
-            'notes_count': notes_count,
-            'processed_count': processed_count,
-            'failed_count': failed_count,
-            'processing_count': processing_count,
-            'total_insights': total_insights,
-            'ai_success_rate': round(ai_success_rate, 1),
-            'recent_activity': recent_activity
-        }
-        
-        return Response(stats_data)
+        result = extract_tasks(queryset.filter(processing_status='processed'), request_owner(request))
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
     
     @action(detail=False, methods=['delete'])
     def clear_old(self, request):
         """Clear entries older than 30 days"""
         thirty_days_ago = timezone.now() - timedelta(days=30)
-        deleted_count = ContextEntry.objects.filter(
+        deleted_count = self.get_queryset().filter(
             created_at__lt=thirty_days_ago
         ).delete()[0]
+        prune_tombstones(ContextEntryTombstone)
         
         return Response({
             'message': f'Deleted {deleted_count} old entries',
             'deleted_count': deleted_count
         })
 
-@api_view(['GET'])
-def ai_health_check(request):
-    """Detailed Gemini AI health check"""
+class ReprocessJobViewSet(OwnerScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """Poll bulk reprocess jobs started by entries/reprocess_bulk/ or the admin"""
+    queryset = ReprocessJob.objects.all()
+    serializer_class = ReprocessJobSerializer
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Stop a job - in-flight entries finish, the rest are left as they are"""
+        job = self.get_object()
+        if job.is_finished:
+            return Response({'error': f'Job is already {job.status}'}, status=status.HTTP_409_CONFLICT)
+        return Response(ReprocessJobSerializer(cancel_job(job)).data)
+
+# =========================================
+# Async AI endpoints - served natively under ASGI so an in-flight Gemini
+# call does not pin a worker thread
+# =========================================
+
+@async_api_view(['POST'])
+async def reprocess(request, pk):
+    """Reprocess entry with AI"""
+    try:
+        entry = await ContextEntry.objects.for_owner(request_owner(request)).aget(pk=pk)
+    except ContextEntry.DoesNotExist:
+        return not_found(ContextEntry)
+    
+    # Process with AI
+    insights = await entry.aprocess_with_ai()
+    
+    serializer = ContextEntrySerializer(entry)
+    return JsonResponse({
+        'message': 'Entry reprocessed successfully with Gemini AI',
+        'entry': serializer.data,
+        'new_insights': insights,
+        'processing_status': entry.processing_status
+    })
+
+@async_api_view(['GET'])
+async def ai_status(request):
+    """Get Gemini AI status"""
     try:
-        # Configure and test Gemini AI
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Test Gemini AI connection
+        # Simple test query
+        test_response = await agenerate_content("Hello, respond with 'Connected' if you receive this.", call_site='context.ai_status')
+        if not test_response:
+            raise RuntimeError('Gemini returned an empty response')
+        
+        return JsonResponse({
+            'ai_connected': True,
+            'server': 'Google Gemini',
+            'model': 'gemini-1.5-flash',
+            'server_url': 'https://generativelanguage.googleapis.com',
+            'test_successful': True,
+            'message': ' Gemini AI is connected and responding'
+        })
+    except Exception as e:
+        error_msg = str(e).upper()
+        if "API_KEY" in error_msg or "INVALID" in error_msg:
+            message = " Invalid Gemini API key"
+            instructions = [
+                '1. Verify your Gemini API key is correct',
+                '2. Check Google AI Studio for API key status',
+                '3. Ensure API key has proper permissions'
+            ]
+        elif "QUOTA" in error_msg or "LIMIT" in error_msg:
+            message = " Gemini API quota exceeded"
+            instructions = [
+                '1. Check your API usage in Google AI Studio',
+                '2. Wait for quota reset or upgrade plan',
+                '3. Monitor your API usage'
+            ]
+        else:
+            message = f" Gemini connection failed: {str(e)[:100]}"
+            instructions = [
+                '1. Check your internet connection',
+                '2. Verify API key configuration',
+                '3. Try again in a few moments'
+            ]
         
+        return JsonResponse({
+            'ai_connected': False,
+            'server': 'Google Gemini',
+            'model': 'gemini-1.5-flash',
+            'message': message,
+            'instructions': instructions
+        })
+
+@async_api_view(['GET'])
+async def ai_health_check(request):
+    """Detailed Gemini AI health check"""
+    try:
         # Test AI processing with a simple query
-        test_response = model.generate_content("Test connection - respond with 'OK' if working")
+        test_response = await agenerate_content("Test connection - respond with 'OK' if working", call_site='context.health_check')
         
-        if test_response and test_response.text:
-            return Response({
+        if test_response:
+            return JsonResponse({
                 'status': 'connected',
                 'server': 'Google Gemini',
                 'model': 'gemini-1.5-flash',
                 'server_url': 'https://generativelanguage.googleapis.com',
                 'test_successful': True,
-                'test_response': test_response.text[:50],
+                'test_response': test_response[:50],
                 'message': ' Gemini AI is running and responding correctly'
             })
         else:
-            return Response({
+            return JsonResponse({
                 'status': 'partial',
                 'server': 'Google Gemini', 
                 'message': ' Gemini connected but not responding properly'
             })
             
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'status': 'disconnected',
             'server': 'Google Gemini',
             'model': 'gemini-1.5-flash',
@@ -3,6 +3,11 @@ ASGI config for smart_todo project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The AI endpoints are native async views and AI completion events are pushed
+over WebSockets (ws/ai-events/), so serve the project with an ASGI server, e.g.:
+
+    uvicorn smart_todo.asgi:application --workers 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +18,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_todo.settings')
 
-application = get_asgi_application()
+# Initialize Django before importing consumers that touch models
+django_asgi_app = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from ai_integration.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    # Sessions resolve scope['user'], so each socket only joins its owner's event group
+    'websocket': AllowedHostsOriginValidator(AuthMiddlewareStack(URLRouter(websocket_urlpatterns))),
+})
@@ -0,0 +1,90 @@
+import functools
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, QueryDict
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import CSRFCheck
+from rest_framework.settings import api_settings
+
+
+def _csrf_failure_reason(request):
+    """Same CSRF rule DRF's SessionAuthentication applies to logged-in users"""
+    check = CSRFCheck(lambda request: None)
+    check.process_request(request)
+    # DRF's CSRFCheck returns the failure reason instead of a response
+    return check.process_view(request, None, (), {})
+
+
+def _throttle_wait(request):
+    """Run the DRF default throttles - returns (throttled, seconds to wait)"""
+    waits = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            waits.append(throttle.wait())
+    if not waits:
+        return False, None
+    return True, max((wait for wait in waits if wait is not None), default=None)
+
+
+def _parse_body(request):
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    if request.method in ('POST', 'PUT', 'PATCH'):
+        return request.POST
+    return QueryDict()
+
+
+def async_api_view(http_method_names):
+    """
+    Async counterpart of DRF's @api_view for native coroutine views.
+
+    Keeps the API contract of the DRF endpoints it replaces (JSON errors,
+    throttling, session CSRF) without pinning a worker thread per request.
+    """
+    allowed = [method.upper() for method in http_method_names]
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+                response['Allow'] = ', '.join(allowed)
+                return response
+
+            request.user = await request.auser()
+
+            if request.user.is_authenticated and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                reason = _csrf_failure_reason(request)
+                if reason:
+                    return JsonResponse({'detail': f'CSRF Failed: {reason}'}, status=403)
+
+            # Throttles read and write the cache synchronously
+            throttled, wait = await sync_to_async(_throttle_wait)(request)
+            if throttled:
+                detail = 'Request was throttled.'
+                if wait is not None:
+                    wait = math.ceil(wait)
+                    detail = f"{detail} Expected available in {wait} second{'' if wait == 1 else 's'}."
+                response = JsonResponse({'detail': detail}, status=429)
+                if wait is not None:
+                    response['Retry-After'] = str(wait)
+                return response
+
+            try:
+                request.data = _parse_body(request)
+            except ValueError as e:
+                return JsonResponse({'detail': f'JSON parse error - {str(e)}'}, status=400)
+
+            return await view(request, *args, **kwargs)
+
+        return csrf_exempt(wrapped)
+
+    return decorator
+
+
+def not_found(model):
+    """404 body matching DRF's handling of get_object_or_404"""
+    return JsonResponse({'detail': f'No {model._meta.object_name} matches the given query.'}, status=404)
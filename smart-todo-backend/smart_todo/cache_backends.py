@@ -0,0 +1,330 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import locks
+
+INVALIDATION_SEQ_KEY = '__two_tier:seq'
+INVALIDATION_LOG_KEY = '__two_tier:log:{seq}'
+CLEAR_ALL = '*'
+_MISSING = object()
+
+
+class LockedFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache whose add/incr/decr are atomic across the processes of one host.
+
+    FileBasedCache does them as a read followed by a write, so two workers
+    could both claim a key or get the same incremented value. Here they run
+    under an exclusive OS lock on a file in the cache directory (ignored by
+    culling and clear(), which only touch cache files).
+    """
+    lock_name = 'atomic.lock'
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_name), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        # decr() is incr(-delta)
+        with self._locked():
+            return super().incr(key, delta, version)
+
+
+# L2 backends whose incr() is atomic - the invalidation log and collection versions depend on it
+ATOMIC_INCR_BACKENDS = (RedisCache, LockedFileBasedCache, LocMemCache)
+
+
+class _Tier1:
+    """Process-wide bounded LRU shared by every thread's cache handle"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, expires_at)
+        self.lock = threading.Lock()
+        self.last_seq = None
+        self.next_sync = 0.0
+        self.own_seqs = set()  # log entries this process wrote and already applied
+        self.stats = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self.entries[key]
+                self.stats['l1_misses'] += 1
+                return _MISSING
+            self.entries.move_to_end(key)
+            self.stats['l1_hits'] += 1
+            return item[0]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+
+# Django hands every thread its own backend instance, so L1 state lives at module level
+_tier1_stores = {}
+_tier1_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Small in-process LRU (L1) in front of a shared cache alias (L2).
+
+    LOCATION names the L2 alias in CACHES (Redis when available, otherwise a
+    file-based store every worker can see). Writes go to L2 and are appended
+    to an invalidation log in L2; each process replays that log at most every
+    SYNC_INTERVAL seconds and evicts the touched keys from its L1. L1_TIMEOUT
+    bounds staleness even if the log is lost. Keys starting with one of
+    L1_EXCLUDE_PREFIXES (e.g. DRF throttle history) always go straight to L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._sync_interval = options.get('SYNC_INTERVAL', 1.0)
+        self._max_backlog = options.get('MAX_INVALIDATION_BACKLOG', 1000)
+        self._exclude_prefixes = tuple(options.get('L1_EXCLUDE_PREFIXES', ()))
+
+        with _tier1_stores_lock:
+            self._tier1 = _tier1_stores.setdefault(location, _Tier1(options.get('L1_MAX_ENTRIES', 500)))
+
+    @property
+    def shared(self):
+        shared = caches[self._shared_alias]
+        if not isinstance(shared, ATOMIC_INCR_BACKENDS):
+            # Racing increments would hand two writers the same log slot and lose invalidations
+            raise ImproperlyConfigured(
+                f"TwoTierCache needs an L2 with an atomic incr(); '{self._shared_alias}' is {type(shared).__name__}. "
+                "Use Redis or smart_todo.cache_backends.LockedFileBasedCache."
+            )
+        return shared
+
+    # ----- helpers -----
+
+    def _uses_l1(self, key):
+        return not key.startswith(self._exclude_prefixes) if self._exclude_prefixes else True
+
+    def _l1_ttl(self, timeout):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if timeout is None:
+            return self._l1_timeout
+        return min(timeout, self._l1_timeout)
+
+    def _publish(self, full_key):
+        """Tell other processes to drop ``full_key`` from their L1"""
+        try:
+            seq = self.shared.incr(INVALIDATION_SEQ_KEY)
+        except ValueError:
+            self.shared.add(INVALIDATION_SEQ_KEY, 0, None)
+            seq = self.shared.incr(INVALIDATION_SEQ_KEY)
+        with self._tier1.lock:
+            self._tier1.own_seqs.add(seq)
+        self.shared.set(
+            INVALIDATION_LOG_KEY.format(seq=seq), full_key,
+            max(60, int(self._sync_interval * self._max_backlog))
+        )
+
+    def _sync(self):
+        """Replay the shared invalidation log into this process's L1"""
+        tier1 = self._tier1
+        now = time.monotonic()
+        if now < tier1.next_sync:
+            return
+        tier1.next_sync = now + self._sync_interval
+
+        seq = self.shared.get(INVALIDATION_SEQ_KEY)
+        last_seq, tier1.last_seq = tier1.last_seq, seq or 0
+        if last_seq is None:
+            # Anything cached before we knew our position in the log is suspect
+            tier1.clear()
+            return
+        if seq == last_seq:
+            return
+
+        with tier1.lock:
+            own_seqs, tier1.own_seqs = tier1.own_seqs, set()
+
+        if seq is None or seq < last_seq or seq - last_seq > self._max_backlog:
+            tier1.clear()
+            tier1.count('invalidations')
+            return
+
+        log_keys = [
+            INVALIDATION_LOG_KEY.format(seq=n) for n in range(last_seq + 1, seq + 1) if n not in own_seqs
+        ]
+        if not log_keys:
+            return
+        invalidated = self.shared.get_many(log_keys)
+        if len(invalidated) < len(log_keys) or CLEAR_ALL in invalidated.values():
+            # Part of the log expired - we can't know what changed
+            tier1.clear()
+        else:
+            for full_key in invalidated.values():
+                tier1.discard(full_key)
+        tier1.count('invalidations', len(log_keys))
+
+    def _read_l1(self, key, version):
+        if not self._uses_l1(key):
+            return None, _MISSING
+        self._sync()
+        full_key = self.make_and_validate_key(key, version=version)
+        return full_key, self._tier1.get(full_key)
+
+    # ----- cache API -----
+
+    def get(self, key, default=None, version=None):
+        full_key, value = self._read_l1(key, version)
+        if value is not _MISSING:
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._tier1.count('l2_misses')
+            return default
+
+        self._tier1.count('l2_hits')
+        if full_key is not None:
+            self._tier1.set(full_key, value, self._l1_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remaining = {}, []
+        for key in keys:
+            full_key, value = self._read_l1(key, version)
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+
+        if remaining:
+            shared_values = self.shared.get_many(remaining, version=version)
+            self._tier1.count('l2_hits', len(shared_values))
+            self._tier1.count('l2_misses', len(remaining) - len(shared_values))
+            for key, value in shared_values.items():
+                if self._uses_l1(key):
+                    self._tier1.set(self.make_and_validate_key(key, version=version), value, self._l1_timeout)
+            found.update(shared_values)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self.shared.set(key, value, timeout, version=version)
+        if self._uses_l1(key):
+            full_key = self.make_and_validate_key(key, version=version)
+            ttl = self._l1_ttl(timeout)
+            if ttl > 0:
+                self._tier1.set(full_key, value, ttl)
+            else:
+                self._tier1.discard(full_key)
+            self._publish(full_key)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and self._uses_l1(key):
+            full_key = self.make_and_validate_key(key, version=version)
+            self._tier1.discard(full_key)
+            self._publish(full_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        if self._uses_l1(key):
+            full_key = self.make_and_validate_key(key, version=version)
+            self._tier1.discard(full_key)
+            self._publish(full_key)
+        return value
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version=version)
+        if self._uses_l1(key):
+            full_key = self.make_and_validate_key(key, version=version)
+            self._tier1.discard(full_key)
+            self._publish(full_key)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        _, value = self._read_l1(key, version)
+        return value is not _MISSING or self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        self._tier1.clear()
+        self._publish(CLEAR_ALL)
+
+    def close(self, **kwargs):
+        caches[self._shared_alias].close(**kwargs)
+
+    # ----- metrics -----
+
+    def stats(self):
+        """Hit/miss counters and hit ratios per tier for this process"""
+        with self._tier1.lock:
+            stats = dict(self._tier1.stats)
+            stats['l1_entries'] = len(self._tier1.entries)
+        for tier in ('l1', 'l2'):
+            lookups = stats[f'{tier}_hits'] + stats[f'{tier}_misses']
+            stats[f'{tier}_hit_ratio'] = round(stats[f'{tier}_hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+def cache_stats():
+    """Per-alias stats for every two-tier cache configured in CACHES"""
+    from django.conf import settings
+
+    return {
+        alias: caches[alias].stats()
+        for alias, config in settings.CACHES.items()
+        if config['BACKEND'] == f'{__name__}.TwoTierCache'
+    }
@@ -0,0 +1,93 @@
+import importlib.util
+import os
+import warnings
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+POSTGRES_SCHEMES = ('postgres', 'postgresql', 'pgsql')
+
+# DB_PROFILE values - how each worker manages its connections
+PROFILES = ('persistent', 'pooler', 'pool')
+
+
+def _int(environ, name, default):
+    return int(environ.get(name, default))
+
+
+def _connection_from_url(url):
+    parts = urlsplit(url)
+    if parts.scheme in POSTGRES_SCHEMES:
+        return {
+            'ENGINE': 'smart_todo.db_backends.postgresql',
+            'NAME': unquote(parts.path.lstrip('/')),
+            'USER': unquote(parts.username or ''),
+            'PASSWORD': unquote(parts.password or ''),
+            'HOST': parts.hostname or '',
+            'PORT': str(parts.port or ''),
+            'OPTIONS': dict(parse_qsl(parts.query)),
+        }
+    if parts.scheme == 'sqlite':
+        # sqlite:////abs/path.db or sqlite:///relative.db
+        return {'ENGINE': 'smart_todo.db_backends.sqlite3', 'NAME': unquote(parts.path[1:]) or ':memory:', 'OPTIONS': {}}
+    raise ValueError(f"Unsupported DATABASE_URL scheme '{parts.scheme}'")
+
+
+def database_config(base_dir, environ=os.environ):
+    """
+    DATABASES['default'] built from the environment.
+
+    Connection details come from DATABASE_URL or DB_NAME/DB_USER/DB_PASSWORD/
+    DB_HOST/DB_PORT/DB_SSLMODE; without either a local SQLite file is used.
+    DB_PROFILE selects connection management for Postgres:
+
+    - persistent: keep a worker's connection for DB_CONN_MAX_AGE seconds
+    - pooler: persistent connections to a transaction-mode pooler (PgBouncer,
+      Neon "-pooler" hosts), so server-side cursors are disabled
+    - pool: client-side psycopg 3 pool (DB_POOL_MIN_SIZE/MAX_SIZE/TIMEOUT)
+    """
+    if environ.get('DATABASE_URL'):
+        config = _connection_from_url(environ['DATABASE_URL'])
+    elif environ.get('DB_NAME'):
+        config = {
+            'ENGINE': 'smart_todo.db_backends.postgresql',
+            'NAME': environ['DB_NAME'],
+            'USER': environ.get('DB_USER', ''),
+            'PASSWORD': environ.get('DB_PASSWORD', ''),
+            'HOST': environ.get('DB_HOST', ''),
+            'PORT': environ.get('DB_PORT', '5432'),
+            'OPTIONS': {'sslmode': environ.get('DB_SSLMODE', 'prefer')},
+        }
+    else:
+        config = {'ENGINE': 'smart_todo.db_backends.sqlite3', 'NAME': str(base_dir / 'db.sqlite3'), 'OPTIONS': {}}
+
+    if not config['ENGINE'].endswith('postgresql'):
+        return config
+
+    options = config['OPTIONS']
+    options.setdefault('connect_timeout', _int(environ, 'DB_CONNECT_TIMEOUT', 10))
+
+    default_profile = 'pooler' if '-pooler' in config['HOST'] else 'persistent'
+    profile = environ.get('DB_PROFILE', default_profile)
+    if profile not in PROFILES:
+        raise ValueError(f"DB_PROFILE must be one of {', '.join(PROFILES)}, got '{profile}'")
+
+    if profile == 'pool' and not (importlib.util.find_spec('psycopg') and importlib.util.find_spec('psycopg_pool')):
+        warnings.warn("DB_PROFILE=pool needs 'psycopg[pool]' - falling back to persistent connections")
+        profile = default_profile
+
+    if profile == 'pool':
+        # Django hands pooled connections back on close, so they must not persist
+        config['CONN_MAX_AGE'] = 0
+        options['pool'] = {
+            'min_size': _int(environ, 'DB_POOL_MIN_SIZE', 2),
+            'max_size': _int(environ, 'DB_POOL_MAX_SIZE', 10),
+            'timeout': float(environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        config['CONN_MAX_AGE'] = _int(environ, 'DB_CONN_MAX_AGE', 600)
+        # Re-validate a reused connection before the first query of each request
+        config['CONN_HEALTH_CHECKS'] = True
+
+    if profile == 'pooler':
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+    return config
@@ -0,0 +1,66 @@
+import threading
+import time
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _alias_stats(alias):
+    return _stats.setdefault(alias, {
+        'connects': 0,
+        'connect_wait_ms_total': 0.0,
+        'connect_wait_ms_max': 0.0,
+        'closes': 0,
+        'age_at_close_s_total': 0.0,
+        'age_at_close_s_max': 0.0,
+    })
+
+
+def record_connect(alias, seconds):
+    with _lock:
+        stats = _alias_stats(alias)
+        stats['connects'] += 1
+        stats['connect_wait_ms_total'] += seconds * 1000
+        stats['connect_wait_ms_max'] = max(stats['connect_wait_ms_max'], seconds * 1000)
+
+
+def record_close(alias, age):
+    with _lock:
+        stats = _alias_stats(alias)
+        stats['closes'] += 1
+        stats['age_at_close_s_total'] += age
+        stats['age_at_close_s_max'] = max(stats['age_at_close_s_max'], age)
+
+
+def connection_stats():
+    """Per-alias connection wait and age counters for this process"""
+    with _lock:
+        snapshot = {alias: dict(stats) for alias, stats in _stats.items()}
+    for stats in snapshot.values():
+        stats['connect_wait_ms_avg'] = round(stats['connect_wait_ms_total'] / stats['connects'], 2) if stats['connects'] else None
+        stats['age_at_close_s_avg'] = round(stats['age_at_close_s_total'] / stats['closes'], 2) if stats['closes'] else None
+    return snapshot
+
+
+class ConnectionMetricsMixin:
+    """Time every new (or pooled) connection and record how long it lived"""
+
+    _connected_at = None
+
+    def get_new_connection(self, conn_params):
+        # With a client-side pool this is the time spent waiting for a free connection
+        start = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        record_connect(self.alias, time.perf_counter() - start)
+        self._connected_at = time.monotonic()
+        return connection
+
+    def _close(self):
+        if self._connected_at is not None:
+            record_close(self.alias, time.monotonic() - self._connected_at)
+            self._connected_at = None
+        return super()._close()
+
+    def connection_age(self):
+        """Seconds since this thread's connection was opened (None when closed)"""
+        return None if self._connected_at is None else time.monotonic() - self._connected_at
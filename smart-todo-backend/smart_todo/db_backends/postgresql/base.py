@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from ..metrics import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    """PostgreSQL backend with connection wait/age metrics"""
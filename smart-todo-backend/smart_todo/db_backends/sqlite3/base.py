@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from ..metrics import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    """SQLite backend with connection wait/age metrics (local runs)"""
@@ -0,0 +1,215 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from rest_framework.response import Response
+
+from ai_integration.models import IdempotencyKey
+from .ownership import owner_key, request_owner
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Response headers worth replaying (Location of a created row)
+STORED_HEADERS = ('Location',)
+
+
+def _find_request(args):
+    # Plain views get the request first, viewset methods second
+    return next(arg for arg in args if hasattr(arg, 'META'))
+
+
+def _claim_key(request, key):
+    scope = f'{owner_key(request_owner(request))}:{request.method}:{request.path}:{key}'
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):  # QueryDict
+        data = dict(data.lists())
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _stored(response, fingerprint):
+    record = {
+        'state': 'done',
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+    }
+    if isinstance(response, Response):
+        record['data'] = response.data
+    else:
+        record['content'] = response.content.decode(response.charset)
+        record['content_type'] = response['Content-Type']
+    return record
+
+
+def _replay(record):
+    if 'data' in record:
+        response = Response(record['data'], status=record['status'], headers=record['headers'])
+    else:
+        response = HttpResponse(record['content'], status=record['status'], content_type=record['content_type'])
+        for name, value in record['headers'].items():
+            response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _rejection(record, fingerprint, is_drf):
+    """Response for a key whose first request is finished or still running, or None to replay it"""
+    respond = Response if is_drf else JsonResponse
+    if record['fingerprint'] != fingerprint:
+        return respond({'detail': f'{HEADER} was already used with a different request.'}, status=422)
+    if record['state'] == 'pending':
+        response = respond({'detail': f'A request with this {HEADER} is still in progress.'}, status=409)
+        response['Retry-After'] = '1'
+        return response
+    return None
+
+
+def _claim(key, fingerprint):
+    """
+    Claim a key for the request about to run - False if another request holds it.
+
+    The claim is an INSERT under the primary key, so of any number of
+    concurrent requests on any worker exactly one wins (a cache add is only
+    atomic on some backends). An expired row for the key, e.g. the claim of
+    a crashed worker, is removed first; other expired rows are pruned by a
+    sample of IDEMPOTENCY_PRUNE_RATE of the claims.
+    """
+    now = timezone.now()
+    IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+    if random.random() < settings.IDEMPOTENCY_PRUNE_RATE:
+        IdempotencyKey.objects.filter(expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def _load(key):
+    """The stored record of a claimed key, or None once it expired or was released"""
+    row = IdempotencyKey.objects.filter(key=key, expires_at__gt=timezone.now()).values_list('fingerprint', 'response').first()
+    if row is None:
+        return None
+    fingerprint, response = row
+    if response is None:
+        return {'state': 'pending', 'fingerprint': fingerprint}
+    return response
+
+
+def _release(key):
+    IdempotencyKey.objects.filter(key=key).delete()
+
+
+def _finish(key, response, fingerprint):
+    if response.status_code >= 500:
+        _release(key)  # let the client's retry run again
+    else:
+        IdempotencyKey.objects.filter(key=key).update(
+            response=_stored(response, fingerprint),
+            expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+        )
+
+
+_aclaim, _aload, _arelease, _afinish = (sync_to_async(function) for function in (_claim, _load, _release, _finish))
+
+
+def _log_replay(request):
+    logger.info(f"Replaying stored response for {request.method} {request.path} ({HEADER} reuse)")
+
+
+def idempotent(view):
+    """
+    Honour an Idempotency-Key header on a view (sync or async, function or viewset method).
+
+    The first request with a key claims it and runs; its response is stored
+    for IDEMPOTENCY_TTL seconds and replayed for retries with the same key and
+    body, without running the view again. A retry arriving while the first is
+    still running waits up to IDEMPOTENCY_WAIT seconds for its response. Keys
+    are scoped to the owner and endpoint; reusing one with a different body is
+    a 422. Failures (exceptions, 5xx) release the key so a retry can run.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapped(*args, **kwargs):
+            request = _find_request(args)
+            key = request.headers.get(HEADER)
+            if not key:
+                return await view(*args, **kwargs)
+            if len(key) > 255:
+                return JsonResponse({'detail': f'{HEADER} must be at most 255 characters.'}, status=400)
+
+            claim_key, fingerprint = _claim_key(request, key), _fingerprint(request)
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+            while not await _aclaim(claim_key, fingerprint):
+                record = await _aload(claim_key)
+                if record is None:
+                    continue  # released or expired between claim and load
+                rejection = _rejection(record, fingerprint, is_drf=False)
+                if rejection is None:
+                    _log_replay(request)
+                    return _replay(record)
+                if rejection.status_code != 409 or time.monotonic() > deadline:
+                    return rejection
+                await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+            try:
+                response = await view(*args, **kwargs)
+            except BaseException:
+                await _arelease(claim_key)
+                raise
+            await _afinish(claim_key, response, fingerprint)
+            return response
+
+        return async_wrapped
+
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        request = _find_request(args)
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return Response({'detail': f'{HEADER} must be at most 255 characters.'}, status=400)
+
+        claim_key, fingerprint = _claim_key(request, key), _fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while not _claim(claim_key, fingerprint):
+            record = _load(claim_key)
+            if record is None:
+                continue
+            rejection = _rejection(record, fingerprint, is_drf=True)
+            if rejection is None:
+                _log_replay(request)
+                return _replay(record)
+            if rejection.status_code != 409 or time.monotonic() > deadline:
+                return rejection
+            time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            _release(claim_key)
+            raise
+        _finish(claim_key, response, fingerprint)
+        return response
+
+    return wrapped
@@ -0,0 +1,20 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+def is_internal_request(request):
+    """Staff sessions, or monitoring presenting ``Authorization: Bearer <INTERNAL_API_TOKEN>``"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    token = settings.INTERNAL_API_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+class IsInternal(BasePermission):
+    """Operational endpoints that must not be readable by anonymous clients"""
+
+    def has_permission(self, request, view):
+        return is_internal_request(request)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import models
+
+# Partition of rows without an owner: anonymous API clients and pre-ownership data
+ANONYMOUS = 'anonymous'
+
+
+def owner_field(related_name):
+    """Nullable owner FK - NULL is the shared anonymous partition"""
+    return models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name=related_name,
+    )
+
+
+def request_owner(request):
+    """The authenticated user of ``request``, or None for the anonymous partition"""
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def _owner_id(owner):
+    return getattr(owner, 'pk', owner)
+
+
+def owner_key(owner):
+    """Stable string for a user, user id or None - used in cache and counter keys"""
+    owner_id = _owner_id(owner)
+    return ANONYMOUS if owner_id is None else f'user-{owner_id}'
+
+
+def owned_collection(name, owner):
+    """Per-owner cache collection, so one user's writes never invalidate another's lists"""
+    return f'{name}:{owner_key(owner)}'
+
+
+class OwnedQuerySet(models.QuerySet):
+    def for_owner(self, owner):
+        """Rows of one owner (a user, user id or None for the anonymous partition)"""
+        owner_id = _owner_id(owner)
+        if owner_id is None:
+            return self.filter(owner__isnull=True)
+        return self.filter(owner_id=owner_id)
+
+
+class OwnerScopedMixin:
+    """ViewSet mixin limiting every query to the requesting user's rows"""
+
+    def get_queryset(self):
+        return super().get_queryset().for_owner(request_owner(self.request))
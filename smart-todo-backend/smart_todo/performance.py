@@ -0,0 +1,239 @@
+import bisect
+import contextlib
+import contextvars
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Upper bounds (seconds) shared by every timing histogram
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Per-request breakdown kinds, in Server-Timing order
+KINDS = ('db', 'ai', 'serialize')
+
+
+class RequestStats:
+    """Time and call counts spent in the DB, Gemini and serialization during one request"""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # chunk analysis records from worker threads
+        self.seconds = dict.fromkeys(KINDS, 0.0)
+        self.calls = dict.fromkeys(KINDS, 0)
+        self.threads = None  # set by the profiler: threads that worked for this request
+
+    def add(self, kind, seconds):
+        with self.lock:
+            self.seconds[kind] += seconds
+            self.calls[kind] += 1
+            if self.threads is not None:
+                self.threads.add(threading.get_ident())
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def current_stats():
+    """RequestStats of the request being handled, if any"""
+    return _current.get()
+
+
+def record(kind, seconds):
+    """Attribute ``seconds`` of ``kind`` work to the current request, if any"""
+    stats = _current.get()
+    if stats is not None:
+        stats.add(kind, seconds)
+
+
+@contextlib.contextmanager
+def timed(kind):
+    """Time a block as db/ai/serialize work of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, time.perf_counter() - start)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Database execute wrapper feeding the per-request DB breakdown"""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('db', time.perf_counter() - start)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # connection_created fires on every reconnect of the same wrapper
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+connection_created.connect(install_query_timer, dispatch_uid='smart_todo.performance.query_timer')
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set (Prometheus semantics)"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {values[-1]}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('smart_todo_request_duration_seconds', 'Wall time per request', TIME_BUCKETS)
+KIND_SECONDS = {
+    'db': Histogram('smart_todo_request_db_seconds', 'Time spent in SQL per request', TIME_BUCKETS),
+    'ai': Histogram('smart_todo_request_ai_seconds', 'Time spent waiting on Gemini per request', TIME_BUCKETS),
+    'serialize': Histogram('smart_todo_request_serialize_seconds', 'Serialization and rendering time per request', TIME_BUCKETS),
+}
+KIND_CALLS = {
+    'db': Histogram('smart_todo_request_db_queries', 'SQL queries per request', COUNT_BUCKETS),
+    'ai': Histogram('smart_todo_request_ai_calls', 'Gemini calls per request', COUNT_BUCKETS),
+}
+
+
+def view_label(request):
+    """'TaskViewSet.list', 'enhance_with_ai'... for the resolved view"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    view_class = getattr(func, 'cls', None)
+    actions = getattr(func, 'actions', None)
+    if view_class is not None and actions:
+        return f"{view_class.__name__}.{actions.get(request.method.lower(), request.method.lower())}"
+    if view_class is not None:
+        return view_class.__name__
+    return getattr(func, '__name__', match.view_name)
+
+
+def server_timing(stats, total):
+    parts = [
+        f'{kind};dur={stats.seconds[kind] * 1000:.1f};desc="{stats.calls[kind]} call{"" if stats.calls[kind] == 1 else "s"}"'
+        for kind in KINDS
+    ]
+    parts.append(f'app;dur={(total - sum(stats.seconds.values())) * 1000:.1f}')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class PerformanceMiddleware:
+    """
+    Per-view wall time with DB, Gemini and serialization breakdown.
+
+    Aggregates go to the histograms exposed at /api/metrics; a sampled share
+    of responses (PERFORMANCE_SAMPLE_RATE, or every request in DEBUG that sends
+    ``X-Request-Timing: 1``) also carries a Server-Timing header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def start(self):
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+        labels = (('view', view_label(request)), ('method', request.method))
+
+        REQUEST_SECONDS.observe(labels + (('status', f'{response.status_code // 100}xx'),), total)
+        for kind, histogram in KIND_SECONDS.items():
+            histogram.observe(labels, stats.seconds[kind])
+        for kind, histogram in KIND_CALLS.items():
+            histogram.observe(labels, stats.calls[kind])
+
+        sampled = random.random() < settings.PERFORMANCE_SAMPLE_RATE or (
+            settings.DEBUG and request.headers.get('X-Request-Timing') == '1'
+        )
+        if sampled:
+            response['Server-Timing'] = server_timing(stats, total)
+        return response
+
+
+def prometheus_text():
+    """All request histograms plus cache and DB connection counters"""
+    from .cache_backends import cache_stats
+    from .db_backends.metrics import connection_stats
+
+    lines = REQUEST_SECONDS.expose()
+    for histogram in (*KIND_SECONDS.values(), *KIND_CALLS.values()):
+        lines.extend(histogram.expose())
+
+    lines += ['# HELP smart_todo_cache_lookups_total Cache lookups per alias, tier and result',
+              '# TYPE smart_todo_cache_lookups_total counter']
+    for alias, stats in cache_stats().items():
+        for tier in ('l1', 'l2'):
+            for result, key in (('hit', 'hits'), ('miss', 'misses')):
+                lines.append(
+                    f'smart_todo_cache_lookups_total{{alias="{alias}",tier="{tier}",result="{result}"}} '
+                    f'{stats[f"{tier}_{key}"]}'
+                )
+
+    lines += ['# HELP smart_todo_db_connects_total New database connections (or pool checkouts)',
+              '# TYPE smart_todo_db_connects_total counter']
+    connections = connection_stats()
+    for alias, stats in connections.items():
+        lines.append(f'smart_todo_db_connects_total{{alias="{alias}"}} {stats["connects"]}')
+    lines += ['# HELP smart_todo_db_connect_wait_seconds_total Time spent opening or waiting for connections',
+              '# TYPE smart_todo_db_connect_wait_seconds_total counter']
+    for alias, stats in connections.items():
+        lines.append(f'smart_todo_db_connect_wait_seconds_total{{alias="{alias}"}} {stats["connect_wait_ms_total"] / 1000:.6f}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,151 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+
+from .performance import current_stats, view_label
+
+PROFILE_TOKEN_SALT = 'smart_todo.profiling'
+PROFILE_HEADER = 'X-Profile-Token'
+
+
+def make_profile_token(endpoint='*'):
+    """Signed X-Profile-Token value enabling profiling of ``endpoint`` (or any view)"""
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign(endpoint)
+
+
+def _token_endpoint(request):
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return None
+    try:
+        return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    for prefix in (str(settings.BASE_DIR) + os.sep, *(path + os.sep for path in sys.path if path)):
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f'{filename}:{code.co_name}'
+
+
+class StackSampler:
+    """Samples the stacks of a set of threads into collapsed (flame graph) form"""
+
+    def __init__(self, threads, interval):
+        self.threads = threads
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self._stop.is_set():
+                break  # the request thread is already waiting on us
+            for thread_id in tuple(self.threads):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+
+def save_profile(label, stacks):
+    """Write collapsed stacks to PROFILE_DIR/<label>/ and return the profile id"""
+    directory = Path(settings.PROFILE_DIR) / label
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    lines = [f'{stack} {count}' for stack, count in stacks.most_common()]
+    (directory / f'{profile_id}.folded').write_text('\n'.join(lines) + '\n')
+    return profile_id
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in sampling profiler for individual requests.
+
+    A request is profiled when it carries a valid signed X-Profile-Token
+    (see ``manage.py profile_token``) or is picked by PROFILE_SAMPLE_RATE,
+    optionally limited to PROFILE_ENDPOINTS. The threads serving the request
+    (the one running this middleware, plus any thread that runs queries or AI
+    calls for it) are sampled every PROFILE_INTERVAL seconds and the collapsed
+    stacks land in PROFILE_DIR/<view>/ for ``manage.py profile_summary``.
+    Must sit below PerformanceMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sampler = self.start(request)
+        if sampler is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        return self.finish(request, response, stacks)
+
+    async def __acall__(self, request):
+        sampler = self.start(request)
+        if sampler is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        return self.finish(request, response, stacks)
+
+    def start(self, request):
+        request._profile_endpoint = _token_endpoint(request)
+        if request._profile_endpoint is None and not (
+            settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE
+        ):
+            return None
+        stats = current_stats()
+        if stats is None:
+            return None
+        stats.threads = {threading.get_ident()}
+        return StackSampler(stats.threads, settings.PROFILE_INTERVAL).start()
+
+    def finish(self, request, response, stacks):
+        label = view_label(request)
+        wanted = request._profile_endpoint
+        if wanted not in (None, '*') and wanted != label:
+            return response
+        if wanted is None and settings.PROFILE_ENDPOINTS and label not in settings.PROFILE_ENDPOINTS:
+            return response
+        if stacks:
+            response['X-Profile-Id'] = f'{label}/{save_profile(label, stacks)}'
+        return response
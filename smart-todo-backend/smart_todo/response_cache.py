@@ -0,0 +1,101 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .ownership import owned_collection, request_owner
+
+VERSION_KEY = 'collection:{name}:version'
+MODIFIED_KEY = 'collection:{name}:modified'
+RESPONSE_KEY = 'list-response:{fingerprint}'
+
+
+def collection_state(name):
+    """(version, last-modified timestamp) of a collection"""
+    keys = [VERSION_KEY.format(name=name), MODIFIED_KEY.format(name=name)]
+    values = cache.get_many(keys)
+
+    if len(values) < len(keys):
+        # Seed from the clock so an evicted or restarted cache never reissues an old ETag
+        now = time.time()
+        cache.add(keys[0], int(now * 1000), None)
+        cache.add(keys[1], int(now), None)
+        values = cache.get_many(keys)
+
+    return values.get(keys[0], 0), values.get(keys[1], 0)
+
+
+def bump_collection(name):
+    """Invalidate every cached response and ETag that depends on a collection"""
+    now = time.time()
+    try:
+        cache.incr(VERSION_KEY.format(name=name))
+    except ValueError:
+        # Seed like collection_state, then increment - concurrent bumps each still count
+        cache.add(VERSION_KEY.format(name=name), int(now * 1000), None)
+        cache.incr(VERSION_KEY.format(name=name))
+    cache.set(MODIFIED_KEY.format(name=name), int(now), None)
+
+
+def cached_list(*collections, max_age=None):
+    """
+    Cache a viewset ``list`` response until one of ``collections`` changes.
+
+    Collections are tracked per owner (see ``owned_collection``). The ETag is
+    derived from the collection versions plus the absolute request URI, so an
+    unchanged poll is answered with a bodyless 304 and a changed one re-runs
+    the query exactly once per version. Responses that also depend on the
+    clock (e.g. overdue counts) pass ``max_age`` seconds to start a new
+    version at least that often.
+    """
+    def decorator(list_method):
+        @functools.wraps(list_method)
+        def wrapped(self, request, *args, **kwargs):
+            owner = request_owner(request)
+            names = [owned_collection(name, owner) for name in collections]
+            states = [collection_state(name) for name in names]
+            versions = ','.join(f'{name}={version}' for name, (version, _) in zip(names, states))
+            last_modified = max(modified for _, modified in states)
+            if max_age:
+                window = int(time.time() // max_age)
+                versions += f',clock={window}'
+                last_modified = max(last_modified, window * max_age)
+
+            fingerprint = hashlib.sha256(
+                # Absolute URI: the cached body holds next/previous links with this host and scheme
+                f'{versions}|{request.accepted_renderer.format}|{request.build_absolute_uri()}'.encode()
+            ).hexdigest()[:32]
+            etag = quote_etag(fingerprint)
+
+            # Only the ETag validates: Last-Modified has 1s resolution, so If-Modified-Since alone
+            # would answer 304 for a write made later in the same second
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                not_modified['Last-Modified'] = http_date(last_modified)
+                return not_modified
+
+            cache_key = RESPONSE_KEY.format(fingerprint=fingerprint)
+            data = cache.get(cache_key)
+            if data is None:
+                response = list_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                data = response.data
+                cache.set(cache_key, data, min(max_age or settings.LIST_CACHE_TIMEOUT, settings.LIST_CACHE_TIMEOUT))
+
+            response = Response(data)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Clients may keep the body but must revalidate on every poll
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return wrapped
+
+    return decorator
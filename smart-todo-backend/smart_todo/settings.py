@@ -1,9 +1,24 @@
 import os
 from pathlib import Path
 
+from .database import database_config
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # python-dotenv is optional, plain environment variables work too
+    load_dotenv = None
+
  
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Local overrides (DATABASE_URL, REDIS_URL...) are only read from a file when asked for,
+# e.g. DJANGO_ENV_FILE=.env (relative to smart-todo-backend/); tests and plain runs use SQLite.
+ENV_FILE = os.environ.get('DJANGO_ENV_FILE')
+if ENV_FILE:
+    if load_dotenv is None:
+        raise ImportError('DJANGO_ENV_FILE is set but python-dotenv is not installed')
+    load_dotenv(BASE_DIR / ENV_FILE)
+
  
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-your-secret-key-here-change-for-production'
@@ -23,12 +38,17 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'channels',
     'tasks',
     'context',
     'ai_integration',
 ]
 
 MIDDLEWARE = [
+    # Outermost so it times everything below it (see /api/metrics)
+    'smart_todo.performance.PerformanceMiddleware',
+    # Samples stacks of requests with a signed X-Profile-Token (or PROFILE_SAMPLE_RATE)
+    'smart_todo.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,24 +79,18 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'smart_todo.wsgi.application'
+ASGI_APPLICATION = 'smart_todo.asgi.application'
  
+# Database connection comes from DATABASE_URL (or DB_* variables), see smart_todo/database.py.
+# DB_PROFILE=persistent|pooler|pool picks persistent connections or a client-side psycopg pool.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'neondb',
-        'USER': 'neondb_owner',
-        'PASSWORD': 'npg_VqFnU34IRDsw',
-        'HOST': 'ep-blue-night-adqf392k-pooler.c-2.us-east-1.aws.neon.tech',
-        'PORT': '5432',
-        'OPTIONS': {
-            'sslmode': 'require',
-            'sslcert': None,
-            'sslkey': None,
-            'sslrootcert': None,
-        },
-    }
+    'default': database_config(BASE_DIR),
 }
 
+# /api/health/db/ and /api/metrics answer staff sessions, or requests with
+# "Authorization: Bearer $INTERNAL_API_TOKEN" (set it for monitoring and Prometheus scrapes)
+INTERNAL_API_TOKEN = os.environ.get('INTERNAL_API_TOKEN')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -135,6 +149,8 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-profile-token',
+    'idempotency-key',
 ]
 
  
@@ -143,7 +159,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'smart_todo.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
@@ -179,6 +195,14 @@ AI_TEMPERATURE = 0.7
 AI_TIMEOUT = 30  # seconds
 AI_RETRY_ATTEMPTS = 3
 
+# Long content is split into chunks of this many (estimated) tokens and analyzed in parallel
+AI_CHUNK_TOKEN_BUDGET = 2000
+# Chunk calls in flight per entry - the pool is sized to the chunk count up to this cap (Gemini rate limits)
+AI_CHUNK_MAX_WORKERS = 4
+
+# Async AI endpoints share one keep-alive HTTP pool per worker process
+AI_ASYNC_MAX_CONNECTIONS = 200
+
 # AI Feature Toggles - ALL ENABLED
 AI_CONTEXT_PROCESSING = True
 AI_TASK_PRIORITIZATION = True
@@ -197,16 +221,40 @@ AI_USER_LIMIT = 100  # requests per user per day
 # AI Cache Settings
 AI_CACHE_ENABLED = True
 AI_CACHE_TIMEOUT = 3600  # 1 hour
+TASK_PREVIEW_TTL = 900  # seconds a preview_token (and the analysis it references) can be used to create the task
 
 # Context Analysis Settings (Assignment Feature)
 CONTEXT_ANALYSIS_ENABLED = True
 CONTEXT_RETENTION_DAYS = 30
 CONTEXT_BATCH_SIZE = 100
+# Bulk reprocess jobs (entries/reprocess_bulk/, admin action) share this many worker threads per process
+CONTEXT_REPROCESS_WORKERS = 8
+CONTEXT_REPROCESS_POLL_INTERVAL = 1.0  # seconds between cancellation checks
+# Running jobs without progress for this long lost their worker (manage.py resume_reprocess_jobs)
+CONTEXT_REPROCESS_STALE_AFTER = 300
+# Create draft tasks from each newly processed entry (and at the end of reprocess jobs)
+CONTEXT_EXTRACT_TASKS = os.getenv('CONTEXT_EXTRACT_TASKS', 'False').lower() == 'true'
+CONTEXT_TASK_DESCRIPTION_CHARS = 500  # extracted tasks keep this much of the entry as their description
 
 # Smart Categorization Settings (Assignment Feature)
 AUTO_CATEGORIZATION = True
 CATEGORY_CONFIDENCE_THRESHOLD = 0.7
 
+# AI call ledger (ai_integration.AICallRecord) - buffered, bulk-written off the request path
+AI_TELEMETRY_ENABLED = True
+AI_TELEMETRY_FLUSH_INTERVAL = 5  # seconds
+AI_TELEMETRY_BATCH_SIZE = 200
+AI_TELEMETRY_MAX_BUFFER = 10000  # oldest records are dropped beyond this while the DB is down
+# USD per million (prompt, response) tokens, for cost estimates in /api/ai/telemetry/
+AI_TOKEN_PRICES = {
+    'gemini-1.5-flash': (0.075, 0.30),
+}
+
+# Local classifier trained on past Gemini outputs (manage.py train_classifier)
+LOCAL_CLASSIFIER_ENABLED = True
+LOCAL_CLASSIFIER_MIN_SAMPLES = 50
+AI_CLASSIFIER_DIR = BASE_DIR / 'ml_models'
+
 # Task Enhancement Settings (Assignment Feature)
 TASK_ENHANCEMENT_ENABLED = True
 ENHANCEMENT_SUGGESTIONS_LIMIT = 8
@@ -225,22 +273,90 @@ DEFAULT_DEADLINE_BUFFER_DAYS = 2
 #  CACHING CONFIGURATION
 # =========================================
 
+# Share of responses carrying a Server-Timing breakdown (db/ai/serialize/app)
+PERFORMANCE_SAMPLE_RATE = 0.05
+
+# On-demand stack sampling (manage.py profile_token / profile_summary)
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # share of requests profiled without a token
+PROFILE_ENDPOINTS = [name for name in os.getenv('PROFILE_ENDPOINTS', '').split(',') if name]  # e.g. ContextEntryViewSet.stats
+PROFILE_INTERVAL = 0.001  # seconds between stack samples
+PROFILE_TOKEN_MAX_AGE = 3600  # seconds a signed X-Profile-Token stays valid
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# List endpoints are cached per collection version and invalidated on save/delete
+LIST_CACHE_TIMEOUT = 300
+
+# Delta sync (?updated_since=<cursor> on task and context lists)
+SYNC_PAGE_SIZE = 500
+SYNC_CURSOR_LAG = 5  # seconds - longest write transaction a cursor must not skip over
+SYNC_TOMBSTONE_RETENTION_DAYS = 30  # older cursors get 410 and must refetch everything
+
+# Idempotency-Key support on create/enhance endpoints (claims are rows of ai_integration.IdempotencyKey)
+IDEMPOTENCY_TTL = 24 * 3600  # seconds a response is replayed for retries with the same key
+IDEMPOTENCY_LOCK_TIMEOUT = 120  # a claim held longer than this (crashed worker) is released
+IDEMPOTENCY_WAIT = 60  # how long a concurrent duplicate waits for the first response before a 409
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+IDEMPOTENCY_PRUNE_RATE = 0.01  # share of claims that also delete every expired row
+
+# Shared tier (L2) seen by every worker: Redis when REDIS_URL is set,
+# otherwise a file-based store for a single host (add/incr made atomic with a file lock)
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_DIR = BASE_DIR / 'cache'
+
+
+def _shared_cache(name, timeout, max_entries):
+    if REDIS_URL:
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': timeout,
+            'KEY_PREFIX': name,
+        }
+    return {
+        'BACKEND': 'smart_todo.cache_backends.LockedFileBasedCache',
+        'LOCATION': str(CACHE_DIR / name),
+        'TIMEOUT': timeout,
+        'OPTIONS': {
+            'MAX_ENTRIES': max_entries,
+        }
+    }
+
+
+# default/ai_cache are a small per-process LRU (L1) in front of the shared tier
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'smart-todo-cache',
+        'BACKEND': 'smart_todo.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
         'TIMEOUT': 300,  # 5 minutes default
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,  # upper bound on cross-process staleness
+            'SYNC_INTERVAL': 1.0,  # how often the invalidation log is replayed
+            # Throttle history and the reminder change log must be exact across workers
+            'L1_EXCLUDE_PREFIXES': ['throttle_', 'reminder_'],
         }
     },
     'ai_cache': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'ai-suggestions-cache',
+        'BACKEND': 'smart_todo.cache_backends.TwoTierCache',
+        'LOCATION': 'ai_shared',
         'TIMEOUT': AI_CACHE_TIMEOUT,
         'OPTIONS': {
-            'MAX_ENTRIES': 500,
+            'L1_MAX_ENTRIES': 500,
+            'L1_TIMEOUT': 60,
         }
+    },
+    'shared': _shared_cache('default', 300, 10000),
+    'ai_shared': _shared_cache('ai', AI_CACHE_TIMEOUT, 5000),
+}
+
+# AI completion events pushed to ws/ai-events/ - in-memory for local runs,
+# Redis so events reach clients connected to other workers
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {'hosts': [REDIS_URL]},
+    } if REDIS_URL else {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
     }
 }
 
@@ -270,21 +386,21 @@ LOGGING = {
             'level': 'INFO',
         },
         'file': {
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'smart_todo.log_handlers.RotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'django.log',
             'formatter': 'verbose',
             'maxBytes': 1024*1024*5,  # 5MB
             'backupCount': 3,
         },
         'ai_file': {
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'smart_todo.log_handlers.RotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'ai_integration.log',
             'formatter': 'ai_formatter',
             'maxBytes': 1024*1024*2,  # 2MB
             'backupCount': 2,
         },
         'context_file': {
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'smart_todo.log_handlers.RotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'context_analysis.log',
             'formatter': 'verbose',
             'maxBytes': 1024*1024*2,  # 2MB
@@ -343,9 +459,49 @@ SESSION_SAVE_EVERY_REQUEST = True
 DEFAULT_PRIORITY = 'medium'
 DEFAULT_CATEGORY = 'Other'
 MAX_TASKS_PER_USER = 1000
+MAX_TASKS_ANONYMOUS = None  # shared by every client without a login - None for no limit
 TASK_TITLE_MAX_LENGTH = 200
 TASK_DESCRIPTION_MAX_LENGTH = 2000
 
+# Schedule planner (GET /api/tasks/schedule/) - local working time open tasks are packed into
+SCHEDULE_WORKDAY_HOURS = (9, 18)
+SCHEDULE_WORKDAYS = (0, 1, 2, 3, 4)  # Monday-Friday
+SCHEDULE_HORIZON_DAYS = 14
+SCHEDULE_DEFAULT_ESTIMATE = 1.0  # hours, for tasks without estimated_time
+SCHEDULE_MIN_BLOCK = 0.25  # hours
+SCHEDULE_REPLAN_SECONDS = 600  # cached plans are rebuilt from scratch after this
+SCHEDULE_CACHE_SIZE = 500  # owners with a cached plan per process
+
+# "Next best task" index (GET /api/tasks/next/)
+NEXT_TASK_NO_DEADLINE_DAYS = 7  # tasks without a deadline rank as if due this long after creation
+NEXT_TASK_HOURS_PER_SCORE_POINT = 0.5  # each priority_score point above 50 moves the start this much earlier
+NEXT_TASK_MAX_N = 50
+NEXT_TASK_REBUILD_SECONDS = 3600  # indexes are rebuilt from scratch after this
+NEXT_TASK_CACHE_SIZE = 500  # owners with a loaded index per process
+
+# Process-local category lookups by name/id (tasks.category_cache)
+CATEGORY_CACHE_SIZE = 1000  # owners with loaded categories per process
+CATEGORY_CACHE_SECONDS = 3600  # reloaded from the database after this even without changes
+
+# Dashboard aggregate (GET /api/dashboard/)
+DASHBOARD_TASK_LIMIT = 100  # newest task cards included
+DASHBOARD_CACHE_SECONDS = 60  # cached until a model change or this long, so overdue counts move with the clock
+
+# Task analytics (GET /api/tasks/analytics/?range=) - served from the hourly/daily rollups
+ANALYTICS_DEFAULT_RANGE = '30d'
+ANALYTICS_MAX_HOURS = 168  # ?range=<n>h uses hourly buckets
+ANALYTICS_MAX_DAYS = 366  # ?range=<n>d uses daily buckets
+ANALYTICS_CACHE_SECONDS = 300
+PEAK_HOURS_DAYS = 30  # completions analyzed for peak_productivity_hours
+PEAK_HOURS_WINDOW = 2  # hours per reported window
+PEAK_HOURS_COUNT = 2
+
+# Deadline reminders (python manage.py run_reminders)
+REMINDER_LEAD_MINUTES = (24 * 60, 60)  # one reminder per lead time before each open task's deadline
+REMINDER_TICK_SECONDS = 10
+REMINDER_REFRESH_SECONDS = 300  # how often upcoming deadlines are re-read from the database
+REMINDER_WHEEL_SLOTS = 512
+
 # Context Data Settings (Assignment Requirement)
 CONTEXT_DATA_SOURCES = [
     'whatsapp_messages',
@@ -377,74 +533,4 @@ ASSIGNMENT_REQUIREMENTS = {
     'gemini_api_configured': bool(GEMINI_API_KEY),
 }
 
-# =========================================
-# 📁 CREATE NECESSARY DIRECTORIES
-# =========================================
-
-directories_to_create = [
-    BASE_DIR / 'logs',
-    BASE_DIR / 'media',
-    BASE_DIR / 'staticfiles',
-    BASE_DIR / 'static',
-]
-
-for directory in directories_to_create:
-    os.makedirs(directory, exist_ok=True)
-
- 
-if DEBUG:
-    print("=" * 70)
-    print(" SMART TODO - AI INTEGRATION STATUS (HARDCODED)")
-    print("=" * 70)
-    print(f" GEMINI_API_KEY: {' Loaded' if GEMINI_API_KEY else ' Missing'}")
-    if GEMINI_API_KEY:
-        print(f" Key Preview: {GEMINI_API_KEY[:15]}...{GEMINI_API_KEY[-8:]}")
-    print(f" AI Provider: {AI_PROVIDER}")
-    print(f" AI Model: {AI_MODEL}")
-    print(f"  AI Temperature: {AI_TEMPERATURE}")
-    print(f" Max Tokens: {AI_MAX_TOKENS}")
-    print(f" Timeout: {AI_TIMEOUT}s")
-    print()
-    print("  AI FEATURES STATUS:")
-    for feature, enabled in AI_FEATURES.items():
-        status = " ENABLED" if enabled else " DISABLED"
-        print(f"   - {feature.replace('_', ' ').title()}: {status}")
-    print()
-    print(" ASSIGNMENT REQUIREMENTS:")
-    for req, status in ASSIGNMENT_REQUIREMENTS.items():
-        check = "" if status else ""
-        print(f"   {check} {req.replace('_', ' ').title()}: {status}")
-    print()
-    print(f" Context Analysis: {' ENABLED' if CONTEXT_ANALYSIS_ENABLED else ' DISABLED'}")
-    print(f" Priority Scoring: {' ENABLED' if PRIORITY_SCORING_ENABLED else ' DISABLED'}")
-    print(f" Deadline Suggestions: {' ENABLED' if DEADLINE_SUGGESTION_ENABLED else ' DISABLED'}")
-    print(f"  Auto Categorization: {' ENABLED' if AUTO_CATEGORIZATION else ' DISABLED'}")
-    print(f" AI Cache: {' ENABLED' if AI_CACHE_ENABLED else ' DISABLED'}")
-    print()
-    print(f" Database: {DATABASES['default']['NAME']} @ {DATABASES['default']['HOST']}")
-    print(f" Environment: DEVELOPMENT (DEBUG={DEBUG})")
-    print("=" * 70)
-
-# =========================================
-# 🔧 ENSURE PROPER IMPORTS ARE AVAILABLE
-# =========================================
-
-try:
-    import google.generativeai as genai
-    print(" google-generativeai library imported successfully")
-except ImportError:
-    print(" google-generativeai library not found. Install with: pip install google-generativeai")
-
-try:
-    import rest_framework
-    print(" django-rest-framework imported successfully")
-except ImportError:
-    print(" django-rest-framework not found. Install with: pip install djangorestframework")
-
-try:
-    import corsheaders
-    print(" django-cors-headers imported successfully")
-except ImportError:
-    print(" django-cors-headers not found. Install with: pip install django-cors-headers")
-
-print(" All configurations hardcoded successfully - No .env file needed!")
+# Startup diagnostics live in `python manage.py ai_status` - importing settings has no side effects
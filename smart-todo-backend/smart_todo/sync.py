@@ -0,0 +1,124 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .ownership import OwnedQuerySet
+
+# Cursor of a client that has nothing yet - the first delta returns every row
+START_CURSOR = '0'
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Cursor is older than the tombstone retention window - fetch the full collection again.'
+    default_code = 'cursor_expired'
+
+
+class Tombstone(models.Model):
+    """Id and time of a deleted row, so delta sync clients can apply removals"""
+    # No FK constraint: tombstones are written while a deleted user's rows cascade away
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='+'
+    )
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+        ordering = ['deleted_at']
+        indexes = [models.Index(fields=['owner', 'deleted_at'], name='%(class)s_cursor')]
+
+
+_last_prune = {}
+
+
+def record_deletion(tombstone_model, object_id, owner_id):
+    """Write a tombstone, pruning expired ones at most once an hour per process"""
+    tombstone_model.objects.create(object_id=object_id, owner_id=owner_id)
+    now = time.monotonic()
+    if now - _last_prune.get(tombstone_model, 0) > 3600:
+        _last_prune[tombstone_model] = now
+        prune_tombstones(tombstone_model)
+
+
+def prune_tombstones(tombstone_model):
+    """Drop tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS"""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    return tombstone_model.objects.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+def parse_cursor(value):
+    """'<microseconds>-<id>' -> (datetime, id); START_CURSOR -> None"""
+    if value == START_CURSOR:
+        return None
+    try:
+        micros, pk = (int(part) for part in value.split('-'))
+        moment = datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ValidationError({'updated_since': f"Invalid cursor '{value}'"})
+    return moment, pk
+
+
+def make_cursor(moment, pk=0):
+    return f'{int(moment.timestamp() * 1_000_000)}-{pk}'
+
+
+def delta_data(queryset, tombstones, cursor, projection, fields):
+    """
+    Rows of ``queryset`` changed after ``cursor`` plus ``tombstones`` ids deleted since then.
+
+    Rows come in (updated_at, id) order, at most SYNC_PAGE_SIZE per call
+    (``has_more`` asks the client to call again with the new cursor). The
+    returned cursor never passes now - SYNC_CURSOR_LAG, so rows committed late
+    by a slow transaction are sent again rather than skipped. Clients drop the
+    ``deleted`` ids, then upsert ``changed``.
+    """
+    position = parse_cursor(cursor)
+    now = timezone.now()
+    if position and position[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired()
+
+    changed = queryset.order_by('updated_at', 'id')
+    deleted = tombstones
+    if position:
+        moment, pk = position
+        changed = changed.filter(Q(updated_at__gt=moment) | Q(updated_at=moment, id__gt=pk))
+        deleted = deleted.filter(deleted_at__gte=moment)
+
+    limit = settings.SYNC_PAGE_SIZE
+    rows = list(changed.values_list('updated_at', 'id', *projection.columns(fields))[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if has_more:
+        last_moment, last_pk = rows[-1][:2]
+        deleted = deleted.filter(deleted_at__lte=last_moment)
+        next_cursor = make_cursor(last_moment, last_pk)
+    else:
+        safe_moment = now - timedelta(seconds=settings.SYNC_CURSOR_LAG)
+        if rows and rows[-1][0] <= safe_moment:
+            next_cursor = make_cursor(*rows[-1][:2])
+        else:
+            next_cursor = make_cursor(safe_moment)
+        if position and parse_cursor(next_cursor) < position:
+            next_cursor = cursor
+
+    # A deleted id can come back (SQLite reuses the highest rowid); the live row wins
+    changed_ids = {row[1] for row in rows}
+    deleted_ids = [pk for pk in dict.fromkeys(deleted.values_list('object_id', flat=True)) if pk not in changed_ids]
+
+    return {
+        'changed': projection.to_data([row[2:] for row in rows], fields),
+        'deleted': deleted_ids,
+        'cursor': next_cursor,
+        'has_more': has_more,
+    }
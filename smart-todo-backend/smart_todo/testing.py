@@ -0,0 +1,8 @@
+"""Helpers shared by the apps' test modules"""
+from django.conf import settings
+
+# Every cache alias in process memory, so tests neither share nor leave files in cache/
+LOCAL_CACHES = {
+    name: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{name}'}
+    for name in settings.CACHES
+}
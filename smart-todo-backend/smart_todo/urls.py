@@ -1,8 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
+from .views import DashboardView, database_health, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/tasks/', include('tasks.urls')),
     path('api/context/', include('context.urls')),   
+    path('api/ai/', include('ai_integration.urls')),
+    path('api/dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('api/health/db/', database_health, name='database-health'),
+    path('api/metrics', metrics, name='metrics'),
 ]
@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from context.models import ContextEntry
+from context.summary import context_stats
+from tasks.models import Task
+from tasks.rollups import peak_hours
+from tasks.serializers import TASK_LIST_PROJECTION
+from tasks.summary import category_usage, contextual_analysis_data, task_counts
+
+from .db_backends.metrics import connection_stats
+from .internal import IsInternal, is_internal_request
+from .ownership import request_owner
+from .performance import prometheus_text
+from .response_cache import cached_list
+
+
+@api_view(['GET'])
+@permission_classes([IsInternal])
+def database_health(request):
+    """Round-trip latency plus connection wait/age and pool metrics for this worker"""
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    query_ms = (time.perf_counter() - start) * 1000
+
+    settings_dict = connection.settings_dict
+    pool = getattr(connection, 'pool', None)
+    age = connection.connection_age() if hasattr(connection, 'connection_age') else None
+
+    return Response({
+        'vendor': connection.vendor,
+        'select_1_ms': round(query_ms, 2),
+        'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+        'health_checks': settings_dict.get('CONN_HEALTH_CHECKS'),
+        'connection_age_s': round(age, 2) if age is not None else None,
+        'pool': pool.get_stats() if pool is not None else None,
+        'connections': connection_stats(),
+    })
+
+
+def metrics(request):
+    """Prometheus text exposition of this worker's request histograms"""
+    if not is_internal_request(request):
+        return HttpResponseForbidden()
+    return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class DashboardView(APIView):
+    """Everything the dashboard renders in one round trip, each table read once"""
+
+    @cached_list('tasks', 'categories', 'context_entries', max_age=settings.DASHBOARD_CACHE_SECONDS)
+    def get(self, request):
+        owner = request_owner(request)
+        tasks = Task.objects.for_owner(owner)
+        now = timezone.now()
+
+        # Newest cards with created_at appended, so the recent titles come from the same rows
+        fields = TASK_LIST_PROJECTION.views['card']
+        columns = TASK_LIST_PROJECTION.columns(fields)
+        rows = list(tasks.order_by('-created_at').values_list(*columns, 'created_at')[:settings.DASHBOARD_TASK_LIMIT])
+        title = columns.index('title')
+        since = now - timedelta(days=30)
+        recent = [row[title] for row in rows[:10] if row[-1] >= since]
+
+        counts = task_counts(tasks, now)
+        categories = category_usage(owner)
+        total = counts['total']
+
+        return Response({
+            'tasks': TASK_LIST_PROJECTION.to_data(rows, fields),
+            'task_stats': {
+                'total': total,
+                'completed': counts['completed'],
+                'pending': counts['pending'],
+                'in_progress': counts['in_progress'],
+                'urgent': counts['urgent'],
+                'overdue': counts['overdue'],
+                'completion_rate': round((counts['completed'] / total * 100), 1) if total > 0 else 0,
+            },
+            'categories': categories,
+            'contextual_analysis': contextual_analysis_data(counts, recent, categories, peak_hours(owner, now)),
+            'context_stats': context_stats(ContextEntry.objects.for_owner(owner), now),
+            'generated_at': now,
+        })
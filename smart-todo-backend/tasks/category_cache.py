@@ -0,0 +1,45 @@
+from django.db import IntegrityError, transaction
+
+from .models import Category
+from .owner_cache import OwnerCache
+
+# Cross-process stamp of category rows per owner - bumped by the category signals only, so
+# usage_count increments (a queryset update) leave loaded indexes alone
+INDEX_COLLECTION = 'category_index'
+
+
+class CategoryIndex:
+    """One owner's categories by name and by id - shared instances, treat them as read-only"""
+
+    def __init__(self, categories):
+        self.by_id = {category.pk: category for category in categories}
+        self.by_name = {category.name: category for category in categories}
+
+
+def _build_index(owner):
+    return CategoryIndex(list(Category.objects.for_owner(owner)))
+
+
+# usage_count of cached instances lags behind the table; lists read it from the database
+_indexes = OwnerCache(_build_index, 'CATEGORY_CACHE_SIZE', 'CATEGORY_CACHE_SECONDS', collection=INDEX_COLLECTION)
+
+
+def category_by_id(owner, pk):
+    return _indexes.get(owner).by_id.get(pk)
+
+
+def category_by_name(owner, name):
+    return _indexes.get(owner).by_name.get(name)
+
+
+def get_or_create_category(owner, name, icon='📋', color='#6B7280'):
+    """(category, created) like get_or_create, but answered from the cache for known names"""
+    category = category_by_name(owner, name)
+    if category is not None:
+        return category, False
+    try:
+        with transaction.atomic():
+            return Category.objects.create(owner_id=getattr(owner, 'pk', owner), name=name, icon=icon, color=color), True
+    except IntegrityError:
+        # Created concurrently (or by another process since the index was loaded)
+        return Category.objects.for_owner(owner).get(name=name), False
@@ -0,0 +1,198 @@
+import logging
+import re
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from context.models import PRIORITY_RANK, ContextEntry, insight_label, insight_value
+from smart_todo.ownership import owned_collection
+from smart_todo.response_cache import bump_collection
+from . import rollups
+from .category_cache import get_or_create_category
+from .models import Category, Task
+from .planner import OPEN_STATUSES
+from .quotas import release_task_slot, reserve_task_slots
+from .serializers import CATEGORY_COLORS, CATEGORY_ICONS
+from .signals import tasks_bulk_created
+
+logger = logging.getLogger(__name__)
+
+AMOUNT_RE = re.compile(r'(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*(minute|min|hour|hr|day|week)', re.IGNORECASE)
+# Hours of work per unit of a time estimate
+ESTIMATE_HOURS = {'minute': 1 / 60, 'min': 1 / 60, 'hour': 1, 'hr': 1, 'day': 8, 'week': 40}
+
+
+def _end_of_workday(day):
+    return timezone.make_aware(datetime.combine(day, time(settings.SCHEDULE_WORKDAY_HOURS[1])))
+
+
+def parse_estimate(text):
+    """Hours from 'Time estimate: 1-2 hours - ...' (upper bound of a range), or None"""
+    match = AMOUNT_RE.search(text)
+    if not match:
+        return None
+    amount = float(match.group(2) or match.group(1))
+    return round(amount * ESTIMATE_HOURS[match.group(3).lower()], 2)
+
+
+def parse_deadline(text, now):
+    """Datetime from 'Suggested deadline: Tomorrow' / 'Within next 3-5 days' / ..., or None"""
+    lower = text.lower()
+    today = timezone.localtime(now).date()
+    if 'today' in lower or 'end of day' in lower:
+        return max(_end_of_workday(today), now + timedelta(hours=1))
+    if 'tomorrow' in lower:
+        return _end_of_workday(today + timedelta(days=1))
+    match = AMOUNT_RE.search(text)
+    if not match:
+        return None
+    amount = float(match.group(2) or match.group(1))
+    unit = match.group(3).lower()
+    if unit in ('minute', 'min', 'hour', 'hr'):
+        return now + timedelta(hours=amount * ESTIMATE_HOURS[unit])
+    days = amount * (7 if unit == 'week' else 1)
+    return _end_of_workday(today + timedelta(days=round(days)))
+
+
+def parse_draft(entry, now):
+    """Task fields from a processed entry's insight lines, or None without a 'Main task' line"""
+    lines = {}
+    for line in entry.processed_insights or []:
+        label = insight_label(line)
+        if label and label not in lines:
+            lines[label] = line
+    if 'main task' not in lines:
+        return None
+
+    title = lines['main task'].partition(':')[2].strip().strip('[]').rstrip('.').strip()
+    if not title:
+        return None
+    priority = insight_value(lines.get('priority', ''))
+    category = insight_value(lines.get('category', '')).title()
+    return {
+        'title': title[:200],
+        # The entry stays linked through its metadata, so the task keeps an excerpt rather than a copy
+        'description': Truncator(entry.content).chars(settings.CONTEXT_TASK_DESCRIPTION_CHARS),
+        'priority': priority if priority in PRIORITY_RANK else 'medium',
+        'category': category[:50] or None,
+        'estimated_time': parse_estimate(lines.get('time estimate', '')),
+        'deadline': parse_deadline(lines.get('suggested deadline', ''), now),
+        # The entry's analysis becomes the task's - no second AI call
+        'ai_suggestions': list(lines.values()),
+        'ai_engine': entry.ai_engine,
+    }
+
+
+def _title_key(title):
+    return ' '.join(title.casefold().split())
+
+
+def _categories(owner, names):
+    """name -> Category of ``owner`` for ``names``, creating missing ones"""
+    return {
+        name: get_or_create_category(owner, name, CATEGORY_ICONS.get(name, '📋'), CATEGORY_COLORS.get(name, '#6B7280'))[0]
+        for name in names
+    }
+
+
+def extract_tasks(entries, owner):
+    """
+    Create draft tasks from processed context entries of ``owner`` in one batch.
+
+    Each entry's 'Main task', 'Priority', 'Category', 'Time estimate' and
+    'Suggested deadline' lines become a pending task that carries the entry's
+    analysis, so Task.save()'s AI enhancement is skipped (bulk_create).
+    Titles matching an open task of the owner, or another entry of the batch,
+    are linked instead of duplicated, and only as many tasks as the
+    owner's task limit allows are created. The task id is stored in the
+    entry's metadata, so an entry is extracted at most once.
+    """
+    now = timezone.now()
+    result = {'created': [], 'duplicates': [], 'skipped': [], 'over_limit': []}
+    open_titles = {
+        _title_key(title): pk
+        for pk, title in Task.objects.for_owner(owner).filter(status__in=OPEN_STATUSES).values_list('id', 'title')
+    }
+
+    drafts, linked, batch = [], [], {}  # linked: (entry, task pk or draft index), batch: title key -> draft index
+    for entry in entries:
+        draft = None
+        if entry.processing_status == 'processed' and 'extracted_task' not in (entry.metadata or {}):
+            draft = parse_draft(entry, now)
+        if draft is None:
+            result['skipped'].append(entry.id)
+            continue
+        key = _title_key(draft['title'])
+        if key in open_titles:
+            linked.append((entry, ('task', open_titles[key])))
+        elif key in batch:
+            linked.append((entry, ('draft', batch[key])))
+        else:
+            batch[key] = len(drafts)
+            drafts.append((entry, draft))
+
+    granted = reserve_task_slots(owner, len(drafts)) if drafts else 0
+    result['over_limit'] = [entry.id for entry, _ in drafts[granted:]]
+    drafts = drafts[:granted]
+    for entry, (kind, index) in linked:
+        if kind == 'draft' and index >= granted:
+            result['over_limit'].append(entry.id)
+    linked = [(entry, target) for entry, target in linked if target[0] == 'task' or target[1] < granted]
+
+    try:
+        with transaction.atomic():
+            categories = _categories(owner, {draft['category'] for _, draft in drafts if draft['category']})
+            tasks = []
+            for _, draft in drafts:
+                task = Task(
+                    owner_id=getattr(owner, 'pk', owner), category=categories.get(draft['category']),
+                    ai_enhanced=True, ai_processed_at=now,
+                    **{name: value for name, value in draft.items() if name != 'category'},
+                )
+                task.priority_score = task.calculate_ai_priority_score()
+                tasks.append(task)
+            Task.objects.bulk_create(tasks)
+
+            # bulk_create sends no post_save: the analytics rollups get one write per bucket, the receivers'
+            # cache work runs once for the batch and the task slots were reserved above
+            rollups.record(owner, [event for task in tasks for event in rollups.task_events(task, True)])
+            tasks_bulk_created(getattr(owner, 'pk', owner), tasks)
+
+            used = {}
+            for task in tasks:
+                if task.category_id:
+                    used[task.category_id] = used.get(task.category_id, 0) + 1
+            for category_id, count in used.items():
+                Category.objects.filter(pk=category_id).update(usage_count=F('usage_count') + count)
+            if used:
+                transaction.on_commit(lambda: bump_collection(owned_collection('categories', owner)))
+
+            touched = []
+            for (entry, _), task in zip(drafts, tasks):
+                entry.metadata = {**(entry.metadata or {}), 'extracted_task': task.pk}
+                touched.append(entry)
+                result['created'].append(task.pk)
+            for entry, (kind, target) in linked:
+                pk = tasks[target].pk if kind == 'draft' else target
+                entry.metadata = {**(entry.metadata or {}), 'extracted_task': pk}
+                touched.append(entry)
+                result['duplicates'].append({'entry': entry.id, 'task': pk})
+            for entry in touched:
+                entry.updated_at = now
+            ContextEntry.objects.bulk_update(touched, ['metadata', 'updated_at'])
+            if touched:
+                transaction.on_commit(lambda: bump_collection(owned_collection('context_entries', owner)))
+    except Exception:
+        if granted:
+            release_task_slot(owner, granted)
+        raise
+
+    logger.info(
+        f"Extracted {len(result['created'])} tasks from context entries "
+        f"({len(result['duplicates'])} duplicates, {len(result['skipped'])} skipped, {len(result['over_limit'])} over limit)"
+    )
+    return result
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly/daily task analytics rollups from the task table (grouped queries, not row by row)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        hourly, daily = backfill(options['batch_size'])
+        self.stdout.write(f"Wrote {hourly} hourly and {daily} daily rollup rows")
@@ -0,0 +1,41 @@
+import time
+
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.reminders import ReminderSweeper
+
+
+class Command(BaseCommand):
+    help = 'Send deadline reminders (log + task.reminder WebSocket event) until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single sweep and exit')
+
+    def handle(self, *args, **options):
+        if isinstance(get_channel_layer(), InMemoryChannelLayer):
+            # Groups live in this process's memory, so no web worker's sockets ever see the events
+            self.stderr.write(self.style.WARNING(
+                'The in-memory channel layer cannot reach WebSocket clients of the web server - '
+                'reminders are only logged. Set REDIS_URL to push them.'
+            ))
+        sweeper = ReminderSweeper()
+        if options['once']:
+            self.stdout.write(f"Sent {sweeper.tick()} reminders")
+            return
+
+        self.stdout.write(
+            f"Sweeping every {settings.REMINDER_TICK_SECONDS}s for reminders "
+            f"{', '.join(str(lead) for lead in sweeper.leads)} minutes before deadlines"
+        )
+        try:
+            while True:
+                close_old_connections()
+                sent = sweeper.tick()
+                if sent:
+                    self.stdout.write(f"Sent {sent} reminders ({len(sweeper.wheel)} pending)")
+                time.sleep(settings.REMINDER_TICK_SECONDS)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
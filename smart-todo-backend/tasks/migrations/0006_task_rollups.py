@@ -0,0 +1,56 @@
+# Generated by Django 5.1 on 2026-10-19 00:03
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_completed(apps, schema_editor):
+    # Best guess for tasks completed before completed_at existed
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(status='completed', completed_at__isnull=True).update(completed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_deadline_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(stamp_completed, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_key', models.CharField(max_length=40)),
+                ('category_key', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('bucket', models.DateField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner_key', 'bucket', 'category_key'), name='task_daily_rollup_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_key', models.CharField(max_length=40)),
+                ('category_key', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('bucket', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner_key', 'bucket', 'category_key'), name='task_hourly_rollup_unique')],
+            },
+        ),
+    ]
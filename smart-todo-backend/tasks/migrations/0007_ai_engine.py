@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='ai_engine',
+            field=models.CharField(blank=True, choices=[('gemini', 'Google Gemini'), ('local', 'Local classifier'), ('fallback', 'Fallback')], max_length=10),
+        ),
+    ]
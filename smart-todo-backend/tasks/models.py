@@ -1,24 +1,36 @@
 from django.db import models
 from django.utils import timezone
-from django.conf import settings
-import google.generativeai as genai
+from asgiref.sync import sync_to_async
+from ai_integration.async_client import agenerate_content
+from ai_integration.events import apublish, publish
+from ai_integration.gemini import generate_content
+from smart_todo.ownership import OwnedQuerySet, owner_field
+from smart_todo.sync import Tombstone
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Category(models.Model):
-    name = models.CharField(max_length=50, unique=True)
+    owner = owner_field('categories')
+    name = models.CharField(max_length=50)
     icon = models.CharField(max_length=10, default='📋')
     color = models.CharField(max_length=7, default='#6B7280')
     usage_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
     class Meta:
         verbose_name_plural = "Categories"
+        constraints = [
+            # Names are unique per owner (the NULL-owner partition needs its own partial index)
+            models.UniqueConstraint(fields=['owner', 'name'], name='category_owner_name_unique'),
+            models.UniqueConstraint(fields=['name'], condition=models.Q(owner__isnull=True), name='category_shared_name_unique'),
+        ]
 
 class Task(models.Model):
     PRIORITY_CHOICES = [
@@ -33,7 +45,15 @@ class Task(models.Model):
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
     ]
+    
+    # Which analysis produced ai_suggestions - the local classifier only trains on Gemini's
+    ENGINE_CHOICES = [
+        ('gemini', 'Google Gemini'),
+        ('local', 'Local classifier'),
+        ('fallback', 'Fallback'),
+    ]
 
+    owner = owner_field('tasks')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
@@ -47,38 +67,127 @@ class Task(models.Model):
     ai_enhanced = models.BooleanField(default=False)
     ai_suggestions = models.JSONField(default=list, blank=True, help_text="Gemini AI suggestions")
     ai_processed_at = models.DateTimeField(null=True, blank=True)
+    ai_engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = OwnedQuerySet.as_manager()
     
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored status, so the rollup signal can tell a status change (tasks.rollups)
+        if 'status' in field_names:
+            instance._saved_status = instance.status
+        return instance
+
     class Meta:
         ordering = ['-priority_score', '-created_at']
+        # Every API query is owner-scoped, so the owner leads each index
+        indexes = [
+            models.Index(fields=['owner', '-created_at'], name='task_owner_created'),
+            models.Index(fields=['owner', 'status'], name='task_owner_status'),
+            models.Index(fields=['owner', 'updated_at', 'id'], name='task_owner_updated_cursor'),
+            # Reminder sweeps range-read open tasks by deadline across all owners
+            models.Index(fields=['status', 'deadline'], name='task_status_deadline'),
+        ]
+    
+    @property
+    def category_info(self):
+        """The task's category, from the process-local category cache when it is not loaded yet"""
+        if self.category_id is None:
+            return None
+        if Task.category.is_cached(self):
+            return self.category
+        from .category_cache import category_by_id
+        return category_by_id(self.owner_id, self.category_id) or self.category
+    
+    # updated_at included so AI enrichment shows up in ?updated_since= deltas
+    AI_UPDATE_FIELDS = ['ai_suggestions', 'ai_enhanced', 'ai_engine', 'ai_processed_at', 'priority_score', 'updated_at']
     
     def save(self, *args, **kwargs):
         # Auto-enhance with AI when created
         is_new = self.pk is None
+        self.track_completion()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'completed_at'}
         super().save(*args, **kwargs)
         
-        if is_new:
+        # Tasks created with an analysis attached (a preview_token) skip the AI call
+        if is_new and not self.ai_enhanced:
             try:
                 self.enhance_with_ai()
             except Exception as e:
                 logger.error(f"AI enhancement failed for task {self.id}: {str(e)}")
     
+    def track_completion(self):
+        """Stamp completed_at when the task becomes completed and clear it when it is reopened"""
+        if self.status != 'completed':
+            self.completed_at = None
+        elif self.completed_at is None:
+            self.completed_at = timezone.now()
+    
     def enhance_with_ai(self):
         """ Enhance task with Gemini AI insights"""
         try:
-            # Configure Gemini AI
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            # Routine tasks are answered by the local classifier, the rest escalate to Gemini
+            suggestions = self.apply_local_analysis()
+            
+            if suggestions is None:
+                # Generate AI response
+                response = generate_content(self.build_ai_prompt(), 'gemini-1.5-flash', call_site='task.enhance')
+                suggestions = self.apply_ai_analysis(response.text)
+            
+            self.save(update_fields=self.AI_UPDATE_FIELDS)
+            publish('task.enhanced', self.ai_event_data(), self.owner_id)
+            return suggestions
+            
+        except Exception as e:
+            logger.error(f" Gemini AI enhancement failed for task {self.id}: {str(e)}")
+            
+            fallback = self.apply_fallback_analysis()
+            self.save(update_fields=['ai_suggestions', 'ai_enhanced', 'ai_engine', 'updated_at'])
+            publish('task.enhanced', self.ai_event_data(), self.owner_id)
+            return fallback
+    
+    async def aenhance_with_ai(self):
+        """Non-blocking enhance_with_ai for async views (load the task with select_related('category'))"""
+        try:
+            # Loading and running the local model reads files and runs numpy - not on the event loop
+            suggestions = await sync_to_async(self.apply_local_analysis)()
+            
+            if suggestions is None:
+                ai_analysis = await agenerate_content(self.build_ai_prompt(), call_site='task.enhance')
+                suggestions = self.apply_ai_analysis(ai_analysis)
+            
+            await self.asave(update_fields=self.AI_UPDATE_FIELDS)
+            await apublish('task.enhanced', self.ai_event_data(), self.owner_id)
+            return suggestions
             
-            # Create comprehensive prompt for task analysis
-            prompt = f"""You are an expert productivity and task management assistant. Analyze this task and provide intelligent insights.
+        except Exception as e:
+            logger.error(f" Gemini AI enhancement failed for task {self.id}: {str(e)}")
+            
+            fallback = self.apply_fallback_analysis()
+            await self.asave(update_fields=['ai_suggestions', 'ai_enhanced', 'ai_engine', 'updated_at'])
+            await apublish('task.enhanced', self.ai_event_data(), self.owner_id)
+            return fallback
+    
+    def ai_event_data(self):
+        """Serialized task pushed with the task.enhanced event"""
+        from .serializers import TaskSerializer
+        return TaskSerializer(self).data
+    
+    def build_ai_prompt(self):
+        """Create comprehensive prompt for task analysis"""
+        return f"""You are an expert productivity and task management assistant. Analyze this task and provide intelligent insights.
 
 TASK DETAILS:
 Title: "{self.title}"
 Description: "{self.description or 'No description provided'}"
-Category: "{self.category.name if self.category else 'No category'}"
+Category: "{self.category_info.name if self.category_info else 'No category'}"
 Priority: "{self.get_priority_display()}"
 Deadline: "{self.deadline.strftime('%Y-%m-%d %H:%M') if self.deadline else 'No deadline set'}"
 Estimated Time: "{self.estimated_time} hours" if self.estimated_time else "No time estimate"
@@ -102,38 +211,54 @@ INSTRUCTIONS:
 - Focus on practical productivity advice
 - Each insight should be 1-2 sentences maximum
 - Use the exact emoji format shown above"""
-
-            # Generate AI response
-            response = model.generate_content(prompt)
-            ai_analysis = response.text
-            
-            # Parse AI response into structured suggestions
-            suggestions = self.parse_gemini_response(ai_analysis)
-            
-            # Calculate AI-enhanced priority score
-            priority_score = self.calculate_ai_priority_score()
-            
-            # Update task with AI insights
-            self.ai_suggestions = suggestions
-            self.ai_enhanced = True
-            self.ai_processed_at = timezone.now()
-            self.priority_score = priority_score
-            
-            self.save(update_fields=['ai_suggestions', 'ai_enhanced', 'ai_processed_at', 'priority_score'])
-            
-            logger.info(f" Task {self.id} enhanced with Gemini AI - {len(suggestions)} insights generated")
-            return suggestions
-            
-        except Exception as e:
-            logger.error(f" Gemini AI enhancement failed for task {self.id}: {str(e)}")
-            
-            # Fallback AI suggestions
-            fallback = self.generate_fallback_ai_insights()
-            self.ai_suggestions = fallback
-            self.ai_enhanced = False
-            self.save(update_fields=['ai_suggestions', 'ai_enhanced'])
-            
-            return fallback
+    
+    def apply_ai_analysis(self, ai_analysis):
+        """Update task fields from a Gemini response (caller saves)"""
+        # Parse AI response into structured suggestions
+        suggestions = self.parse_gemini_response(ai_analysis)
+        
+        # Update task with AI insights
+        self.ai_suggestions = suggestions
+        self.ai_enhanced = True
+        self.ai_engine = 'gemini' if ai_analysis else 'fallback'
+        self.ai_processed_at = timezone.now()
+        self.priority_score = self.calculate_ai_priority_score()
+        
+        logger.info(f" Task {self.id} enhanced with Gemini AI - {len(suggestions)} insights generated")
+        return suggestions
+    
+    def apply_local_analysis(self):
+        """Update task fields from a confident local prediction, or return None to escalate"""
+        from ai_integration.classifier import classify_locally
+        prediction = classify_locally(f"{self.title} {self.description or ''}")
+        if not prediction:
+            return None
+        
+        local_lines = {
+            'Priority Analysis:': f" Priority Analysis: {prediction['priority'].title()} priority matches similar past tasks ({prediction['priority_confidence']:.0%} confidence)",
+            'Category Optimization:': f" Category Optimization: {prediction['category']} is the best fit based on similar past tasks ({prediction['category_confidence']:.0%} confidence)",
+        }
+        suggestions = [
+            next((local_line for key, local_line in local_lines.items() if key in line), line)
+            for line in self.generate_fallback_ai_insights()
+        ]
+        
+        self.ai_suggestions = suggestions
+        self.ai_enhanced = True
+        self.ai_engine = 'local'
+        self.ai_processed_at = timezone.now()
+        self.priority_score = self.calculate_ai_priority_score()
+        
+        logger.info(f" Task {self.id} classified locally (model v{prediction['version']}) - Gemini call skipped")
+        return suggestions
+    
+    def apply_fallback_analysis(self):
+        """Fallback AI suggestions when Gemini is unavailable (caller saves)"""
+        fallback = self.generate_fallback_ai_insights()
+        self.ai_suggestions = fallback
+        self.ai_enhanced = False
+        self.ai_engine = 'fallback'
+        return fallback
     
     def parse_gemini_response(self, ai_text):
         """Parse Gemini AI response into structured insights"""
@@ -209,7 +334,8 @@ INSTRUCTIONS:
         
         # Adjust based on category importance
         important_categories = ['Work', 'Health', 'Finance']
-        if self.category and self.category.name in important_categories:
+        category = self.category_info
+        if category and category.name in important_categories:
             base_score += 10
         
         return min(base_score, 100)  # Cap at 100
@@ -244,8 +370,9 @@ INSTRUCTIONS:
         suggestions.append(priority_advice.get(self.priority, priority_advice['medium']))
         
         # Category optimization
-        if self.category:
-            suggestions.append(f" Category Optimization: {self.category.name} category fits well - group with similar tasks")
+        category = self.category_info
+        if category:
+            suggestions.append(f" Category Optimization: {category.name} category fits well - group with similar tasks")
         else:
             suggestions.append(" Category Optimization: Consider adding a category for better organization")
         
@@ -282,3 +409,70 @@ class AIInsight(models.Model):
 
     def __str__(self):
         return f"{self.insight_type} for {self.task.title}"
+
+
+class TaskTombstone(Tombstone):
+    """Deleted task ids for ?updated_since= delta sync"""
+
+
+class TaskCounter(models.Model):
+    """Maintained task count per owner (tasks.quotas) - MAX_TASKS_PER_USER without COUNT(*)"""
+    owner_key = models.CharField(max_length=40, unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.owner_key}: {self.count} tasks"
+
+
+class ReminderDelivery(models.Model):
+    """One sent deadline reminder - the unique constraint makes delivery exactly-once per lead time"""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reminders')
+    lead_minutes = models.IntegerField()
+    # A moved deadline re-arms the task's reminders
+    deadline = models.DateTimeField()
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'lead_minutes', 'deadline'], name='reminder_once_per_lead'),
+        ]
+
+    def __str__(self):
+        return f"{self.lead_minutes}min reminder for task {self.task_id}"
+
+
+class TaskRollup(models.Model):
+    """Task events per owner and category in one time bucket (tasks.rollups) - analytics never scan tasks"""
+    owner_key = models.CharField(max_length=40)
+    # Plain id (0 = uncategorized) so history outlives the category and NULLs never split a bucket
+    category_key = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)  # moves into in_progress
+
+    class Meta:
+        abstract = True
+
+
+class TaskHourlyRollup(TaskRollup):
+    bucket = models.DateTimeField()  # start of the hour
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner_key', 'bucket', 'category_key'], name='task_hourly_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_key} {self.bucket:%Y-%m-%d %H:00} #{self.category_key}"
+
+
+class TaskDailyRollup(TaskRollup):
+    bucket = models.DateField()  # local (TIME_ZONE) day
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner_key', 'bucket', 'category_key'], name='task_daily_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_key} {self.bucket} #{self.category_key}"
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from smart_todo.ownership import owned_collection, owner_key
+from smart_todo.response_cache import collection_state
+
+
+def collection_version(name, owner):
+    return collection_state(owned_collection(name, owner))[0]
+
+
+class OwnerCache:
+    """
+    In-process per-owner structures derived from one owner-scoped collection
+    (the task table unless ``collection`` says otherwise).
+
+    Built on first use, patched in place by signals after each commit, and
+    rebuilt when older than the ``max_age_setting`` seconds or when the
+    owner's collection version moved without a local patch (a write made by
+    another process). Least recently used owners are evicted beyond
+    ``max_size_setting``.
+    """
+
+    def __init__(self, build, max_size_setting, max_age_setting, collection='tasks'):
+        self.build = build  # build(owner) -> structure
+        self.collection = collection
+        self.max_size_setting = max_size_setting
+        self.max_age_setting = max_age_setting
+        self.entries = OrderedDict()  # owner key -> [structure, version, built_at]
+        self.lock = threading.Lock()
+
+    def get(self, owner):
+        key = owner_key(owner)
+        version = collection_version(self.collection, owner)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if (entry is not None and entry[1] == version
+                and time.monotonic() - entry[2] < getattr(settings, self.max_age_setting)):
+            return entry[0]
+
+        structure = self.build(owner)
+        with self.lock:
+            self.entries[key] = [structure, version, time.monotonic()]
+            while len(self.entries) > getattr(settings, self.max_size_setting):
+                self.entries.popitem(last=False)
+        return structure
+
+    def patch(self, owner_id, apply):
+        """Run ``apply(structure)`` on the owner's cached structure, if any, after a committed write"""
+        with self.lock:
+            entry = self.entries.get(owner_key(owner_id))
+        if entry is None:
+            return
+        apply(entry[0])
+        # The collection version was bumped by the same commit; the structure already reflects it
+        entry[1] = collection_version(self.collection, owner_id)
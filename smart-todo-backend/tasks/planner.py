@@ -0,0 +1,223 @@
+import bisect
+import heapq
+import math
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import Task
+from .owner_cache import OwnerCache
+
+OPEN_STATUSES = ('pending', 'in_progress')
+
+
+class WorkCalendar:
+    """Working windows after an anchor time - maps 'hours of work from now' to wall-clock time"""
+
+    def __init__(self, anchor):
+        start_hour, end_hour = settings.SCHEDULE_WORKDAY_HOURS
+        if not settings.SCHEDULE_WORKDAYS or not 0 <= start_hour < end_hour <= 24:
+            raise ImproperlyConfigured('SCHEDULE_WORKDAYS and SCHEDULE_WORKDAY_HOURS must leave some working time')
+        self.hours = (start_hour, end_hour)
+        self.workdays = frozenset(settings.SCHEDULE_WORKDAYS)
+        self.tz = timezone.get_current_timezone()
+        self.anchor = timezone.localtime(anchor, self.tz)
+        self.windows = []  # (start, end) wall-clock datetimes
+        self.starts = []   # working hours elapsed before each window
+        self.total = 0.0
+        self._next_day = self.anchor.date()
+
+    def _extend(self, hours):
+        start_hour, end_hour = self.hours
+        while self.total < hours:
+            day, self._next_day = self._next_day, self._next_day + timedelta(days=1)
+            if day.weekday() not in self.workdays:
+                continue
+            midnight = datetime.combine(day, time(0))
+            start = max(timezone.make_aware(midnight + timedelta(hours=start_hour), self.tz), self.anchor)
+            end = timezone.make_aware(midnight + timedelta(hours=end_hour), self.tz)
+            if end > start:
+                self.windows.append((start, end))
+                self.starts.append(self.total)
+                self.total += (end - start).total_seconds() / 3600
+
+    def at(self, offset, end=False):
+        """Wall-clock time after ``offset`` working hours (``end`` prefers a window's end to the next one's start)"""
+        self._extend(offset + 1e-9)
+        index = (bisect.bisect_left if end else bisect.bisect_right)(self.starts, offset) - 1
+        index = max(index, 0)
+        return self.windows[index][0] + timedelta(hours=offset - self.starts[index])
+
+    def hours_until(self, moment):
+        """Working hours between the anchor and ``moment``"""
+        while not self.windows or self.windows[-1][1] < moment:
+            self._extend(self.total + 1e-9)
+        hours = 0.0
+        for index in range(bisect.bisect_left(self.starts, 0.0), len(self.windows)):
+            start, end = self.windows[index]
+            if start >= moment:
+                break
+            hours = self.starts[index] + (min(end, moment) - start).total_seconds() / 3600
+        return hours
+
+    def segments(self, begin, end):
+        """(start, end) wall-clock blocks covering working hours ``begin``..``end``"""
+        self._extend(end + 1e-9)
+        blocks = []
+        index = max(bisect.bisect_right(self.starts, begin) - 1, 0)
+        while index < len(self.windows) and self.starts[index] < end:
+            window_start, window_end = self.windows[index]
+            window_hours = (window_end - window_start).total_seconds() / 3600
+            lo = max(begin, self.starts[index]) - self.starts[index]
+            hi = min(end, self.starts[index] + window_hours) - self.starts[index]
+            if hi > lo:
+                blocks.append((window_start + timedelta(hours=lo), window_start + timedelta(hours=hi)))
+            index += 1
+        return blocks
+
+
+def plan_key(deadline, priority_score, pk):
+    """Earliest deadline first, higher priority score on ties, no-deadline tasks last"""
+    return (deadline.timestamp() if deadline else math.inf, -priority_score, pk)
+
+
+class Schedule:
+    """
+    Open tasks of one owner laid end to end over working time in EDF order.
+
+    ``order`` holds the sorted plan keys and ``finish`` the cumulative working
+    hours at the end of each task, so a change to one task re-sorts it with a
+    bisect and only recomputes ``finish`` from the first position it affects.
+    """
+
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.calendar = WorkCalendar(anchor)
+        self.order = []
+        self.finish = []
+        self.tasks = {}  # pk -> (key, hours, title, deadline)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def task_fields(task):
+        """(key, hours, title, deadline) for a Task or a values() row"""
+        get = task.get if isinstance(task, dict) else lambda name: getattr(task, name)
+        hours = max(get('estimated_time') or settings.SCHEDULE_DEFAULT_ESTIMATE, settings.SCHEDULE_MIN_BLOCK)
+        return plan_key(get('deadline'), get('priority_score'), get('id')), hours, get('title'), get('deadline')
+
+    def build(self, rows):
+        heap = []
+        for row in rows:
+            fields = self.task_fields(row)
+            self.tasks[fields[0][2]] = fields
+            heap.append(fields[0])
+        heapq.heapify(heap)
+        self.order = [heapq.heappop(heap) for _ in range(len(heap))]
+        self._recompute(0)
+        return self
+
+    def _recompute(self, start):
+        del self.finish[start:]
+        total = self.finish[-1] if self.finish else 0.0
+        for key in self.order[start:]:
+            total += self.tasks[key[2]][1]
+            self.finish.append(total)
+
+    def _remove(self, pk):
+        key = self.tasks.pop(pk)[0]
+        index = bisect.bisect_left(self.order, key)
+        del self.order[index]
+        return index
+
+    def apply(self, pk, fields):
+        """Re-plan after one task changed - ``fields`` is None once it is closed or deleted"""
+        with self.lock:
+            current = self.tasks.get(pk)
+            if current == fields:
+                return
+            if current is not None and fields is not None and current[:2] == fields[:2]:
+                self.tasks[pk] = fields  # same position and length, only the title changed
+                return
+
+            first = len(self.order)
+            if current is not None:
+                first = self._remove(pk)
+            if fields is not None:
+                index = bisect.bisect_left(self.order, fields[0])
+                self.order.insert(index, fields[0])
+                self.tasks[pk] = fields
+                first = min(first, index)
+            self._recompute(first)
+
+    def report(self, horizon_days):
+        """Slots within ``horizon_days``, infeasible deadlines and tasks past the horizon"""
+        with self.lock:  # the calendar grows lazily and is shared with concurrent reports
+            return self._report(horizon_days)
+
+    def _report(self, horizon_days):
+        order, finish, tasks = self.order, self.finish, self.tasks
+        horizon = self.calendar.hours_until(timezone.localtime(self.anchor) + timedelta(days=horizon_days))
+        now = timezone.now()
+
+        slots, infeasible, beyond = [], [], []
+        begin = 0.0
+        for key, end in zip(order, finish):
+            pk = key[2]
+            _, _, title, deadline = tasks[pk]
+            if begin < horizon:
+                for block_start, block_end in self.calendar.segments(begin, end):
+                    slots.append({
+                        'task': pk, 'title': title, 'start': block_start, 'end': block_end,
+                        'hours': round((block_end - block_start).total_seconds() / 3600, 2),
+                        'deadline': deadline,
+                    })
+            else:
+                beyond.append(pk)
+            finish_at = self.calendar.at(end, end=True) if deadline is not None else None
+            if finish_at is not None and finish_at > deadline:
+                infeasible.append({
+                    'task': pk, 'title': title, 'deadline': deadline, 'projected_finish': finish_at,
+                    'late_by_hours': round((finish_at - deadline).total_seconds() / 3600, 1),
+                    'reason': 'overdue' if deadline <= now else 'not enough working time before the deadline',
+                })
+            begin = end
+
+        return {
+            'generated_at': self.anchor,
+            'horizon_days': horizon_days,
+            'working_hours': '{:02d}:00-{:02d}:00'.format(*settings.SCHEDULE_WORKDAY_HOURS),
+            'open_tasks': len(order),
+            'planned_hours': round(finish[-1], 2) if finish else 0,
+            'slots': slots,
+            'infeasible': infeasible,
+            'beyond_horizon': beyond,
+        }
+
+
+def _build_schedule(owner):
+    rows = Task.objects.for_owner(owner).filter(status__in=OPEN_STATUSES).values(
+        'id', 'title', 'deadline', 'estimated_time', 'priority_score'
+    )
+    return Schedule(timezone.now()).build(rows)
+
+
+# Per-owner plans kept between requests and patched in place by the task signals
+_schedules = OwnerCache(_build_schedule, 'SCHEDULE_CACHE_SIZE', 'SCHEDULE_REPLAN_SECONDS')
+
+
+def get_schedule(owner):
+    """The owner's plan, rebuilt when stale (SCHEDULE_REPLAN_SECONDS) or changed by another process"""
+    return _schedules.get(owner)
+
+
+def planned_fields(task):
+    """What the planner needs from a task instance, or None if it is not open"""
+    return Schedule.task_fields(task) if task.status in OPEN_STATUSES else None
+
+
+def task_changed(owner_id, pk, fields):
+    """Incrementally re-plan a cached schedule after a committed task write"""
+    _schedules.patch(owner_id, lambda schedule: schedule.apply(pk, fields))
@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+from ai_integration.telemetry import track_call
+from smart_todo.ownership import owner_key
+
+PREVIEW_SALT = 'tasks.preview'
+
+
+def preview_fingerprint(owner, title, description, category, priority):
+    """Hash of what a task preview was asked about - case and whitespace do not matter"""
+    parts = [owner_key(owner)] + [' '.join(str(value or '').casefold().split()) for value in (title, description, category, priority)]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def _cache_key(fingerprint):
+    return f'task_preview:{fingerprint}'
+
+
+def record_cache_hit(call_site):
+    """Count a Gemini call answered from the preview cache in the AI telemetry (no tokens spent)"""
+    with track_call(call_site, settings.AI_MODEL, '', cache_hit=True):
+        pass
+
+
+async def acached_preview(fingerprint):
+    """Analysis stored by an earlier preview of the same task, or None"""
+    if not settings.AI_CACHE_ENABLED:
+        return None
+    return await caches['ai_cache'].aget(_cache_key(fingerprint))
+
+
+async def astore_preview(fingerprint, analysis):
+    """Keep ``analysis`` for TASK_PREVIEW_TTL and return a signed token referencing it"""
+    if not settings.AI_CACHE_ENABLED:
+        return None
+    await caches['ai_cache'].aset(_cache_key(fingerprint), analysis, settings.TASK_PREVIEW_TTL)
+    return preview_token(fingerprint)
+
+
+def preview_token(fingerprint):
+    return signing.dumps(fingerprint, salt=PREVIEW_SALT)
+
+
+def preview_for(token, owner, title, description, category, priority):
+    """
+    The cached analysis behind a preview_token, or None when the token is
+    invalid or expired, belongs to another owner, was issued for a different
+    title/description/category/priority, or its analysis left the cache.
+    """
+    try:
+        fingerprint = signing.loads(token, salt=PREVIEW_SALT, max_age=settings.TASK_PREVIEW_TTL)
+    except signing.BadSignature:
+        return None
+    if fingerprint != preview_fingerprint(owner, title, description, category, priority):
+        return None
+    return caches['ai_cache'].get(_cache_key(fingerprint))
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework.exceptions import PermissionDenied
+
+from smart_todo.ownership import owner_key
+from .models import Task, TaskCounter
+
+
+class TaskLimitReached(PermissionDenied):
+    default_detail = 'Task limit reached - complete or delete some first.'
+    default_code = 'task_limit_reached'
+
+    def __init__(self, limit):
+        super().__init__(f'Task limit reached ({limit} tasks) - complete or delete some first.')
+
+
+def task_limit(owner):
+    """Most tasks ``owner`` may have, or None for no limit"""
+    # Every client without a login shares the anonymous partition, so it has its own (default: no) limit
+    if getattr(owner, 'pk', owner) is None:
+        return settings.MAX_TASKS_ANONYMOUS
+    return settings.MAX_TASKS_PER_USER
+
+
+def _seed(owner):
+    """Create the owner's counter from a one-off COUNT(*) of their tasks"""
+    try:
+        with transaction.atomic():
+            TaskCounter.objects.create(owner_key=owner_key(owner), count=Task.objects.for_owner(owner).count())
+    except IntegrityError:
+        pass  # seeded concurrently
+
+
+def task_count(owner):
+    """Number of tasks ``owner`` has, from the maintained counter"""
+    count = TaskCounter.objects.filter(owner_key=owner_key(owner)).values_list('count', flat=True).first()
+    if count is None:
+        _seed(owner)
+        return task_count(owner)
+    return count
+
+
+def adjust_task_count(owner, delta):
+    """Apply a task insert (+1) or delete (-1) to the owner's counter"""
+    key = owner_key(owner)
+    if not TaskCounter.objects.filter(owner_key=key).update(count=F('count') + delta):
+        # A fresh seed already counts the row that triggered this call
+        _seed(owner)
+
+
+def reserve_task_slot(owner):
+    """
+    Count a task that is about to be created, or raise TaskLimitReached.
+
+    A single conditional UPDATE, so concurrent creates cannot overshoot the
+    limit. The caller marks the new task ``_counted`` so the post_save
+    handler doesn't count it twice, and calls ``release_task_slot`` if the
+    insert fails.
+    """
+    key, limit = owner_key(owner), task_limit(owner)
+    counters = TaskCounter.objects.filter(owner_key=key)
+    if limit is not None:
+        counters = counters.filter(count__lt=limit)
+    for _ in range(2):
+        if counters.update(count=F('count') + 1):
+            return
+        if TaskCounter.objects.filter(owner_key=key).exists():
+            raise TaskLimitReached(limit)
+        _seed(owner)
+    raise TaskLimitReached(limit)
+
+
+def reserve_task_slots(owner, wanted):
+    """Count up to ``wanted`` tasks about to be bulk created - returns how many fit under the limit"""
+    key, limit = owner_key(owner), task_limit(owner)
+    while True:
+        count = task_count(owner)
+        granted = wanted if limit is None else max(min(wanted, limit - count), 0)
+        # Compare-and-set on the value just read, so concurrent creates cannot overshoot
+        if not granted or TaskCounter.objects.filter(owner_key=key, count=count).update(count=F('count') + granted):
+            return granted
+
+
+def release_task_slot(owner, count=1):
+    TaskCounter.objects.filter(owner_key=owner_key(owner)).update(count=F('count') - count)
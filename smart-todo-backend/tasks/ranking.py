@@ -0,0 +1,120 @@
+import heapq
+import itertools
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task
+from .owner_cache import OwnerCache
+from .planner import OPEN_STATUSES
+
+
+def latest_start(deadline, created_at, estimated_time, priority_score):
+    """
+    When work on a task has to begin - the deadline minus its estimate, pulled
+    earlier for high priority scores. Tasks without a deadline are treated as
+    due NEXT_TASK_NO_DEADLINE_DAYS after creation. It never depends on the
+    current time, so the index order stays valid as the clock moves; live
+    urgency is this minus now.
+    """
+    due = deadline or created_at + timedelta(days=settings.NEXT_TASK_NO_DEADLINE_DAYS)
+    hours = estimated_time or settings.SCHEDULE_DEFAULT_ESTIMATE
+    hours += (priority_score - 50) * settings.NEXT_TASK_HOURS_PER_SCORE_POINT
+    return due - timedelta(hours=hours)
+
+
+class NextTaskIndex:
+    """
+    Min-heap of one owner's open tasks keyed on ``latest_start``.
+
+    Changes push a new entry and mark the old one stale in ``live`` instead of
+    removing it, so a write is O(log N). ``top`` walks the heap array from the
+    root, expanding only the children of entries it has taken, so the n most
+    urgent tasks cost O(n log n) regardless of N and nothing is popped.
+    """
+
+    def __init__(self):
+        self.heap = []  # (latest_start, seq, pk)
+        self.live = {}  # pk -> (seq, latest_start) of its current heap entry
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def task_key(task):
+        """latest_start for a Task or a values() row, or None if the task is not open"""
+        get = task.get if isinstance(task, dict) else lambda name: getattr(task, name)
+        if get('status') not in OPEN_STATUSES:
+            return None
+        return latest_start(get('deadline'), get('created_at'), get('estimated_time'), get('priority_score'))
+
+    def build(self, rows):
+        for row in rows:
+            key = self.task_key(row)
+            if key is not None:
+                seq = next(self.seq)
+                self.heap.append((key, seq, row['id']))
+                self.live[row['id']] = (seq, key)
+        heapq.heapify(self.heap)
+        return self
+
+    def apply(self, pk, key):
+        """Re-rank one task after a committed write - ``key`` is None once it is closed or deleted"""
+        with self.lock:
+            current = self.live.get(pk)
+            if current is not None and current[1] == key:
+                return
+            if key is None:
+                self.live.pop(pk, None)
+            else:
+                seq = next(self.seq)
+                heapq.heappush(self.heap, (key, seq, pk))
+                self.live[pk] = (seq, key)
+            if len(self.heap) > 2 * len(self.live) + 64:
+                self._compact()
+
+    def _compact(self):
+        self.heap = [(key, seq, pk) for pk, (seq, key) in self.live.items()]
+        heapq.heapify(self.heap)
+
+    def top(self, n):
+        """[(pk, latest_start)] of the ``n`` most urgent open tasks"""
+        with self.lock:
+            heap, live = self.heap, self.live
+            found = []
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier and len(found) < n:
+                (key, seq, pk), index = heapq.heappop(frontier)
+                if live.get(pk, (None,))[0] == seq:
+                    found.append((pk, key))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+            return found
+
+
+def _build_index(owner):
+    rows = Task.objects.for_owner(owner).filter(status__in=OPEN_STATUSES).values(
+        'id', 'status', 'deadline', 'created_at', 'estimated_time', 'priority_score'
+    )
+    return NextTaskIndex().build(rows)
+
+
+# Per-owner indexes, built on the first request after process start
+_indexes = OwnerCache(_build_index, 'NEXT_TASK_CACHE_SIZE', 'NEXT_TASK_REBUILD_SECONDS')
+
+
+def next_tasks(owner, n):
+    """[(pk, latest_start)] of the owner's ``n`` most urgent open tasks"""
+    return _indexes.get(owner).top(n)
+
+
+def task_changed(owner_id, pk, key):
+    """Patch a loaded index after a committed task write"""
+    _indexes.patch(owner_id, lambda index: index.apply(pk, key))
+
+
+def slack_hours(moment, now=None):
+    """Live urgency: hours left before work has to start (negative once late)"""
+    return round((moment - (now or timezone.now())).total_seconds() / 3600, 2)
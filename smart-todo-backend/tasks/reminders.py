@@ -0,0 +1,182 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ai_integration.events import publish
+from .models import ReminderDelivery, Task
+from .planner import OPEN_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Tasks saved between refreshes, handed from any worker to the sweeper process
+# (the 'reminder_' prefix keeps them out of the per-process L1)
+CHANGE_SEQ_KEY = 'reminder_changes:seq'
+CHANGE_LOG_KEY = 'reminder_changes:{seq}'
+MAX_CHANGE_BACKLOG = 1000
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: ``slots`` buckets of ``tick`` seconds each.
+
+    An item due at time t sits in bucket (t // tick) % slots along with its
+    absolute tick, so items more than one revolution away wait for a later
+    pass. Advancing only visits the buckets of the ticks that elapsed, so a
+    poll costs what is due now, not the number of items held.
+    """
+
+    def __init__(self, tick, slots, start):
+        self.tick = tick
+        self.buckets = [{} for _ in range(slots)]
+        self.where = {}  # key -> absolute tick
+        self.current = self._tick_of(start)
+
+    def _tick_of(self, moment):
+        return int(moment.timestamp() // self.tick)
+
+    def __len__(self):
+        return len(self.where)
+
+    def add(self, moment, key, item):
+        """Schedule ``item`` at ``moment`` (overdue items fire on the next advance), replacing ``key``"""
+        self.remove(key)
+        at = max(self._tick_of(moment), self.current + 1)
+        self.buckets[at % len(self.buckets)][key] = (at, item)
+        self.where[key] = at
+
+    def remove(self, key):
+        at = self.where.pop(key, None)
+        if at is not None:
+            del self.buckets[at % len(self.buckets)][key]
+
+    def advance(self, now):
+        """Items that came due up to ``now``"""
+        target = self._tick_of(now)
+        due = []
+        # After a long pause every bucket is visited once
+        for at in range(self.current + 1, min(target, self.current + len(self.buckets)) + 1):
+            bucket = self.buckets[at % len(self.buckets)]
+            for key, (item_at, item) in list(bucket.items()):
+                if item_at <= target:
+                    del bucket[key]
+                    del self.where[key]
+                    due.append(item)
+        self.current = max(self.current, target)
+        return due
+
+
+def horizon(now):
+    """Latest deadline with a reminder due before the sweeper's next refresh"""
+    return now + timedelta(minutes=max(settings.REMINDER_LEAD_MINUTES), seconds=settings.REMINDER_REFRESH_SECONDS)
+
+
+def task_changed(pk, deadline, status):
+    """Log a saved task for the sweeper when it would otherwise wait for the next refresh"""
+    now = timezone.now()
+    if status not in OPEN_STATUSES or deadline is None or not now < deadline <= horizon(now):
+        return
+    try:
+        seq = cache.incr(CHANGE_SEQ_KEY)
+    except ValueError:
+        cache.add(CHANGE_SEQ_KEY, 0, None)
+        seq = cache.incr(CHANGE_SEQ_KEY)
+    cache.set(CHANGE_LOG_KEY.format(seq=seq), pk, settings.REMINDER_REFRESH_SECONDS)
+
+
+def deliver(task, lead_minutes):
+    """Record and publish one reminder - False if it was already delivered (e.g. by another sweeper)"""
+    try:
+        with transaction.atomic():
+            ReminderDelivery.objects.create(task_id=task['id'], lead_minutes=lead_minutes, deadline=task['deadline'])
+    except IntegrityError:
+        return False
+
+    data = {
+        'task': task['id'],
+        'owner': task['owner_id'],
+        'title': task['title'],
+        'deadline': task['deadline'].isoformat(),
+        'lead_minutes': lead_minutes,
+    }
+    logger.info(f"Reminder: task {task['id']} '{task['title']}' is due {task['deadline']:%Y-%m-%d %H:%M} ({lead_minutes} min lead)")
+    publish('task.reminder', data, task['owner_id'])
+    return True
+
+
+class ReminderSweeper:
+    """
+    Fires deadline reminders REMINDER_LEAD_MINUTES before each open task's deadline.
+
+    Every REMINDER_REFRESH_SECONDS the reminders coming due before the next
+    refresh are loaded into a timing wheel with one range read on the
+    (status, deadline) index. Tasks created or changed in between are logged
+    by the post_save signal (task_changed) and scheduled on the next tick.
+    Each tick only touches the reminders due now, re-checked against their
+    task first (a moved deadline or a closed task drops them).
+    """
+
+    def __init__(self, now=None):
+        now = now or timezone.now()
+        self.leads = sorted(set(settings.REMINDER_LEAD_MINUTES))
+        self.wheel = TimingWheel(settings.REMINDER_TICK_SECONDS, settings.REMINDER_WHEEL_SLOTS, now)
+        self.next_refresh = now
+        self.change_seq = None
+
+    def refresh(self, now, pks=None):
+        """Put the reminders coming due before the next refresh on the wheel - of every task or just ``pks``"""
+        upcoming = Task.objects.filter(status__in=OPEN_STATUSES, deadline__gt=now, deadline__lte=horizon(now))
+        delivered = ReminderDelivery.objects.filter(deadline__gt=now)
+        if pks is not None:
+            upcoming, delivered = upcoming.filter(pk__in=pks), delivered.filter(task_id__in=pks)
+        sent = set(delivered.values_list('task_id', 'lead_minutes', 'deadline'))
+
+        for pk, deadline in upcoming.order_by().values_list('id', 'deadline'):
+            for lead in self.leads:
+                fire_at = deadline - timedelta(minutes=lead)
+                if fire_at <= now:
+                    break  # this lead and longer ones have passed - no 24h reminder for a task due in 2h
+                key = (pk, lead, deadline)
+                if key not in sent:
+                    self.wheel.add(fire_at, key, key)
+
+    def pull_changes(self, now):
+        """Schedule the tasks logged by task_changed since the last tick - True if a full refresh is needed"""
+        seq = cache.get(CHANGE_SEQ_KEY, 0)
+        last_seq, self.change_seq = self.change_seq, seq
+        if last_seq is None or seq == last_seq:
+            return last_seq is None  # changes before the first refresh are part of it
+        if seq < last_seq or seq - last_seq > MAX_CHANGE_BACKLOG:
+            return True
+        log_keys = [CHANGE_LOG_KEY.format(seq=n) for n in range(last_seq + 1, seq + 1)]
+        changed = cache.get_many(log_keys)
+        if len(changed) < len(log_keys):
+            return True  # part of the log expired
+        self.refresh(now, set(changed.values()))
+        return False
+
+    def tick(self, now=None):
+        """Deliver the reminders due by ``now`` - returns how many were sent"""
+        now = now or timezone.now()
+        if self.pull_changes(now) or now >= self.next_refresh:
+            self.refresh(now)
+            self.next_refresh = now + timedelta(seconds=settings.REMINDER_REFRESH_SECONDS)
+
+        due = self.wheel.advance(now)
+        if not due:
+            return 0
+        tasks = {
+            task['id']: task
+            for task in Task.objects.filter(pk__in={pk for pk, _, _ in due}, status__in=OPEN_STATUSES).order_by().values(
+                'id', 'owner_id', 'title', 'deadline'
+            )
+        }
+        sent = 0
+        for pk, lead, deadline in due:
+            task = tasks.get(pk)
+            if task is not None and task['deadline'] == deadline:
+                sent += deliver(task, lead)
+        return sent
@@ -0,0 +1,178 @@
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractHour, TruncHour
+from django.utils import timezone
+
+from smart_todo.ownership import owner_key
+from .category_cache import category_by_id
+from .models import Task, TaskDailyRollup, TaskHourlyRollup
+
+EVENTS = ('created', 'completed', 'in_progress')
+RANGE_PATTERN = re.compile(r'^(\d+)([hd])$')
+
+
+def hour_bucket(moment):
+    """Start of the local (TIME_ZONE) hour ``moment`` falls in"""
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _add(model, key, bucket, category_key, deltas):
+    filters = {'owner_key': key, 'bucket': bucket, 'category_key': category_key}
+    increments = {name: F(name) + delta for name, delta in deltas.items()}
+    if model.objects.filter(**filters).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**filters, **deltas)
+    except IntegrityError:
+        model.objects.filter(**filters).update(**increments)  # bucket created concurrently
+
+
+def record(owner, events):
+    """Add (moment, category id, event) triples to the owner's hourly and daily buckets"""
+    buckets = defaultdict(Counter)
+    for moment, category_id, name in events:
+        buckets[hour_bucket(moment), category_id or 0][name] += 1
+    key = owner_key(owner)
+    for (hour, category_key), deltas in buckets.items():
+        _add(TaskHourlyRollup, key, hour, category_key, deltas)
+        _add(TaskDailyRollup, key, hour.date(), category_key, deltas)
+
+
+def task_events(task, created):
+    """Rollup events one save of ``task`` represents - its creation and a move to in_progress or completed"""
+    previous = None if created else getattr(task, '_saved_status', task.status)
+    task._saved_status = task.status
+    events = []
+    if created:
+        events.append((task.created_at, task.category_id, 'created'))
+    if task.status != previous:
+        if task.status == 'completed':
+            events.append((task.completed_at or timezone.now(), task.category_id, 'completed'))
+        elif task.status == 'in_progress':
+            events.append((timezone.now(), task.category_id, 'in_progress'))
+    return events
+
+
+def backfill(batch_size=1000):
+    """
+    Rebuild every rollup from the task table - returns (hourly, daily) rows written.
+
+    Each event type is one GROUP BY over tasks, and daily buckets are summed
+    from the hourly ones, so the cost is a few scans however many tasks there
+    are. Status moves that are no longer visible are approximated: completions
+    count at completed_at and tasks still in progress at their last update.
+    """
+    tz = timezone.get_current_timezone()
+    sources = (
+        ('created', Task.objects.all(), 'created_at'),
+        ('completed', Task.objects.filter(status='completed', completed_at__isnull=False), 'completed_at'),
+        ('in_progress', Task.objects.filter(status='in_progress'), 'updated_at'),
+    )
+    hourly = defaultdict(Counter)
+    for name, tasks, moment in sources:
+        rows = tasks.annotate(hour=TruncHour(moment, tzinfo=tz)).values('owner_id', 'category_id', 'hour').annotate(
+            count=Count('id')
+        ).order_by()
+        for row in rows:
+            hourly[owner_key(row['owner_id']), hour_bucket(row['hour']), row['category_id'] or 0][name] += row['count']
+
+    daily = defaultdict(Counter)
+    for (key, hour, category_key), counts in hourly.items():
+        daily[key, hour.date(), category_key].update(counts)
+
+    with transaction.atomic():
+        TaskHourlyRollup.objects.all().delete()
+        TaskDailyRollup.objects.all().delete()
+        for model, buckets in ((TaskHourlyRollup, hourly), (TaskDailyRollup, daily)):
+            model.objects.bulk_create(
+                [model(owner_key=key, bucket=bucket, category_key=category_key, **counts)
+                 for (key, bucket, category_key), counts in buckets.items()],
+                batch_size=batch_size,
+            )
+    return len(hourly), len(daily)
+
+
+def parse_range(value):
+    """'<n>h' (hourly buckets) or '<n>d' (daily) as (granularity, n) - None if malformed or too long"""
+    match = RANGE_PATTERN.match(value or '')
+    if not match:
+        return None
+    n, unit = int(match.group(1)), match.group(2)
+    limit = settings.ANALYTICS_MAX_HOURS if unit == 'h' else settings.ANALYTICS_MAX_DAYS
+    if not 1 <= n <= limit:
+        return None
+    return ('hour' if unit == 'h' else 'day'), n
+
+
+def analytics_data(owner, granularity, n, now=None):
+    """Event series and per-category totals over the last ``n`` hours or days - one read of the rollups"""
+    now = now or timezone.now()
+    if granularity == 'hour':
+        model, last, step = TaskHourlyRollup, hour_bucket(now), timedelta(hours=1)
+    else:
+        model, last, step = TaskDailyRollup, timezone.localdate(now), timedelta(days=1)
+    buckets = [last - step * offset for offset in range(n - 1, -1, -1)]
+
+    series = {bucket: Counter() for bucket in buckets}
+    categories = defaultdict(Counter)
+    rows = model.objects.filter(owner_key=owner_key(owner), bucket__gte=buckets[0]).values_list(
+        'bucket', 'category_key', *EVENTS
+    )
+    for bucket, category_key, *counts in rows:
+        counts = dict(zip(EVENTS, counts))
+        series[hour_bucket(bucket) if granularity == 'hour' else bucket].update(counts)
+        categories[category_key].update(counts)
+
+    totals = sum(series.values(), Counter())
+    by_category = []
+    for category_key, counts in sorted(categories.items(), key=lambda item: (-item[1]['completed'], -item[1]['created'])):
+        category = category_by_id(owner, category_key) if category_key else None
+        by_category.append({
+            'category': category_key or None,
+            # None for a category deleted since
+            'category_name': category.name if category else ('Uncategorized' if not category_key else None),
+            **{name: counts[name] for name in EVENTS},
+        })
+
+    return {
+        'granularity': granularity,
+        'start': buckets[0],
+        'end': now,
+        'totals': {name: totals[name] for name in EVENTS},
+        'series': [{'bucket': bucket, **{name: counts[name] for name in EVENTS}} for bucket, counts in series.items()],
+        'by_category': by_category,
+    }
+
+
+def peak_hours(owner, now=None):
+    """
+    The busiest PEAK_HOURS_WINDOW-hour windows of the day by completions over
+    the last PEAK_HOURS_DAYS, earliest first - empty until something was completed.
+    """
+    now = now or timezone.now()
+    since = hour_bucket(now) - timedelta(days=settings.PEAK_HOURS_DAYS)
+    per_hour = [0] * 24
+    rows = TaskHourlyRollup.objects.filter(owner_key=owner_key(owner), bucket__gte=since).annotate(
+        hour=ExtractHour('bucket')
+    ).values('hour').annotate(done=Sum('completed')).order_by()
+    for row in rows:
+        per_hour[row['hour']] = row['done'] or 0
+
+    width = settings.PEAK_HOURS_WINDOW
+    windows = sorted(
+        ((sum(per_hour[start:start + width]), start) for start in range(24 - width + 1)),
+        key=lambda window: (-window[0], window[1]),
+    )
+    picked = []
+    for done, start in windows:
+        if done == 0 or len(picked) == settings.PEAK_HOURS_COUNT:
+            break
+        if all(abs(start - other) >= width for other in picked):
+            picked.append(start)
+    return [f'{start:02d}:00-{start + width:02d}:00' for start in sorted(picked)]
@@ -1,12 +1,60 @@
+import copy
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
+from smart_todo.ownership import owned_collection, request_owner
+from smart_todo.response_cache import bump_collection
+from smart_todo.serialization import SKIP, ListProjection, format_datetime, json_array_length
+from .category_cache import category_by_id, get_or_create_category
 from .models import Task, Category, AIInsight
+from .previews import preview_for, record_cache_hit
+from .quotas import release_task_slot, reserve_task_slot
+
+logger = logging.getLogger(__name__)
+
+
+def _owner(serializer):
+    return request_owner(serializer.context.get('request'))
+
 
 class CategorySerializer(serializers.ModelSerializer):
+    # Uniqueness is per owner, checked in validate_name
+    name = serializers.CharField(max_length=50)
+    
     class Meta:
         model = Category
         fields = ['id', 'name', 'icon', 'color', 'usage_count', 'created_at']
+    
+    def validate_name(self, value):
+        duplicates = Category.objects.for_owner(_owner(self)).filter(name=value)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError('category with this name already exists.')
+        return value
+
+
+class OwnedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Category id limited to the requesting user's categories"""
+    
+    def get_queryset(self):
+        return Category.objects.for_owner(_owner(self.parent))
+    
+    def to_internal_value(self, data):
+        category = None
+        if not isinstance(data, bool):
+            try:
+                category = category_by_id(_owner(self.parent), int(data))
+            except (TypeError, ValueError):
+                pass
+        return category if category is not None else super().to_internal_value(data)
+
 
 class TaskSerializer(serializers.ModelSerializer):
+    category = OwnedCategoryField(allow_null=True, required=False)
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_details = CategorySerializer(source='category', read_only=True)
     ai_suggestions_count = serializers.SerializerMethodField()
@@ -17,55 +65,141 @@ class TaskSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'category', 'category_name', 'category_details',
             'priority', 'priority_score', 'status', 'deadline', 'estimated_time',
             'created_at', 'updated_at', 'ai_enhanced', 'ai_suggestions', 
-            'ai_processed_at', 'ai_suggestions_count'
+            'ai_processed_at', 'ai_suggestions_count', 'completed_at'
         ]
+        read_only_fields = ['completed_at']
     
     def get_ai_suggestions_count(self, obj):
         return len(obj.ai_suggestions) if obj.ai_suggestions else 0
 
+def _category_details(pk, name, icon, color, usage_count, created_at):
+    if pk is None:
+        return None
+    return {
+        'id': pk, 'name': name, 'icon': icon, 'color': color,
+        'usage_count': usage_count, 'created_at': format_datetime(created_at),
+    }
+
+def _category_name(pk, name):
+    # DRF skips category_name entirely when there is no category
+    return SKIP if pk is None else name
+
+# TaskSerializer's fields as (columns, builder) - list endpoint, no model instances
+TASK_LIST_PROJECTION = ListProjection(
+    {
+        'id': (('id',), None),
+        'title': (('title',), None),
+        'description': (('description',), None),
+        'category': (('category_id',), None),
+        'category_name': (('category_id', 'category__name'), _category_name),
+        'category_details': (
+            ('category_id', 'category__name', 'category__icon', 'category__color',
+             'category__usage_count', 'category__created_at'),
+            _category_details,
+        ),
+        'priority': (('priority',), None),
+        'priority_score': (('priority_score',), None),
+        'status': (('status',), None),
+        'deadline': (('deadline',), format_datetime),
+        'estimated_time': (('estimated_time',), None),
+        'created_at': (('created_at',), format_datetime),
+        'updated_at': (('updated_at',), format_datetime),
+        'ai_enhanced': (('ai_enhanced',), None),
+        'ai_suggestions': (('ai_suggestions',), None),
+        'ai_processed_at': (('ai_processed_at',), format_datetime),
+        'ai_suggestions_count': ((json_array_length('ai_suggestions'),), None),
+        'completed_at': (('completed_at',), format_datetime),
+    },
+    views={
+        # What the dashboard task cards render
+        'card': (
+            'id', 'title', 'category', 'category_name', 'priority', 'priority_score',
+            'status', 'deadline', 'estimated_time', 'ai_enhanced', 'ai_suggestions_count',
+        ),
+    },
+)
+
+# Look of categories created on the fly from a name
+CATEGORY_ICONS = {
+    'Work': '💼', 'Personal': '👤', 'Health': '💊', 'Learning': '📚',
+    'Family': '👨‍👩‍👧‍👦', 'Finance': '💰', 'Travel': '✈️', 'Shopping': '🛒'
+}
+CATEGORY_COLORS = {
+    'Work': '#3B82F6', 'Personal': '#10B981', 'Health': '#EF4444',
+    'Learning': '#F59E0B', 'Family': '#8B5CF6', 'Finance': '#059669',
+    'Travel': '#06B6D4', 'Shopping': '#EC4899'
+}
+
 class TaskCreateSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    # From the ai_suggestions preview of this task - reuses its analysis instead of a second Gemini call
+    preview_token = serializers.CharField(write_only=True, required=False, allow_blank=True)
     
     class Meta:
         model = Task
         fields = [
             'title', 'description', 'category_name', 'priority', 
-            'deadline', 'estimated_time'
+            'deadline', 'estimated_time', 'preview_token'
         ]
     
     def create(self, validated_data):
         category_name = validated_data.pop('category_name', None)
+        token = validated_data.pop('preview_token', None)
+        owner = _owner(self)
         
-        # Handle category creation/retrieval
-        if category_name:
-            category, created = Category.objects.get_or_create(
-                name=category_name,
-                defaults={
-                    'icon': self.get_category_icon(category_name),
-                    'color': self.get_category_color(category_name)
-                }
-            )
-            # Increment usage count
-            category.usage_count += 1
-            category.save()
-            validated_data['category'] = category
-        
-        # Create task  
-        return Task.objects.create(**validated_data)
+        # Counts the task against the owner's task limit before anything is written
+        reserve_task_slot(owner)
+        task = None
+        try:
+            # Handle category creation/retrieval
+            if category_name:
+                category, created = get_or_create_category(
+                    owner, category_name,
+                    icon=self.get_category_icon(category_name),
+                    color=self.get_category_color(category_name),
+                )
+                # Increment usage count - a queryset update, so the category cache stays loaded
+                Category.objects.filter(pk=category.pk).update(usage_count=F('usage_count') + 1)
+                transaction.on_commit(lambda: bump_collection(owned_collection('categories', owner)))
+                category = copy.copy(category)
+                category.usage_count += 1
+                validated_data['category'] = category
+            
+            # Create task  
+            task = Task(owner=owner, **validated_data)
+            if token:
+                self.attach_preview(task, token, category_name)
+            task._counted = True
+            task.save()
+        except Exception:
+            if task is None or task.pk is None:
+                release_task_slot(owner)
+            raise
+        return task
+    
+    def attach_preview(self, task, token, category_name):
+        """Give ``task`` the analysis of its preview, so save() skips enhance_with_ai"""
+        preview = preview_for(
+            token, task.owner_id, task.title, task.description, category_name, task.priority
+        )
+        if preview is None:
+            logger.info(f"Preview token for '{task.title}' is stale or does not match - enhancing with AI")
+            return
+        if preview.get('engine') == 'fallback':
+            # Canned suggestions, not an analysis - let save() try Gemini for the real one
+            logger.info(f"Preview of '{task.title}' only had fallback suggestions - enhancing with AI")
+            return
+        task.ai_suggestions = preview['suggestions']
+        task.priority_score = preview['priority_score']
+        task.ai_enhanced = True
+        task.ai_engine = preview.get('engine', '')
+        task.ai_processed_at = timezone.now()
+        record_cache_hit('task.enhance')
     
     def get_category_icon(self, name):
         """Get appropriate icon for category"""
-        icons = {
-            'Work': '💼', 'Personal': '👤', 'Health': '💊', 'Learning': '📚',
-            'Family': '👨‍👩‍👧‍👦', 'Finance': '💰', 'Travel': '✈️', 'Shopping': '🛒'
-        }
-        return icons.get(name, '📋')
+        return CATEGORY_ICONS.get(name, '📋')
     
     def get_category_color(self, name):
         """Get appropriate color for category"""
-        colors = {
-            'Work': '#3B82F6', 'Personal': '#10B981', 'Health': '#EF4444', 
-            'Learning': '#F59E0B', 'Family': '#8B5CF6', 'Finance': '#059669',
-            'Travel': '#06B6D4', 'Shopping': '#EC4899'
-        }
-        return colors.get(name, '#6B7280')
+        return CATEGORY_COLORS.get(name, '#6B7280')
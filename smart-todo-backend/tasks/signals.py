@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from smart_todo.ownership import owned_collection
+from smart_todo.response_cache import bump_collection
+from smart_todo.sync import record_deletion
+from . import planner, ranking, reminders, rollups
+from .category_cache import INDEX_COLLECTION
+from .models import Task, Category, TaskTombstone
+from .quotas import adjust_task_count
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, **kwargs):
+    """Invalidate the owner's cached task lists once the write is committed"""
+    transaction.on_commit(lambda: bump_collection(owned_collection('tasks', instance.owner_id)))
+
+
+@receiver(post_save, sender=Task)
+def task_replanned(sender, instance, **kwargs):
+    """Patch the owner's cached schedule (after task_changed bumped the version)"""
+    owner_id, pk, fields = instance.owner_id, instance.pk, planner.planned_fields(instance)
+    transaction.on_commit(lambda: planner.task_changed(owner_id, pk, fields))
+
+
+@receiver(post_save, sender=Task)
+def task_reranked(sender, instance, **kwargs):
+    """Re-rank the task in the owner's next-task index (after task_changed bumped the version)"""
+    owner_id, pk, key = instance.owner_id, instance.pk, ranking.NextTaskIndex.task_key(instance)
+    transaction.on_commit(lambda: ranking.task_changed(owner_id, pk, key))
+
+
+@receiver(post_save, sender=Task)
+def task_rescheduled(sender, instance, update_fields=None, **kwargs):
+    """Hand a task due soon to the reminder sweeper instead of waiting for its next refresh"""
+    if update_fields is not None and not {'deadline', 'status'} & set(update_fields):
+        return
+    pk, deadline, status = instance.pk, instance.deadline, instance.status
+    transaction.on_commit(lambda: reminders.task_changed(pk, deadline, status))
+
+
+@receiver(post_save, sender=Task)
+def task_created(sender, instance, created, **kwargs):
+    """Keep the per-owner task counter in step with inserts from any code path"""
+    if created and not getattr(instance, '_counted', False):
+        adjust_task_count(instance.owner_id, 1)
+
+
+@receiver(post_save, sender=Task)
+def task_rolled_up(sender, instance, created, **kwargs):
+    """Count creations and status moves into the analytics rollups - written in the saving transaction"""
+    events = rollups.task_events(instance, created)
+    if events:
+        rollups.record(instance.owner_id, events)
+
+
+def tasks_bulk_created(owner_id, tasks):
+    """
+    The post_save receivers' work for tasks inserted with bulk_create
+    (tasks.extraction), with one list invalidation for the whole batch.
+    Keep in step with the receivers above - task slots and rollups are
+    counted by the caller.
+    """
+    changes = [
+        (task.pk, planner.planned_fields(task), ranking.NextTaskIndex.task_key(task), task.deadline, task.status)
+        for task in tasks
+    ]
+    def apply():
+        bump_collection(owned_collection('tasks', owner_id))
+        for pk, fields, key, deadline, status in changes:
+            planner.task_changed(owner_id, pk, fields)
+            ranking.task_changed(owner_id, pk, key)
+            reminders.task_changed(pk, deadline, status)
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    """Tombstone for delta sync and counter decrement - written in the deleting transaction"""
+    record_deletion(TaskTombstone, instance.pk, instance.owner_id)
+    adjust_task_count(instance.owner_id, -1)
+    owner_id, pk = instance.owner_id, instance.pk
+    def unplan():
+        planner.task_changed(owner_id, pk, None)
+        ranking.task_changed(owner_id, pk, None)
+    transaction.on_commit(unplan)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """Task lists embed category details, so both of the owner's collections change (and the category cache)"""
+    def bump():
+        bump_collection(owned_collection('categories', instance.owner_id))
+        bump_collection(owned_collection('tasks', instance.owner_id))
+        bump_collection(owned_collection(INDEX_COLLECTION, instance.owner_id))
+    transaction.on_commit(bump)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import Category
+
+DEFAULT_CATEGORIES = ['Work', 'Personal', 'Learning']
+# Reported until the owner has completions to analyze (tasks.rollups.peak_hours)
+DEFAULT_PEAK_HOURS = ['09:00-11:00', '14:00-16:00']
+
+
+def task_counts(tasks, now=None):
+    """Totals by status and priority, overdue tasks and average completed estimate - one conditional aggregate"""
+    now = now or timezone.now()
+    return tasks.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        pending=Count('id', filter=Q(status='pending')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        urgent=Count('id', filter=Q(priority='urgent')),
+        overdue=Count('id', filter=Q(deadline__lt=now) & ~Q(status='completed')),
+        avg_completion_time=Avg('estimated_time', filter=Q(status='completed')),
+    )
+
+
+def category_usage(owner):
+    """The owner's categories with their task counts, most used first"""
+    return list(
+        Category.objects.for_owner(owner).annotate(task_count=Count('task'))
+        .order_by('-task_count', 'name').values('id', 'name', 'icon', 'color', 'usage_count', 'task_count')
+    )
+
+
+def recent_titles(tasks, now=None, limit=10):
+    """Titles of the newest tasks created in the last 30 days"""
+    now = now or timezone.now()
+    return list(
+        tasks.filter(created_at__gte=now - timedelta(days=30)).order_by('-created_at').values_list('title', flat=True)[:limit]
+    )
+
+
+def contextual_analysis_data(counts, recent, categories, peak):
+    """Body of /api/tasks/contextual_analysis/ from task_counts, recent_titles, category_usage and peak_hours results"""
+    total, completed = counts['total'], counts['completed']
+    open_tasks = counts['pending'] + counts['in_progress']
+    return {
+        'total_entries': total,
+        'recent_tasks': recent,
+        'current_workload': 'High' if open_tasks > 10 else 'Medium' if open_tasks > 5 else 'Low',
+        'user_patterns': {
+            'preferred_categories': [category['name'] for category in categories[:3]] or DEFAULT_CATEGORIES,
+            'average_completion_time': round(counts['avg_completion_time'] or 2.5, 1),
+            'peak_productivity_hours': peak or DEFAULT_PEAK_HOURS,
+        },
+        'statistics': {
+            'total_tasks': total,
+            'completed_tasks': completed,
+            'pending_tasks': counts['pending'],
+            'in_progress_tasks': counts['in_progress'],
+            'completion_rate': round((completed / total * 100), 1) if total > 0 else 0,
+        },
+    }
@@ -1,3 +1,768 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.throttling import AnonRateThrottle
+
+from ai_integration.models import IdempotencyKey
+from context.models import ContextEntry
+from smart_todo.idempotency import _claim
+from smart_todo.ownership import owned_collection
+from smart_todo.response_cache import bump_collection
+from smart_todo.testing import LOCAL_CACHES
+from .category_cache import INDEX_COLLECTION, category_by_id, category_by_name, get_or_create_category
+from .extraction import extract_tasks
+from .models import Category, Task, TaskDailyRollup, TaskHourlyRollup
+from .planner import Schedule
+from .previews import preview_for
+from .quotas import release_task_slot, reserve_task_slots, task_count
+from .ranking import NextTaskIndex, latest_start
+from .reminders import ReminderSweeper, TimingWheel
+from .rollups import analytics_data, backfill, hour_bucket, parse_range, peak_hours
+from .serializers import TaskSerializer
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class APITestCase(TestCase):
+    """API client against a clean cache, with Gemini unreachable (tasks get the fallback analysis)"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('tasks.models.generate_content', side_effect=RuntimeError('offline'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def create_task(self, **data):
+        response = self.client.post('/api/tasks/', {'title': 'Write report', **data}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+
+class IdempotencyTests(APITestCase):
+    def post(self, key, title='Write report'):
+        return self.client.post('/api/tasks/', {'title': title}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post('k1')
+        retry = self.post('k1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_key_reused_with_a_different_body_is_rejected(self):
+        self.post('k1')
+        response = self.post('k1', title='Something else')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Task.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_duplicate_of_a_running_request_gets_409(self):
+        self.post('k1')
+        IdempotencyKey.objects.update(response=None)  # as if the first request were still running
+        response = self.post('k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_the_stored_response_is_plain_json(self):
+        first = self.post('k1')
+        record = IdempotencyKey.objects.values_list('response', flat=True).get()
+        self.assertEqual((record['status'], record['data']['id']), (201, first.data['id']))
+        self.assertEqual(json.loads(json.dumps(record)), record)
+
+    def test_async_views_replay_their_json_body(self):
+        task = Task.objects.create(title='Write report', ai_enhanced=True)
+        with mock.patch('tasks.models.agenerate_content', mock.AsyncMock(return_value='')) as gemini:
+            first = self.client.post(f'/api/tasks/{task.pk}/enhance_with_ai/', HTTP_IDEMPOTENCY_KEY='k1')
+            retry = self.client.post(f'/api/tasks/{task.pk}/enhance_with_ai/', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(gemini.await_count, 1)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual((retry.status_code, retry['Content-Type']), (first.status_code, first['Content-Type']))
+        self.assertEqual(retry.json(), first.json())
+
+    @override_settings(IDEMPOTENCY_PRUNE_RATE=0)
+    def test_claims_are_exclusive_until_they_expire(self):
+        self.assertTrue(_claim('a' * 64, 'body'))
+        self.assertFalse(_claim('a' * 64, 'body'))
+        self.assertTrue(_claim('b' * 64, 'body'))
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(_claim('a' * 64, 'body'))
+        self.assertEqual(IdempotencyKey.objects.count(), 2)  # 'b' waits for a sampled prune
+
+        with override_settings(IDEMPOTENCY_PRUNE_RATE=1):
+            self.assertTrue(_claim('c' * 64, 'body'))
+        self.assertEqual(sorted(key[0] for key in IdempotencyKey.objects.values_list('key', flat=True)), ['a', 'c'])
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        self.create_task()
+        self.create_task()
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    """Two processes simulated by two L2 aliases over one directory (each alias gets its own L1)"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        # L1 stores are kept per L2 alias for the life of the process, so every test uses fresh aliases
+        self.l2 = f'l2-{self._testMethodName}'
+        shared = {'BACKEND': 'smart_todo.cache_backends.LockedFileBasedCache', 'LOCATION': directory}
+        two_tier = {'BACKEND': 'smart_todo.cache_backends.TwoTierCache', 'OPTIONS': {'SYNC_INTERVAL': 0, 'L1_TIMEOUT': 60}}
+        override = self.settings(CACHES={
+            'default': LOCAL_CACHES['default'],
+            f'{self.l2}-a': shared,
+            f'{self.l2}-b': shared,
+            'first': {**two_tier, 'LOCATION': f'{self.l2}-a'},
+            'second': {**two_tier, 'LOCATION': f'{self.l2}-b'},
+            'plain': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+            'unsafe': {**two_tier, 'LOCATION': 'plain'},
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_writes_in_one_process_evict_the_other_processes_l1(self):
+        first, second = caches['first'], caches['second']
+        first.get('warm-up'), second.get('warm-up')  # both know their position in the invalidation log
+        first.set('greeting', 'hello')
+        self.assertEqual(second.get('greeting'), 'hello')  # now held in the second L1
+
+        first.set('greeting', 'hi')
+        self.assertEqual(second.get('greeting'), 'hi')
+        first.delete('greeting')
+        self.assertIsNone(second.get('greeting'))
+
+    def test_concurrent_increments_never_repeat_a_value(self):
+        caches[f'{self.l2}-a'].set('counter', 0, None)
+        values = []
+
+        def bump():
+            for _ in range(25):
+                values.append(caches[f'{self.l2}-a'].incr('counter'))
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(values), list(range(1, 201)))
+
+    def test_an_l2_without_atomic_incr_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            caches['unsafe'].set('key', 'value')
+
+
+class QuotaTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret')
+
+    @override_settings(MAX_TASKS_PER_USER=2)
+    def test_users_are_capped_at_max_tasks_per_user(self):
+        self.client.force_authenticate(self.user)
+        self.create_task()
+        self.create_task()
+        response = self.client.post('/api/tasks/', {'title': 'One too many'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(task_count(self.user), 2)
+
+        Task.objects.filter(owner=self.user).first().delete()
+        self.create_task()
+
+    @override_settings(MAX_TASKS_PER_USER=1, MAX_TASKS_ANONYMOUS=None)
+    def test_anonymous_partition_is_not_held_to_the_per_user_limit(self):
+        for _ in range(3):
+            self.create_task()
+        self.assertEqual(task_count(None), 3)
+
+    @override_settings(MAX_TASKS_ANONYMOUS=1)
+    def test_anonymous_partition_has_its_own_limit(self):
+        self.create_task()
+        self.assertEqual(self.client.post('/api/tasks/', {'title': 'Second'}, format='json').status_code, 403)
+
+    @override_settings(MAX_TASKS_PER_USER=3)
+    def test_bulk_reservations_grant_what_fits(self):
+        self.assertEqual(reserve_task_slots(self.user, 5), 3)
+        self.assertEqual(reserve_task_slots(self.user, 1), 0)
+        release_task_slot(self.user, 2)
+        self.assertEqual(task_count(self.user), 1)
+
+
+class TimingWheelTests(SimpleTestCase):
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0)
+        self.wheel = TimingWheel(tick=10, slots=8, start=self.start)
+
+    def at(self, seconds):
+        return self.start + timedelta(seconds=seconds)
+
+    def test_items_fire_once_their_tick_has_passed(self):
+        self.wheel.add(self.at(25), 'a', 'a')
+        self.wheel.add(self.at(45), 'b', 'b')
+        self.assertEqual(self.wheel.advance(self.at(15)), [])
+        self.assertEqual(self.wheel.advance(self.at(30)), ['a'])
+        self.assertEqual(self.wheel.advance(self.at(50)), ['b'])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_items_a_revolution_away_wait_for_their_pass(self):
+        self.wheel.add(self.at(20 + 80), 'later', 'later')  # same bucket as t+20
+        self.assertEqual(self.wheel.advance(self.at(30)), [])
+        self.assertEqual(self.wheel.advance(self.at(110)), ['later'])
+
+    def test_overdue_items_fire_on_the_next_advance(self):
+        self.wheel.add(self.at(-60), 'late', 'late')
+        self.assertEqual(self.wheel.advance(self.at(10)), ['late'])
+
+    def test_adding_a_key_again_reschedules_it(self):
+        self.wheel.add(self.at(20), 'a', 'first')
+        self.wheel.add(self.at(60), 'a', 'second')
+        self.assertEqual(self.wheel.advance(self.at(30)), [])
+        self.assertEqual(self.wheel.advance(self.at(60)), ['second'])
+        self.wheel.add(self.at(80), 'b', 'b')
+        self.wheel.remove('b')
+        self.assertEqual(self.wheel.advance(self.at(200)), [])
+
+    def test_a_long_pause_still_visits_every_bucket(self):
+        for seconds in (20, 50, 70):
+            self.wheel.add(self.at(seconds), seconds, seconds)
+        self.assertEqual(sorted(self.wheel.advance(self.at(1000))), [20, 50, 70])
+
+
+@override_settings(REMINDER_LEAD_MINUTES=(60,), REMINDER_REFRESH_SECONDS=300, REMINDER_TICK_SECONDS=10)
+class ReminderSweeperTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('tasks.reminders.publish')
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = timezone.now()
+        self.sweeper = ReminderSweeper(self.now)
+        self.sweeper.tick(self.now)
+
+    def later(self, seconds):
+        return self.now + timedelta(seconds=seconds)
+
+    def test_tasks_saved_between_refreshes_are_scheduled_on_the_next_tick(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Call the bank', deadline=self.later(62 * 60))
+        self.assertEqual(self.sweeper.tick(self.later(10)), 0)
+        self.assertEqual(len(self.sweeper.wheel), 1)  # long before the next refresh
+        self.assertEqual(self.sweeper.tick(self.later(2 * 60 + 10)), 1)
+        event, data, owner = self.publish.call_args.args
+        self.assertEqual((event, data['task'], data['lead_minutes'], owner), ('task.reminder', task.pk, 60, None))
+        self.assertEqual(self.sweeper.tick(self.later(2 * 60 + 20)), 0)
+
+    def test_the_command_warns_that_an_in_memory_layer_reaches_no_clients(self):
+        output, errors = StringIO(), StringIO()
+        call_command('run_reminders', '--once', stdout=output, stderr=errors)
+        self.assertIn('Sent 0 reminders', output.getvalue())
+        self.assertIn('Set REDIS_URL', errors.getvalue())
+        with override_settings(CHANNEL_LAYERS={}):
+            errors = StringIO()
+            call_command('run_reminders', '--once', stdout=output, stderr=errors)
+        self.assertEqual(errors.getvalue(), '')
+
+    @override_settings(REMINDER_LEAD_MINUTES=(60, 24 * 60))
+    def test_leads_that_already_passed_are_skipped(self):
+        sweeper = ReminderSweeper(self.now)
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Due soon', deadline=self.later(2 * 3600))
+            Task.objects.create(title='Due very soon', deadline=self.later(30 * 60))
+        self.assertEqual(sweeper.tick(self.later(10)), 0)  # not the 24h reminder, nor a late 60 min one
+        self.assertEqual(list(sweeper.wheel.where), [(task.pk, 60, task.deadline)])
+
+    def test_moved_deadlines_and_closed_tasks_drop_their_reminders(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = Task.objects.create(title='Moved', deadline=self.later(65 * 60))
+            closed = Task.objects.create(title='Closed', deadline=self.later(65 * 60))
+        self.sweeper.tick(self.later(10))
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.deadline = self.later(70 * 60)
+            moved.save()
+            closed.status = 'completed'
+            closed.save()
+
+        self.assertEqual(self.sweeper.tick(self.later(5 * 60 + 10)), 0)  # the old reminders were due now
+        self.assertEqual(self.sweeper.tick(self.later(10 * 60 + 10)), 1)
+        self.assertEqual(self.publish.call_args.args[1]['task'], moved.pk)
+
+    def test_far_deadlines_wait_for_a_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='Next week', deadline=self.later(7 * 24 * 3600))
+        self.sweeper.tick(self.later(10))
+        self.assertEqual(len(self.sweeper.wheel), 0)
+
+
+class ExtractionTests(APITestCase):
+    insights = [
+        ' Priority: High - the client is waiting',
+        ' Category: Work - client deliverable',
+        ' Time estimate: 2 hours',
+        ' Main task: Send the revised proposal',
+    ]
+
+    def entry(self, content, **fields):
+        return ContextEntry.objects.create(
+            content=content, processing_status='processed', processed_insights=self.insights, ai_engine='gemini', **fields
+        )
+
+    def extract(self, *entries):
+        with self.captureOnCommitCallbacks(execute=True):
+            return extract_tasks(ContextEntry.objects.filter(pk__in=[entry.pk for entry in entries]), None)
+
+    @override_settings(CONTEXT_TASK_DESCRIPTION_CHARS=40)
+    def test_tasks_carry_the_analysis_and_an_excerpt_of_the_entry(self):
+        entry = self.entry('Client asked for the revised proposal by Friday. ' * 20)
+        result = self.extract(entry)
+
+        task = Task.objects.get(pk=result['created'][0])
+        self.assertEqual((task.title, task.priority, task.category.name, task.estimated_time), ('Send the revised proposal', 'high', 'Work', 2.0))
+        self.assertEqual((task.ai_enhanced, task.ai_engine), (True, 'gemini'))
+        self.assertEqual(len(task.description), 40)
+        self.assertTrue(task.description.endswith('…'))
+        entry.refresh_from_db()
+        self.assertEqual(entry.metadata['extracted_task'], task.pk)
+        self.assertEqual(self.extract(entry)['skipped'], [entry.pk])  # extracted at most once
+
+    def test_duplicate_titles_are_linked_not_created_again(self):
+        first, second = self.entry('Proposal thread one'), self.entry('Proposal thread two')
+        result = self.extract(first, second)
+        self.assertEqual(len(result['created']), 1)
+        [duplicate] = result['duplicates']
+        self.assertIn(duplicate['entry'], (first.pk, second.pk))
+        self.assertEqual(duplicate['task'], result['created'][0])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_new_tasks_show_up_in_cached_lists(self):
+        Category.objects.create(name='Work')
+        self.assertEqual(self.client.get('/api/tasks/categories/').data[0]['usage_count'], 0)
+        self.assertEqual(len(self.client.get('/api/tasks/').data['results']), 0)
+
+        self.extract(self.entry('Client asked for the revised proposal'))
+        self.assertEqual(self.client.get('/api/tasks/categories/').data[0]['usage_count'], 1)
+        self.assertEqual(len(self.client.get('/api/tasks/').data['results']), 1)
+
+
+class AIStatusTests(APITestCase):
+    def status(self, reply):
+        with mock.patch('tasks.views.agenerate_content', mock.AsyncMock(return_value=reply)):
+            return self.client.get('/api/tasks/ai_status/')
+
+    def test_an_empty_reply_is_reported_as_not_connected(self):
+        response = self.status('')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['ai_connected'])
+        self.assertTrue(self.status('Gemini AI Connected').json()['ai_connected'])
+
+    def test_async_views_are_throttled_like_drf_views(self):
+        with mock.patch.object(AnonRateThrottle, 'rate', '1/hour', create=True):
+            self.assertEqual(self.status('Gemini AI Connected').status_code, 200)
+            response = self.status('Gemini AI Connected')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3600')
+
+
+class ConditionalGetTests(APITestCase):
+    def test_unchanged_lists_are_answered_with_304_until_a_write(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_alone_never_hides_a_write_in_the_same_second(self):
+        last_modified = self.client.get('/api/tasks/')['Last-Modified']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task()
+        response = self.client.get('/api/tasks/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_pagination_links_follow_the_requested_host(self):
+        Task.objects.bulk_create(Task(title=f'Task {n}', ai_enhanced=True) for n in range(3))
+        with mock.patch('rest_framework.pagination.PageNumberPagination.page_size', 2):
+            internal = self.client.get('/api/tasks/', HTTP_HOST='backend.internal:8000')
+            public = self.client.get('/api/tasks/', HTTP_HOST='todo.example.com')
+        self.assertTrue(internal.json()['next'].startswith('http://backend.internal:8000/'))
+        self.assertTrue(public.json()['next'].startswith('http://todo.example.com/'))
+        self.assertNotEqual(internal['ETag'], public['ETag'])
+
+    def test_category_writes_invalidate_task_lists(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tasks/categories/', {'name': 'Work'}, format='json')
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_other_owners_writes_keep_the_etag(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.client.force_authenticate(User.objects.create_user('bob'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task()
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ListProjectionTests(APITestCase):
+    def test_list_rows_match_the_serializer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task(title='Categorized', category_name='Work', deadline='2030-01-07T09:00:00Z', estimated_time=1.5)
+            self.create_task(title='Bare')
+        Task.objects.filter(title='Bare').update(ai_suggestions=[], description=None)
+
+        listed = self.client.get('/api/tasks/').json()['results']
+        expected = [
+            json.loads(JSONRenderer().render(TaskSerializer(task).data))
+            for task in Task.objects.select_related('category')
+        ]
+        self.assertEqual(listed, expected)
+        self.assertNotIn('category_name', listed[[task['title'] for task in listed].index('Bare')])
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_task(title='Write report', category_name='Work')
+
+    def listed(self, **params):
+        response = self.client.get('/api/tasks/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results'][0]
+
+    def test_card_view_fields_and_exclude_narrow_the_rows(self):
+        self.assertEqual(list(self.listed(view='card')), [
+            'id', 'title', 'category', 'category_name', 'priority', 'priority_score',
+            'status', 'deadline', 'estimated_time', 'ai_enhanced', 'ai_suggestions_count',
+        ])
+        self.assertEqual(list(self.listed(fields='title,id')), ['id', 'title'])  # serializer order
+        full = self.listed()
+        without = self.listed(exclude='ai_suggestions,description')
+        self.assertEqual(set(full) - set(without), {'ai_suggestions', 'description'})
+        self.assertEqual(list(self.listed(view='card', exclude='category_name,priority_score'))[:4], ['id', 'title', 'category', 'priority'])
+
+    def test_unknown_views_and_fields_are_rejected(self):
+        for params in ({'view': 'tiny'}, {'fields': 'title,secret'}, {'exclude': 'nope'}):
+            self.assertEqual(self.client.get('/api/tasks/', params).status_code, 400, params)
+
+
+@override_settings(SYNC_CURSOR_LAG=0)
+class DeltaSyncTests(APITestCase):
+    def delta(self, cursor, expected_status=200):
+        response = self.client.get('/api/tasks/', {'updated_since': cursor})
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.data
+
+    def test_deltas_send_changed_rows_and_deleted_ids_since_the_cursor(self):
+        keep, drop = self.create_task(title='Keep').data['id'], self.create_task(title='Drop').data['id']
+        first = self.delta('0')
+        self.assertEqual([row['id'] for row in first['changed']], [keep, drop])
+        self.assertEqual(first['deleted'], [])
+        self.assertEqual(self.delta(first['cursor'])['changed'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):  # list caches are invalidated on commit
+            self.client.patch(f'/api/tasks/{keep}/', {'status': 'completed'}, format='json')
+            self.client.delete(f'/api/tasks/{drop}/')
+        second = self.delta(first['cursor'])
+        self.assertEqual([(row['id'], row['status']) for row in second['changed']], [(keep, 'completed')])
+        self.assertEqual(second['deleted'], [drop])
+        self.assertFalse(second['has_more'])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_pages_follow_the_cursor_until_has_more_is_false(self):
+        ids = [self.create_task(title=f'Task {n}').data['id'] for n in range(3)]
+        page = self.delta('0')
+        self.assertTrue(page['has_more'])
+        rest = self.delta(page['cursor'])
+        self.assertFalse(rest['has_more'])
+        self.assertEqual([row['id'] for row in page['changed'] + rest['changed']], ids)
+
+    def test_other_owners_changes_and_deletions_stay_out(self):
+        bob = User.objects.create_user('bob')
+        self.client.force_authenticate(bob)
+        self.client.delete(f"/api/tasks/{self.create_task().data['id']}/")
+        self.client.force_authenticate(None)
+        self.create_task()
+        data = self.delta('0')
+        self.assertEqual(len(data['changed']), 1)
+        self.assertEqual(data['deleted'], [])
+
+    def test_expired_and_malformed_cursors_are_rejected(self):
+        expired = int((timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)).timestamp() * 1_000_000)
+        self.delta(f'{expired}-1', expected_status=410)
+        self.delta('yesterday', expected_status=400)
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@override_settings(SCHEDULE_WORKDAY_HOURS=(9, 17), SCHEDULE_WORKDAYS=(0, 1, 2, 3, 4))
+class PlannerTests(SimpleTestCase):
+    monday = local(2030, 1, 7, 9)
+
+    def row(self, pk, hours, deadline=None, score=50):
+        return {'id': pk, 'title': f'Task {pk}', 'deadline': deadline, 'estimated_time': hours, 'priority_score': score}
+
+    def slots(self, schedule):
+        return [(slot['task'], slot['start'], slot['end']) for slot in schedule.report(7)['slots']]
+
+    def test_open_tasks_are_packed_into_working_hours_earliest_deadline_first(self):
+        schedule = Schedule(self.monday).build([
+            self.row(1, 4, local(2030, 1, 9, 17)), self.row(2, 6, local(2030, 1, 8, 17)), self.row(3, 2),
+        ])
+        self.assertEqual(self.slots(schedule), [
+            (2, local(2030, 1, 7, 9), local(2030, 1, 7, 15)),
+            (1, local(2030, 1, 7, 15), local(2030, 1, 7, 17)),
+            (1, local(2030, 1, 8, 9), local(2030, 1, 8, 11)),
+            (3, local(2030, 1, 8, 11), local(2030, 1, 8, 13)),
+        ])
+        self.assertEqual(schedule.report(7)['infeasible'], [])
+
+    def test_work_skips_nights_and_weekends(self):
+        schedule = Schedule(local(2030, 1, 11, 16)).build([self.row(1, 3)])
+        self.assertEqual(self.slots(schedule), [
+            (1, local(2030, 1, 11, 16), local(2030, 1, 11, 17)),
+            (1, local(2030, 1, 14, 9), local(2030, 1, 14, 11)),
+        ])
+
+    def test_deadlines_that_cannot_be_met_are_reported(self):
+        schedule = Schedule(self.monday).build([self.row(1, 6, local(2030, 1, 7, 12))])
+        [late] = schedule.report(7)['infeasible']
+        self.assertEqual((late['task'], late['projected_finish'], late['late_by_hours']), (1, local(2030, 1, 7, 15), 3.0))
+        self.assertEqual(late['reason'], 'not enough working time before the deadline')
+
+    def test_incremental_changes_match_a_fresh_plan(self):
+        rows = [self.row(1, 4, local(2030, 1, 9, 17)), self.row(2, 6, local(2030, 1, 8, 17)), self.row(3, 2)]
+        schedule = Schedule(self.monday).build(rows)
+
+        rows[1] = self.row(2, 6, local(2030, 1, 10, 17))  # moved after task 1
+        schedule.apply(2, Schedule.task_fields(rows[1]))
+        schedule.apply(3, None)  # completed
+        fresh = Schedule(self.monday).build(rows[:2])
+        self.assertEqual((schedule.order, schedule.finish), (fresh.order, fresh.finish))
+        self.assertEqual([pk for pk, _, _ in self.slots(schedule)], [1, 2, 2])
+
+
+class ScheduleEndpointTests(APITestCase):
+    def test_the_cached_plan_follows_task_writes(self):
+        self.create_task(title='Existing', estimated_time=2)
+        self.assertEqual(self.client.get('/api/tasks/schedule/').data['open_tasks'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task(title='Added', estimated_time=3)
+        plan = self.client.get('/api/tasks/schedule/').data
+        self.assertEqual((plan['open_tasks'], plan['planned_hours']), (2, 5.0))
+
+
+@override_settings(SCHEDULE_DEFAULT_ESTIMATE=1.0, NEXT_TASK_HOURS_PER_SCORE_POINT=0.5, NEXT_TASK_NO_DEADLINE_DAYS=7)
+class RankingTests(SimpleTestCase):
+    created = local(2030, 1, 1, 9)
+
+    def row(self, pk, deadline=None, hours=None, score=50, status='pending'):
+        return {'id': pk, 'status': status, 'deadline': deadline, 'created_at': self.created,
+                'estimated_time': hours, 'priority_score': score}
+
+    def test_latest_start_counts_estimate_priority_and_missing_deadlines(self):
+        due = local(2030, 1, 10, 17)
+        self.assertEqual(latest_start(due, self.created, 4, 50), local(2030, 1, 10, 13))
+        self.assertEqual(latest_start(due, self.created, 4, 70), local(2030, 1, 10, 3))  # 20 points, 10 hours earlier
+        self.assertEqual(latest_start(None, self.created, None, 50), local(2030, 1, 8, 8))
+
+    def test_top_returns_the_most_urgent_open_tasks(self):
+        index = NextTaskIndex().build([
+            self.row(1, local(2030, 1, 12, 9)), self.row(2, local(2030, 1, 10, 9)), self.row(3),
+            self.row(4, local(2030, 1, 11, 9)), self.row(5, local(2030, 1, 9, 9), status='completed'),
+        ])
+        self.assertEqual([pk for pk, _ in index.top(3)], [3, 2, 4])
+        self.assertEqual(index.top(3)[1], (2, local(2030, 1, 10, 8)))
+        self.assertEqual(len(index.top(10)), 4)
+
+    def test_changes_re_rank_without_returning_stale_entries(self):
+        rows = [self.row(pk, local(2030, 1, 10 + pk, 9)) for pk in range(1, 4)]
+        index = NextTaskIndex().build(rows)
+        index.apply(3, NextTaskIndex.task_key(self.row(3, local(2030, 1, 9, 9))))  # now the most urgent
+        index.apply(1, None)  # completed
+        self.assertEqual([pk for pk, _ in index.top(5)], [3, 2])
+
+        for hour in range(100):  # enough superseded entries to trigger a compaction
+            index.apply(2, NextTaskIndex.task_key(self.row(2, local(2030, 1, 20, 9) + timedelta(minutes=hour))))
+        self.assertLessEqual(len(index.heap), 2 * len(index.live) + 64)
+        self.assertEqual([pk for pk, _ in index.top(5)], [3, 2])
+
+
+class NextTasksEndpointTests(APITestCase):
+    def test_the_index_follows_task_writes(self):
+        soon = self.create_task(title='Soon', deadline=(timezone.now() + timedelta(hours=3)).isoformat()).data['id']
+        self.create_task(title='Later', deadline=(timezone.now() + timedelta(days=3)).isoformat())
+        self.assertEqual([task['title'] for task in self.client.get('/api/tasks/next/').data['results']], ['Soon', 'Later'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/tasks/{soon}/', {'status': 'completed'}, format='json')
+            urgent = self.create_task(title='Urgent', deadline=(timezone.now() + timedelta(hours=1)).isoformat()).data['id']
+
+        data = self.client.get('/api/tasks/next/', {'n': 5}).data
+        self.assertEqual([(task['rank'], task['title']) for task in data['results']], [(1, 'Urgent'), (2, 'Later')])
+        self.assertEqual(data['results'][0]['id'], urgent)
+        self.assertLess(data['results'][0]['slack_hours'], 1)
+
+
+class PreviewReuseTests(APITestCase):
+    reply = 'Split the report into sections\nDraft the summary first thing tomorrow'
+
+    def preview(self, **data):
+        with mock.patch('tasks.views.agenerate_content', mock.AsyncMock(return_value=self.reply)) as gemini:
+            response = self.client.post('/api/tasks/get_ai_suggestions/', {'title': 'Write report', **data}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), gemini.await_count
+
+    def test_creating_the_previewed_task_reuses_its_analysis(self):
+        preview, calls = self.preview(category='Work')
+        self.assertEqual(calls, 1)
+        self.assertEqual(self.preview(category='Work')[1], 0)  # asked again: answered from the cache
+
+        with mock.patch('tasks.models.generate_content') as gemini:
+            task = self.create_task(category_name='Work', preview_token=preview['preview_token']).data
+        gemini.assert_not_called()
+        self.assertEqual(task['ai_suggestions'], preview['suggestions'])
+        self.assertEqual(task['priority_score'], preview['priority_analysis']['priority_score'])
+        self.assertTrue(task['ai_enhanced'])
+
+    def test_fallback_previews_do_not_stand_in_for_an_analysis(self):
+        self.reply = ''
+        preview = self.preview()[0]
+        with mock.patch('tasks.models.generate_content', return_value='') as gemini:
+            task = self.create_task(preview_token=preview['preview_token']).data
+        gemini.assert_called_once()
+        self.assertNotEqual(task['ai_suggestions'], preview['suggestions'])
+
+    def test_tokens_only_match_the_task_they_previewed(self):
+        token = self.preview(description='Quarterly numbers')[0]['preview_token']
+        self.assertIsNotNone(preview_for(token, None, ' write  REPORT', 'quarterly numbers', '', 'medium'))
+        self.assertIsNone(preview_for(token, None, 'Write report', 'Other numbers', '', 'medium'))
+        self.assertIsNone(preview_for(token, User.objects.create_user('bob').pk, 'Write report', 'Quarterly numbers', '', 'medium'))
+        self.assertIsNone(preview_for(token + 'x', None, 'Write report', 'Quarterly numbers', '', 'medium'))
+
+        task = self.create_task(title='Write the report', preview_token=token).data  # edited after the preview
+        self.assertNotEqual(task['ai_suggestions'], self.reply.split('\n'))
+
+    @override_settings(TASK_PREVIEW_TTL=60)
+    def test_tokens_expire_with_the_preview(self):
+        token = self.preview()[0]['preview_token']
+        self.assertIsNotNone(preview_for(token, None, 'Write report', '', '', 'medium'))
+        with mock.patch('time.time', return_value=timezone.now().timestamp() + 61):
+            self.assertIsNone(preview_for(token, None, 'Write report', '', '', 'medium'))
+        caches['ai_cache'].clear()
+        self.assertIsNone(preview_for(token, None, 'Write report', '', '', 'medium'))  # analysis left the cache
+
+
+class CategoryCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user('alice')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.work = Category.objects.create(owner=self.alice, name='Work')
+
+    def test_lookups_are_answered_without_queries_once_loaded(self):
+        self.assertEqual(category_by_name(self.alice, 'Work'), self.work)
+        with self.assertNumQueries(0):
+            self.assertEqual(category_by_id(self.alice, self.work.pk), self.work)
+            self.assertEqual(get_or_create_category(self.alice, 'Work'), (self.work, False))
+        self.assertIsNone(category_by_name(None, 'Work'))  # other owners' categories are loaded separately
+
+    def test_committed_category_writes_reload_the_owners_categories(self):
+        category_by_name(self.alice, 'Work')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.work.name = 'Office'
+            self.work.save()
+            home, created = get_or_create_category(self.alice, 'Home')
+        self.assertTrue(created)
+        self.assertIsNone(category_by_name(self.alice, 'Work'))
+        self.assertEqual(category_by_name(self.alice, 'Office'), self.work)
+        self.assertEqual(category_by_id(self.alice, home.pk), home)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            home.delete()
+        self.assertIsNone(category_by_name(self.alice, 'Home'))
+
+    def test_usage_count_updates_keep_the_index(self):
+        category_by_name(self.alice, 'Work')
+        Category.objects.filter(pk=self.work.pk).update(usage_count=5)
+        with self.assertNumQueries(0):
+            category_by_name(self.alice, 'Work')
+
+    def test_writes_from_another_process_are_picked_up_by_version(self):
+        category_by_name(self.alice, 'Work')
+        Category.objects.filter(pk=self.work.pk).update(name='Office')  # no signal in this process
+        self.assertIsNotNone(category_by_name(self.alice, 'Work'))
+        bump_collection(owned_collection(INDEX_COLLECTION, self.alice.pk))
+        self.assertIsNone(category_by_name(self.alice, 'Work'))
+        self.assertEqual(category_by_name(self.alice, 'Office').pk, self.work.pk)
+
+
+class RollupTests(APITestCase):
+    def rollup_rows(self):
+        return {
+            model.__name__: sorted(model.objects.values_list('owner_key', 'bucket', 'category_key', 'created', 'completed', 'in_progress'))
+            for model in (TaskHourlyRollup, TaskDailyRollup)
+        }
+
+    def test_saves_are_counted_once_per_event(self):
+        with self.captureOnCommitCallbacks(execute=True):  # the new category reaches the category cache on commit
+            first = self.create_task(title='First', category_name='Work').data['id']
+        self.create_task(title='Second')
+        self.client.patch(f'/api/tasks/{first}/', {'status': 'in_progress'}, format='json')
+        self.client.patch(f'/api/tasks/{first}/', {'title': 'Renamed'}, format='json')  # not a status move
+        self.client.patch(f'/api/tasks/{first}/', {'status': 'completed'}, format='json')
+
+        data = analytics_data(None, 'hour', 24)
+        self.assertEqual(data['totals'], {'created': 2, 'completed': 1, 'in_progress': 1})
+        self.assertEqual(len(data['series']), 24)
+        self.assertEqual(data['series'][-1]['bucket'], hour_bucket(timezone.now()))
+        self.assertEqual(
+            {row['category_name']: row['created'] for row in data['by_category']}, {'Work': 1, 'Uncategorized': 1}
+        )
+
+    def test_backfill_rebuilds_what_the_signals_recorded(self):
+        task = self.create_task(title='Done soon', category_name='Work').data['id']
+        self.create_task(title='Still open')
+        self.client.patch(f'/api/tasks/{task}/', {'status': 'completed'}, format='json')
+        recorded = self.rollup_rows()
+
+        TaskHourlyRollup.objects.all().delete()
+        self.assertEqual(backfill(), (len(recorded['TaskHourlyRollup']), len(recorded['TaskDailyRollup'])))
+        self.assertEqual(self.rollup_rows(), recorded)
+
+    def test_ranges_are_validated(self):
+        self.assertEqual(parse_range('24h'), ('hour', 24))
+        self.assertEqual(parse_range('30d'), ('day', 30))
+        for value in ('0h', f'{settings.ANALYTICS_MAX_HOURS + 1}h', '7w', '', None):
+            self.assertIsNone(parse_range(value))
+        self.assertEqual(self.client.get('/api/tasks/analytics/', {'range': '7w'}).status_code, 400)
+
+    @override_settings(PEAK_HOURS_WINDOW=2, PEAK_HOURS_COUNT=2)
+    def test_peak_hours_are_the_busiest_non_overlapping_windows(self):
+        today = hour_bucket(timezone.now()).replace(hour=0)
+        for hour, done in ((9, 3), (10, 4), (11, 2), (15, 1), (16, 2)):
+            TaskHourlyRollup.objects.create(owner_key='anonymous', bucket=today.replace(hour=hour), completed=done)
+        self.assertEqual(peak_hours(None), ['09:00-11:00', '15:00-17:00'])
+        self.assertEqual(peak_hours(User.objects.create_user('idle')), [])
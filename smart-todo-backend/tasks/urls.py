@@ -1,12 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import views
 from .views import TaskViewSet, CategoryViewSet
 
 # Create router for task-related endpoints
+# (categories first - the task detail route would otherwise swallow 'categories/')
 router = DefaultRouter()
-router.register(r'', TaskViewSet, basename='task')
 router.register(r'categories', CategoryViewSet, basename='category')
+router.register(r'', TaskViewSet, basename='task')
 
 urlpatterns = [
+    # Async AI endpoints (listed before the router so they win over the detail route)
+    path('get_ai_suggestions/', views.get_ai_suggestions, name='task-get-ai-suggestions'),
+    path('ai_status/', views.ai_status, name='task-ai-status'),
+    path('<int:pk>/enhance_with_ai/', views.enhance_with_ai, name='task-enhance-with-ai'),
     path('', include(router.urls)),
 ]